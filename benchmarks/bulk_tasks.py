@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from sync_vs_async import free_port, seed, start_server, wait_ready
+
+
+async def create_per_item(client: httpx.AsyncClient, headers: dict, project_id: int, count: int) -> float:
+    started = time.perf_counter()
+    for i in range(count):
+        await client.post(
+            f"/tasks/project/{project_id}",
+            headers=headers,
+            json={"title": f"Per-item task {i}", "description": "Imported"},
+        )
+    return time.perf_counter() - started
+
+
+async def create_bulk(
+    client: httpx.AsyncClient,
+    headers: dict,
+    project_id: int,
+    count: int,
+    batch_size: int,
+) -> float:
+    started = time.perf_counter()
+    for offset in range(0, count, batch_size):
+        items = [
+            {"title": f"Bulk task {i}", "description": "Imported"}
+            for i in range(offset, min(count, offset + batch_size))
+        ]
+        response = await client.post(
+            f"/tasks/project/{project_id}/bulk",
+            headers=headers,
+            json={"items": items},
+        )
+        response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare per-item and bulk task creation")
+    parser.add_argument("--tasks", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        server = start_server(f"sqlite:///{Path(tmp) / 'bulk.db'}", port)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120) as client:
+                await wait_ready(client)
+                token, project_id = await seed(client, 0)
+                headers = {"Authorization": "Bearer " + token}
+                per_item = await create_per_item(client, headers, project_id, args.tasks)
+                bulk = await create_bulk(client, headers, project_id, args.tasks, args.batch_size)
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(
+        json.dumps(
+            {
+                "tasks": args.tasks,
+                "per_item": {"seconds": round(per_item, 3), "tasks_per_sec": round(args.tasks / per_item, 1)},
+                "bulk": {
+                    "batch_size": args.batch_size,
+                    "seconds": round(bulk, 3),
+                    "tasks_per_sec": round(args.tasks / bulk, 1),
+                },
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from export_memory import rss_mb
+from sync_vs_async import free_port, start_server, wait_ready
+
+MODES = {
+    "inline": {"PROJECT_PURGE_THRESHOLD": str(10**9)},
+    "chunked": {},
+}
+
+
+async def seed(client: httpx.AsyncClient, tasks: int) -> tuple[dict, int, int]:
+    await client.post(
+        "/users/register",
+        json={"name": "Delete Admin", "email": "delete_admin@fusion.com", "password": "123"},
+    )
+    response = await client.post("/users/login", data={"username": "delete_admin@fusion.com", "password": "123"})
+    headers = {"Authorization": "Bearer " + response.json()["access_token"]}
+    project_id = (await client.post("/projects", headers=headers, json={"name": "Doomed"})).json()["id"]
+    other_id = (await client.post("/projects", headers=headers, json={"name": "Neighbour"})).json()["id"]
+    for offset in range(0, tasks, 5000):
+        items = [{"title": f"Task {i}", "description": "To be deleted"} for i in range(offset, min(tasks, offset + 5000))]
+        response = await client.post(f"/tasks/project/{project_id}/bulk", headers=headers, json={"items": items})
+        response.raise_for_status()
+    await client.post(f"/tasks/project/{other_id}", headers=headers, json={"title": "Survivor"})
+    return headers, project_id, other_id
+
+
+async def bench_mode(mode: str, args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        extra_env = {"PASSWORD_SCRYPT_N": "1024", **MODES[mode]}
+        server = start_server(f"sqlite:///{Path(tmp) / 'delete.db'}", port, extra_env)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=600) as client:
+                await wait_ready(client)
+                headers, project_id, other_id = await seed(client, args.tasks)
+                baseline = rss_mb(server.pid)
+                peak = baseline
+                neighbour_latencies = []
+                finished = asyncio.Event()
+
+                async def sample() -> None:
+                    nonlocal peak
+                    while not finished.is_set():
+                        peak = max(peak, rss_mb(server.pid))
+                        started = time.perf_counter()
+                        await client.get(f"/tasks/project/{other_id}", headers=headers)
+                        neighbour_latencies.append(time.perf_counter() - started)
+                        await asyncio.sleep(0.05)
+
+                sampler = asyncio.create_task(sample())
+                started = time.perf_counter()
+                response = await client.delete(f"/projects/{project_id}", headers=headers)
+                response_seconds = time.perf_counter() - started
+                status = response.status_code
+                hidden = (await client.get(f"/tasks/project/{project_id}", headers=headers)).status_code
+                if status == 202:
+                    job_url = f"/projects/deletions/{response.json()['job_id']}"
+                    while (await client.get(job_url, headers=headers)).json()["status"] in {"queued", "running"}:
+                        await asyncio.sleep(0.1)
+                total_seconds = time.perf_counter() - started
+                finished.set()
+                await sampler
+
+                remaining = (await client.get(f"/tasks/project/{project_id}", headers=headers)).status_code
+                survivor = (await client.get(f"/tasks/project/{other_id}", headers=headers)).json()["items"]
+        finally:
+            server.terminate()
+            server.wait()
+
+    return {
+        "status": status,
+        "response_seconds": round(response_seconds, 3),
+        "total_seconds": round(total_seconds, 3),
+        "rss_baseline_mb": round(baseline, 1),
+        "rss_peak_mb": round(peak, 1),
+        "neighbour_max_ms": round(max(neighbour_latencies, default=0) * 1000, 1),
+        "hidden_after_response": hidden == 404,
+        "project_gone": remaining == 404,
+        "neighbour_intact": len(survivor) == 1,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Delete a large project inline and as a chunked background job")
+    parser.add_argument("--tasks", type=int, default=100_000)
+    args = parser.parse_args()
+
+    results = {"tasks": args.tasks}
+    for mode in MODES:
+        results[mode] = await bench_mode(mode, args)
+    print(json.dumps(results, indent=2))
+    checks = ("hidden_after_response", "project_gone", "neighbour_intact")
+    if not all(results[mode][check] for mode in MODES for check in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
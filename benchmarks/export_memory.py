@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import json
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+from sync_vs_async import free_port, start_server, wait_ready
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def seed_rows(db_path: Path, tenant_id: int, owner_id: int, rows: int) -> None:
+    connection = sqlite3.connect(db_path)
+    cursor = connection.execute(
+        "INSERT INTO projects (name, tenant_id, created_by) VALUES (?, ?, ?)",
+        ("Export", tenant_id, owner_id),
+    )
+    project_id = cursor.lastrowid
+    batch = 50_000
+    for offset in range(0, rows, batch):
+        connection.executemany(
+            "INSERT INTO tasks (title, description, status, project_id) VALUES (?, ?, ?, ?)",
+            (
+                (f"Synthetic task {i}", "Synthetic export row", "OPEN", project_id)
+                for i in range(offset, min(rows, offset + batch))
+            ),
+        )
+    connection.commit()
+    connection.close()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Stream a large tenant export and track server RSS")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    parser.add_argument("--rss-ceiling-mb", type=float, default=256.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "export.db"
+        port = free_port()
+        server = start_server(f"sqlite:///{db_path}", port)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=600) as client:
+                await wait_ready(client)
+                user = (
+                    await client.post(
+                        "/users/register",
+                        json={"name": "Export Admin", "email": "export@fusion.com", "password": "123"},
+                    )
+                ).json()
+                seed_rows(db_path, user["tenant_id"], user["id"], args.rows)
+                response = await client.post(
+                    "/users/login",
+                    data={"username": "export@fusion.com", "password": "123"},
+                )
+                headers = {"Authorization": "Bearer " + response.json()["access_token"]}
+
+                baseline = rss_mb(server.pid)
+                peak = baseline
+                done = threading.Event()
+
+                def sample() -> None:
+                    nonlocal peak
+                    while not done.is_set():
+                        peak = max(peak, rss_mb(server.pid))
+                        time.sleep(0.05)
+
+                sampler = threading.Thread(target=sample)
+                sampler.start()
+                started = time.perf_counter()
+                exported = 0
+                size = 0
+                async with client.stream(
+                    "GET", f"/tenants/me/export?format={args.format}", headers=headers
+                ) as stream:
+                    async for line in stream.aiter_lines():
+                        if line:
+                            exported += 1
+                            size += len(line) + 1
+                elapsed = time.perf_counter() - started
+                done.set()
+                sampler.join()
+        finally:
+            server.terminate()
+            server.wait()
+
+    result = {
+        "rows_seeded": args.rows,
+        "lines_exported": exported,
+        "bytes": size,
+        "seconds": round(elapsed, 2),
+        "rss_baseline_mb": round(baseline, 1),
+        "rss_peak_mb": round(peak, 1),
+        "rss_ceiling_mb": args.rss_ceiling_mb,
+    }
+    print(json.dumps(result, indent=2))
+    if peak > args.rss_ceiling_mb:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,166 @@
+import argparse
+import asyncio
+import json
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from sync_vs_async import free_port, start_server, wait_ready
+
+
+async def login(client: httpx.AsyncClient, email: str) -> dict:
+    response = await client.post("/users/login", data={"username": email, "password": "123"})
+    return {"Authorization": "Bearer " + response.json()["access_token"]}
+
+
+async def seed(client: httpx.AsyncClient, tasks: int) -> tuple[dict, int, int, int]:
+    await client.post(
+        "/users/register",
+        json={"name": "Jobs Admin", "email": "jobs_admin@fusion.com", "password": "123"},
+    )
+    headers = await login(client, "jobs_admin@fusion.com")
+    user = {"name": "Jobs Dev", "email": "jobs_dev@fusion.com", "password": "123", "role": "DEV"}
+    dev_id = (await client.post("/users/users", headers=headers, json=user)).json()["id"]
+    project_id = (await client.post("/projects", headers=headers, json={"name": "Doomed"})).json()["id"]
+    other_id = (await client.post("/projects", headers=headers, json={"name": "Neighbour"})).json()["id"]
+    await client.post(f"/projects/{other_id}/invite", headers=headers, json={"user_id": dev_id, "role_in_project": "DEV"})
+    for target, count in ((project_id, tasks), (other_id, tasks)):
+        for offset in range(0, count, 5000):
+            items = [{"title": f"Task {i}", "assignee_id": dev_id if target == other_id else None}
+                     for i in range(offset, min(count, offset + 5000))]
+            response = await client.post(f"/tasks/project/{target}/bulk", headers=headers, json={"items": items})
+            response.raise_for_status()
+    return headers, dev_id, project_id, other_id
+
+
+async def poll(client: httpx.AsyncClient, headers: dict, job_id: str, until) -> dict:
+    while True:
+        try:
+            job = (await client.get(f"/jobs/{job_id}", headers=headers)).json()
+        except httpx.TransportError:
+            await asyncio.sleep(0.05)
+            continue
+        if until(job):
+            return job
+        await asyncio.sleep(0.02)
+
+
+def scalar(database: Path, sql: str, *params) -> int:
+    with sqlite3.connect(database) as connection:
+        return connection.execute(sql, params).fetchone()[0]
+
+
+async def run(args: argparse.Namespace) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Path(tmp) / "jobs.db"
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        extra_env = {
+            "PASSWORD_SCRYPT_N": "1024",
+            "PROJECT_PURGE_THRESHOLD": "100",
+            "PROJECT_PURGE_CHUNK_SIZE": str(args.chunk_size),
+            "USER_PURGE_THRESHOLD": "100",
+            "USER_PURGE_CHUNK_SIZE": str(args.chunk_size),
+            "JOB_LEASE_SECONDS": str(args.lease),
+            "JOB_POLL_SECONDS": "0.2",
+        }
+        server = start_server(f"sqlite:///{database}", port, extra_env)
+        try:
+            async with httpx.AsyncClient(base_url=base_url, timeout=600) as client:
+                await wait_ready(client)
+                headers, dev_id, project_id, other_id = await seed(client, args.tasks)
+
+                started = time.perf_counter()
+                response = await client.delete(f"/projects/{project_id}", headers=headers)
+                accepted = response.status_code
+                job_id = response.json()["job_id"]
+                duplicate = (await client.delete(f"/projects/{project_id}", headers=headers)).json().get("job_id")
+                before_kill = await poll(client, headers, job_id, lambda job: job["progress"] > 0)
+                server.kill()
+                server.wait()
+
+                server = start_server(f"sqlite:///{database}", port, extra_env)
+                await wait_ready(client)
+                headers = await login(client, "jobs_admin@fusion.com")
+                job = await poll(client, headers, job_id, lambda job: job["status"] in {"done", "failed"})
+                results["project_purge"] = {
+                    "accepted": accepted,
+                    "deduplicated": duplicate == job_id,
+                    "progress_at_kill": before_kill["progress"],
+                    "status": job["status"],
+                    "attempts": job["attempts"],
+                    "progress": job["progress"],
+                    "total": job["total"],
+                    "seconds": round(time.perf_counter() - started, 3),
+                    "project_gone": scalar(database, "SELECT count(*) FROM projects WHERE id = ?", project_id) == 0,
+                    "tasks_left": scalar(database, "SELECT count(*) FROM tasks WHERE project_id = ?", project_id),
+                    "neighbour_tasks": scalar(database, "SELECT count(*) FROM tasks WHERE project_id = ?", other_id),
+                }
+
+                started = time.perf_counter()
+                response = await client.delete(f"/users/users/{dev_id}", headers=headers)
+                locked_out = (await client.post(
+                    "/users/login", data={"username": "jobs_dev@fusion.com", "password": "123"}
+                )).status_code
+                job = await poll(client, headers, response.json()["job_id"], lambda job: job["status"] in {"done", "failed"})
+                stats = (await client.get("/projects/stats", headers=headers)).json()["items"]
+                neighbour = next(item for item in stats if item["project_id"] == other_id)
+                results["user_purge"] = {
+                    "accepted": response.status_code,
+                    "login_while_pending": locked_out,
+                    "status": job["status"],
+                    "progress": job["progress"],
+                    "total": job["total"],
+                    "seconds": round(time.perf_counter() - started, 3),
+                    "user_gone": scalar(database, "SELECT count(*) FROM users WHERE id = ?", dev_id) == 0,
+                    "still_assigned": scalar(database, "SELECT count(*) FROM tasks WHERE assignee_id = ?", dev_id),
+                    "unassigned_counter": neighbour["unassigned_open_tasks"],
+                }
+                results["metrics"] = {
+                    line.split()[0]: float(line.split()[1])
+                    for line in (await client.get("/metrics")).text.splitlines()
+                    if line.startswith("jobs_")
+                }
+        finally:
+            server.terminate()
+            server.wait()
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Persistent jobs: progress, dedupe and resume after a server crash")
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--lease", type=float, default=2.0)
+    args = parser.parse_args()
+
+    results = await run(args)
+    print(json.dumps(results, indent=2))
+    project, user = results["project_purge"], results["user_purge"]
+    ok = (
+        project["accepted"] == 202
+        and project["deduplicated"]
+        and project["status"] == "done"
+        and project["attempts"] == 2
+        and project["progress"] == args.tasks
+        and project["project_gone"]
+        and project["tasks_left"] == 0
+        and project["neighbour_tasks"] == args.tasks
+        and user["accepted"] == 202
+        and user["login_while_pending"] != 200
+        and user["status"] == "done"
+        and user["user_gone"]
+        and user["still_assigned"] == 0
+        and user["unassigned_counter"] == args.tasks
+    )
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
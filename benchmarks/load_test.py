@@ -0,0 +1,248 @@
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+
+from sync_vs_async import MODES, ROOT, free_port, start_server, wait_ready
+
+STATUSES = ("OPEN", "IN_PROGRESS", "REVIEW", "DONE")
+
+DEFAULT_MIX = "login=1,list_projects=2,list_tasks=6,create_task=1,update_status=2"
+
+
+@dataclass
+class Actor:
+    email: str
+    headers: dict
+    task_ids: list[int] = field(default_factory=list)
+
+
+@dataclass
+class Tenant:
+    pm: Actor
+    dev: Actor
+    project_ids: list[int]
+
+
+async def login(client: httpx.AsyncClient, email: str) -> dict:
+    response = await client.post("/users/login", data={"username": email, "password": "123"})
+    response.raise_for_status()
+    return {"Authorization": "Bearer " + response.json()["access_token"]}
+
+
+async def seed_tenant(client: httpx.AsyncClient, index: int, args: argparse.Namespace) -> Tenant:
+    admin_email = f"load_admin_{index}@fusion.com"
+    response = await client.post(
+        "/users/register",
+        json={"name": f"Load Tenant {index}", "email": admin_email, "password": "123"},
+    )
+    response.raise_for_status()
+    admin_headers = await login(client, admin_email)
+    actors = {}
+    for role in ("PM", "DEV"):
+        email = f"load_{role.lower()}_{index}@fusion.com"
+        response = await client.post(
+            "/users/users",
+            headers=admin_headers,
+            json={"name": f"Load {role}", "email": email, "password": "123", "role": role},
+        )
+        response.raise_for_status()
+        actors[role] = (response.json()["id"], Actor(email, await login(client, email)))
+    (_, pm), (dev_id, dev) = actors["PM"], actors["DEV"]
+
+    project_ids = []
+    for p in range(args.projects):
+        response = await client.post("/projects", headers=pm.headers, json={"name": f"Load {index}.{p}"})
+        response.raise_for_status()
+        project_id = response.json()["id"]
+        project_ids.append(project_id)
+        await client.post(
+            f"/projects/{project_id}/invite",
+            headers=pm.headers,
+            json={"user_id": dev_id, "role_in_project": "DEV"},
+        )
+        for offset in range(0, args.tasks, 1000):
+            items = [
+                {"title": f"Task {i}", "description": "Load test task", "assignee_id": dev_id if i % 2 else None}
+                for i in range(offset, min(args.tasks, offset + 1000))
+            ]
+            response = await client.post(f"/tasks/project/{project_id}/bulk", headers=pm.headers, json={"items": items})
+            response.raise_for_status()
+            for task in response.json()["items"]:
+                pm.task_ids.append(task["id"])
+                if task["assignee_id"] == dev_id:
+                    dev.task_ids.append(task["id"])
+    return Tenant(pm, dev, project_ids)
+
+
+async def seed(client: httpx.AsyncClient, args: argparse.Namespace) -> list[Tenant]:
+    semaphore = asyncio.Semaphore(8)
+
+    async def one(index: int) -> Tenant:
+        async with semaphore:
+            return await seed_tenant(client, index, args)
+
+    return await asyncio.gather(*(one(i) for i in range(args.tenants)))
+
+
+def request_for(operation: str, tenant: Tenant, rng: random.Random, page_size: int) -> tuple:
+    actor = rng.choice((tenant.pm, tenant.dev))
+    if operation == "login":
+        return "POST", "/users/login", {"data": {"username": actor.email, "password": "123"}}
+    if operation == "list_projects":
+        return "GET", "/projects", {"headers": actor.headers}
+    if operation == "list_tasks":
+        project_id = rng.choice(tenant.project_ids)
+        return "GET", f"/tasks/project/{project_id}?limit={page_size}", {"headers": actor.headers}
+    if operation == "create_task":
+        project_id = rng.choice(tenant.project_ids)
+        payload = {"title": "Load created", "description": "Created under load"}
+        return "POST", f"/tasks/project/{project_id}", {"headers": tenant.pm.headers, "json": payload}
+    if operation == "update_status":
+        task_id = rng.choice(actor.task_ids)
+        payload = {"status": rng.choice(STATUSES)}
+        return "PUT", f"/tasks/{task_id}/status", {"headers": actor.headers, "json": payload}
+    raise ValueError(f"Unknown operation {operation}")
+
+
+def percentile(latencies: list[float], q: float) -> float:
+    index = min(len(latencies) - 1, max(0, round(q * len(latencies)) - 1))
+    return round(latencies[index] * 1000, 2)
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    if not latencies:
+        return {"requests": 0, "errors": errors, "rps": 0.0}
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+    }
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    tenants: list[Tenant],
+    mix: dict[str, int],
+    args: argparse.Namespace,
+    duration: float,
+) -> dict:
+    operations, weights = list(mix), list(mix.values())
+    latencies: dict[str, list[float]] = {operation: [] for operation in operations}
+    errors: dict[str, int] = {operation: 0 for operation in operations}
+    deadline = time.perf_counter() + duration
+
+    async def worker(seed_value: int) -> None:
+        rng = random.Random(seed_value)
+        while time.perf_counter() < deadline:
+            operation = rng.choices(operations, weights)[0]
+            method, url, kwargs = request_for(operation, rng.choice(tenants), rng, args.page_size)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                failed = response.status_code >= 400
+            except httpx.TransportError:
+                failed = True
+            latencies[operation].append(time.perf_counter() - started)
+            if failed:
+                errors[operation] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(args.seed + i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "total": summarize([value for values in latencies.values() for value in values], sum(errors.values()), elapsed),
+        "endpoints": {operation: summarize(latencies[operation], errors[operation], elapsed) for operation in operations},
+    }
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = int(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def current_commit() -> str | None:
+    result = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=False
+    )
+    return result.stdout.strip() or None
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Mixed-workload load test against a freshly seeded SQLite app")
+    parser.add_argument("--mode", choices=tuple(MODES), default="sync")
+    parser.add_argument("--tenants", type=int, default=10)
+    parser.add_argument("--projects", type=int, default=5, help="projects per tenant")
+    parser.add_argument("--tasks", type=int, default=200, help="tasks per project")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="comma separated operation=weight pairs")
+    parser.add_argument("--scrypt-n", type=int, default=16384)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="also write the JSON report to this file")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        server = start_server(
+            MODES[args.mode].format(path=Path(tmp) / "load.db"),
+            port,
+            {"PASSWORD_SCRYPT_N": str(args.scrypt_n), "PASSWORD_HASH_MAX_PENDING": str(max(32, args.concurrency))},
+        )
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+                await wait_ready(client)
+                started = time.perf_counter()
+                tenants = await seed(client, args)
+                seed_seconds = time.perf_counter() - started
+                if args.warmup:
+                    await drive(client, tenants, mix, args, args.warmup)
+                result = await drive(client, tenants, mix, args, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+
+    report = {
+        "commit": current_commit(),
+        "config": {
+            "mode": args.mode,
+            "tenants": args.tenants,
+            "projects_per_tenant": args.projects,
+            "tasks_per_project": args.tasks,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "page_size": args.page_size,
+            "scrypt_n": args.scrypt_n,
+            "mix": mix,
+        },
+        "seed_seconds": round(seed_seconds, 2),
+        **result,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        args.output.write_text(text + "\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
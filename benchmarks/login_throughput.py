@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from sync_vs_async import free_port, start_server, wait_ready
+
+SCRYPT_COSTS = (4096, 16384, 32768)
+
+
+def percentile(latencies: list[float], fraction: float) -> float:
+    return round(latencies[max(int(len(latencies) * fraction) - 1, 0)] * 1000, 2)
+
+
+async def drive_logins(client: httpx.AsyncClient, headers: dict, concurrency: int, duration: float) -> dict:
+    credentials = {"username": "bench_login@fusion.com", "password": "123"}
+    latencies = []
+    probes = []
+    statuses: dict[int, int] = {}
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.post("/users/login", data=credentials)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async def probe() -> None:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            (await client.get("/users/me", headers=headers)).raise_for_status()
+            probes.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(probe(), *(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    probes.sort()
+    return {
+        "logins": len(latencies),
+        "statuses": statuses,
+        "rps": round(statuses.get(200, 0) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": percentile(latencies, 0.99),
+        "me_p50_ms": round(statistics.median(probes) * 1000, 2),
+        "me_p99_ms": percentile(probes, 0.99),
+    }
+
+
+async def bench_cost(scrypt_n: int, args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        extra_env = {
+            "PASSWORD_SCRYPT_N": str(scrypt_n),
+            "PASSWORD_HASH_WORKERS": str(args.workers),
+            "PASSWORD_HASH_MAX_PENDING": str(args.concurrency),
+        }
+        server = start_server(f"sqlite:///{Path(tmp) / 'login.db'}", port, extra_env)
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency + 1)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+                await wait_ready(client)
+                await client.post(
+                    "/users/register",
+                    json={"name": "Bench Login", "email": "bench_login@fusion.com", "password": "123"},
+                )
+                response = await client.post(
+                    "/users/login", data={"username": "bench_login@fusion.com", "password": "123"}
+                )
+                headers = {"Authorization": "Bearer " + response.json()["access_token"]}
+                return await drive_logins(client, headers, args.concurrency, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Login throughput at different password hash costs")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    results = {}
+    for scrypt_n in SCRYPT_COSTS:
+        results[f"scrypt-n{scrypt_n}"] = await bench_cost(scrypt_n, args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_level(engine, concurrency: int, checkouts: int, hold_ms: float) -> dict:
+    from sqlalchemy import exc, text
+
+    waits = []
+    waits_lock = threading.Lock()
+    errors = 0
+
+    def worker() -> None:
+        nonlocal errors
+        for _ in range(checkouts):
+            started = time.perf_counter()
+            try:
+                with engine.connect() as connection:
+                    waited = time.perf_counter() - started
+                    connection.execute(text("SELECT 1"))
+                    time.sleep(hold_ms / 1000)
+            except (exc.TimeoutError, exc.DBAPIError):
+                with waits_lock:
+                    errors += 1
+                continue
+            with waits_lock:
+                waits.append(waited * 1000)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    waits.sort()
+    return {
+        "concurrency": concurrency,
+        "checkouts": len(waits),
+        "errors": errors,
+        "checkouts_per_sec": round(len(waits) / elapsed, 1),
+        "wait_p50_ms": round(percentile(waits, 0.50), 3),
+        "wait_p95_ms": round(percentile(waits, 0.95), 3),
+        "wait_p99_ms": round(percentile(waits, 0.99), 3),
+        "wait_max_ms": round(waits[-1], 3) if waits else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure pool checkout latency under load")
+    parser.add_argument("--levels", default="1,4,16,32,64")
+    parser.add_argument("--checkouts", type=int, default=200)
+    parser.add_argument("--hold-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.setdefault("DATABASE_URL", f"sqlite:///{Path(tmp) / 'pool.db'}")
+        from database.db import engine
+        from database.pool_metrics import pool_status
+
+        results = [
+            run_level(engine, int(level), args.checkouts, args.hold_ms)
+            for level in args.levels.split(",")
+        ]
+        print(json.dumps({"levels": results, "pool": pool_status(engine.pool)}, indent=2))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
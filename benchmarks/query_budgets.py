@@ -0,0 +1,228 @@
+import argparse
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{Path(_tmp.name) / 'budgets.db'}")
+os.environ.setdefault("AUTO_MIGRATE", "1")
+os.environ.setdefault("PASSWORD_SCRYPT_N", "1024")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("TASK_ACTIVITY_MODE", "sync")
+os.environ.setdefault("JOB_WORKERS", "0")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from database.db import SessionLocal, engine
+from jobs.runner import enqueue_job
+from main import app
+from monitoring.metrics import count_queries
+
+SIZES = (10, 100, 1000)
+
+
+class Form(dict):
+    pass
+
+
+# (name, role, method, path, json or Form payload, SQL statement budget with a warm principal cache)
+# Every non-GET request must also commit exactly one transaction.
+# Task writes spend one extra UPDATE on SQLite to take the write lock before reading the rows they change.
+BUDGETS = (
+    (
+        "register_user",
+        None,
+        "POST",
+        "/users/register",
+        {"name": "New", "email": "budget_new_{size}@fusion.com", "password": "123"},
+        3,
+    ),
+    (
+        "create_user",
+        "admin",
+        "POST",
+        "/users/users",
+        {"name": "New", "email": "budget_new_dev_{size}@fusion.com", "password": "123", "role": "DEV"},
+        2,
+    ),
+    ("login", None, "POST", "/users/login", Form(username="budget_pm_{size}@fusion.com", password="123"), 1),
+    ("get_me", "pm", "GET", "/users/me", None, 0),
+    ("list_users", "admin", "GET", "/users", None, 1),
+    ("list_projects", "pm", "GET", "/projects", None, 1),
+    ("list_projects_member", "dev", "GET", "/projects", None, 1),
+    ("project_stats", "pm", "GET", "/projects/stats", None, 3),
+    ("list_tasks", "pm", "GET", "/tasks/project/{project_id}", None, 2),
+    ("list_tasks_filtered", "pm", "GET", "/tasks/project/{project_id}?status=OPEN", None, 2),
+    ("search_tasks", "pm", "GET", "/tasks/search?q=task", None, 1),
+    ("search_tasks_admin", "admin", "GET", "/tasks/search?q=task", None, 1),
+    ("create_project", "pm", "POST", "/projects", {"name": "Budget project"}, 3),
+    ("update_project", "pm", "PUT", "/projects/{project_id}", {"name": "Renamed"}, 2),
+    ("create_task", "pm", "POST", "/tasks/project/{project_id}", {"title": "Budget task"}, 5),
+    ("bulk_create_tasks", "pm", "POST", "/tasks/project/{project_id}/bulk", {"items": [{"title": "B"}] * 50}, 5),
+    ("update_task", "pm", "PUT", "/tasks/{task_id}", {"title": "Edited", "assignee_id": None}, 5),
+    ("update_task_status", "pm", "PUT", "/tasks/{task_id}/status", {"status": "IN_PROGRESS"}, 6),
+    (
+        "bulk_update_task_status",
+        "pm",
+        "PUT",
+        "/tasks/project/{project_id}/bulk/status",
+        {"items": [{"id": "{task_id}", "status": "DONE"}]},
+        7,
+    ),
+    (
+        "bulk_update_task_assignee",
+        "pm",
+        "PUT",
+        "/tasks/project/{project_id}/bulk/assignee",
+        {"items": [{"id": "{task_id}", "assignee_id": "{dev_id}"}]},
+        8,
+    ),
+    ("invite_member", "pm", "POST", "/projects/{project_id}/invite", {"user_id": "{qa_id}", "role_in_project": "QA"}, 4),
+    ("update_member_role", "pm", "PUT", "/projects/{project_id}/members/{qa_id}/role", {"role_in_project": "BA"}, 4),
+    ("export_tenant", "admin", "GET", "/tenants/me/export", None, 2),
+    ("task_history", "pm", "GET", "/tasks/{task_id}/history", None, 2),
+    ("get_job", "pm", "GET", "/jobs/{job_id}", None, 1),
+    ("get_project_deletion", "pm", "GET", "/projects/deletions/{job_id}", None, 1),
+    ("delete_task", "pm", "DELETE", "/tasks/{task_id}", None, 6),
+    ("delete_user", "admin", "DELETE", "/users/users/{qa_id}", None, 7),
+    ("delete_project", "pm", "DELETE", "/projects/{scratch_project_id}", None, 3),
+)
+
+
+@contextmanager
+def count_commits(engine):
+    commits = []
+
+    def record(conn) -> None:
+        commits.append(conn)
+
+    event.listen(engine, "commit", record)
+    try:
+        yield commits
+    finally:
+        event.remove(engine, "commit", record)
+
+
+def login(client: TestClient, email: str) -> dict:
+    response = client.post("/users/login", data={"username": email, "password": "123"})
+    return {"Authorization": "Bearer " + response.json()["access_token"]}
+
+
+def seed_tenant(client: TestClient, size: int) -> dict:
+    admin_email = f"budget_admin_{size}@fusion.com"
+    client.post("/users/register", json={"name": "Budget Admin", "email": admin_email, "password": "123"})
+    headers = {"admin": login(client, admin_email)}
+    ids = {}
+    for role in ("PM", "DEV", "QA"):
+        email = f"budget_{role.lower()}_{size}@fusion.com"
+        user = client.post(
+            "/users/users",
+            headers=headers["admin"],
+            json={"name": role, "email": email, "password": "123", "role": role},
+        ).json()
+        headers[role.lower()] = login(client, email)
+        ids[f"{role.lower()}_id"] = user["id"]
+        tenant_id = user["tenant_id"]
+
+    project_id = client.post("/projects", headers=headers["pm"], json={"name": "Budget"}).json()["id"]
+    scratch_project_id = client.post("/projects", headers=headers["pm"], json={"name": "Scratch"}).json()["id"]
+    client.post(
+        f"/projects/{project_id}/invite",
+        headers=headers["pm"],
+        json={"user_id": ids["dev_id"], "role_in_project": "DEV"},
+    )
+    for target in (project_id, scratch_project_id):
+        for offset in range(0, size, 1000):
+            items = [
+                {"title": f"Task {i}", "assignee_id": ids["dev_id"] if i % 2 else None}
+                for i in range(offset, min(size, offset + 1000))
+            ]
+            client.post(f"/tasks/project/{target}/bulk", headers=headers["pm"], json={"items": items})
+
+    task_id = client.post(
+        f"/tasks/project/{project_id}", headers=headers["pm"], json={"title": "Target"}
+    ).json()["id"]
+    with SessionLocal() as db:
+        job_id = enqueue_job(
+            db,
+            "project.purge",
+            {"project_id": scratch_project_id, "tenant_id": tenant_id},
+            tenant_id=tenant_id,
+            created_by=ids["pm_id"],
+            total=size,
+        ).id
+        db.commit()
+    for role_headers in headers.values():
+        client.get("/users/me", headers=role_headers)
+    return {
+        "headers": headers,
+        "values": {
+            "size": size,
+            "project_id": project_id,
+            "scratch_project_id": scratch_project_id,
+            "task_id": task_id,
+            "job_id": job_id,
+            **ids,
+        },
+    }
+
+
+def fill(value, values: dict):
+    if isinstance(value, str):
+        if value.startswith("{") and value.endswith("}") and value[1:-1] in values:
+            return values[value[1:-1]]
+        return value.format(**values)
+    if isinstance(value, list):
+        return [fill(item, values) for item in value]
+    if isinstance(value, dict):
+        return {key: fill(item, values) for key, item in value.items()}
+    return value
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fail when an endpoint exceeds its SQL statement budget")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    failures = []
+    counts: dict[str, list[int]] = {}
+    with TestClient(app) as client:
+        for size in SIZES:
+            tenant = seed_tenant(client, size)
+            for name, role, method, path, payload, budget in BUDGETS:
+                url = fill(path, tenant["values"])
+                body = {"data" if isinstance(payload, Form) else "json": fill(payload, tenant["values"])}
+                with count_queries(engine) as statements, count_commits(engine) as commits:
+                    response = client.request(method, url, headers=tenant["headers"].get(role, {}), **body)
+                if response.status_code >= 400:
+                    failures.append(f"{name} (size {size}) returned {response.status_code}: {response.text}")
+                counts.setdefault(name, []).append(len(statements))
+                if len(statements) > budget:
+                    failures.append(f"{name} (size {size}) issued {len(statements)} statements, budget {budget}")
+                if len(commits) != (method != "GET"):
+                    failures.append(f"{name} (size {size}) committed {len(commits)} transactions")
+                if args.verbose:
+                    for statement in statements:
+                        print(f"    [{name}] {' '.join(statement.split())[:120]}")
+
+    for name, observed in counts.items():
+        if len(set(observed)) > 1:
+            failures.append(f"{name} statement count varies with tenant size: {observed}")
+
+    width = max(len(name) for name in counts)
+    print(f"{'endpoint':{width}}  budget  " + "  ".join(f"n={size:<6}" for size in SIZES))
+    for name, role, method, path, payload, budget in BUDGETS:
+        print(f"{name:{width}}  {budget:6}  " + "  ".join(f"{count:<8}" for count in counts[name]))
+
+    if failures:
+        print()
+        print("\n".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
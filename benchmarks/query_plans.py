@@ -0,0 +1,120 @@
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import delete, select, text, update
+
+from database.db import Base, engine
+from database.models.project import Project, ProjectMember
+from database.models.task import Task
+from database.models.user import User
+from database.pagination import PageParams, encode_cursor, page_statement
+from routers.projects import visible_projects
+from routers.tasks import filter_tasks, project_tasks_by_id, tenant_user_ids
+from routers.tenants import export_statements
+from routers.users import visible_users
+from security.authorization import project_access_statement, task_access_statement
+
+FULL_SCAN_MARKERS = ("SCAN ", "USE TEMP B-TREE")
+
+
+class RecordingSession:
+    def __init__(self) -> None:
+        self.statements = []
+
+    def get_bind(self):
+        return engine
+
+    def execute(self, stmt, **kwargs):
+        return None
+
+    def scalars(self, stmt):
+        self.statements.append(stmt)
+        return []
+
+
+def page(after_id: int | None) -> PageParams:
+    return PageParams(limit=50, after=encode_cursor(after_id) if after_id else None)
+
+
+def hot_path_queries() -> dict:
+    pm = User(id=1, tenant_id=1, role="PM")
+    dev = User(id=2, tenant_id=1, role="DEV")
+    tenant_admin = User(id=3, tenant_id=1, role="TENANT_ADMIN")
+    system_admin = User(id=4, tenant_id=0, role="SYSTEM_ADMIN")
+
+    queries = {
+        "project_access": project_access_statement(1, pm),
+        "project_access_with_target": project_access_statement(1, pm, target_user_id=2),
+        "task_access": task_access_statement(1, pm),
+        "get_current_user": select(User).where(User.id == 1),
+        "login_by_email": select(User).where(User.email == "pm@fusion.com"),
+        "delete_user_memberships": delete(ProjectMember).where(ProjectMember.user_id == 2),
+        "delete_user_unassign_tasks": update(Task).where(Task.assignee_id == 2).values(assignee_id=None),
+        "delete_project_memberships": delete(ProjectMember).where(ProjectMember.project_id == 1),
+        "delete_project_tasks": delete(Task).where(Task.project_id == 1),
+    }
+    for after_id in (None, 100):
+        suffix = "first_page" if after_id is None else "next_page"
+        queries[f"list_tasks_{suffix}"] = page_statement(
+            filter_tasks(1, None, None), Task.id, page(after_id)
+        )
+        queries[f"list_tasks_by_status_{suffix}"] = page_statement(
+            filter_tasks(1, "OPEN", None), Task.id, page(after_id)
+        )
+        queries[f"list_tasks_by_assignee_{suffix}"] = page_statement(
+            filter_tasks(1, None, 2), Task.id, page(after_id)
+        )
+        queries[f"list_projects_tenant_{suffix}"] = page_statement(
+            visible_projects(pm), Project.id, page(after_id)
+        )
+        queries[f"list_projects_member_{suffix}"] = page_statement(
+            visible_projects(dev), Project.id, page(after_id)
+        )
+        queries[f"list_users_tenant_{suffix}"] = page_statement(
+            visible_users(tenant_admin, None), User.id, page(after_id)
+        )
+        queries[f"list_users_system_by_role_{suffix}"] = page_statement(
+            visible_users(system_admin, "PM"), User.id, page(after_id)
+        )
+
+    recorder = RecordingSession()
+    tenant_user_ids(recorder, 1, {1, 2, 3})
+    project_tasks_by_id(recorder, 1, {1, 2, 3})
+    queries["bulk_tenant_users"], queries["bulk_project_tasks"] = recorder.statements
+
+    for name, stmt in export_statements(1).items():
+        queries[f"export_{name}"] = stmt
+    return queries
+
+
+def explain(connection, stmt) -> list[str]:
+    compiled = stmt.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+    rows = connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).fetchall()
+    return [row[-1] for row in rows]
+
+
+def main() -> None:
+    Base.metadata.create_all(engine)
+
+    failures = 0
+    with engine.connect() as connection:
+        for name, stmt in hot_path_queries().items():
+            plan = explain(connection, stmt)
+            bad = [step for step in plan if step.startswith(FULL_SCAN_MARKERS)]
+            status = "FAIL" if bad else "ok"
+            failures += bool(bad)
+            print(f"{status:4} {name}")
+            for step in plan:
+                print(f"       {step}")
+
+    if failures:
+        print(f"{failures} hot-path queries fall back to a full scan or temp sort")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
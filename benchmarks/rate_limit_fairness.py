@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from load_test import percentile
+from sync_vs_async import free_port, start_server, wait_ready
+
+LIMITS = {
+    "TENANT_RATE_PER_SECOND": "50",
+    "TENANT_BURST": "50",
+    "TENANT_MAX_CONCURRENCY": "4",
+}
+
+
+async def seed_tenant(client: httpx.AsyncClient, name: str, tasks: int) -> tuple[dict, int]:
+    email = f"{name}@fusion.com"
+    await client.post("/users/register", json={"name": name, "email": email, "password": "123"})
+    response = await client.post("/users/login", data={"username": email, "password": "123"})
+    headers = {"Authorization": "Bearer " + response.json()["access_token"]}
+    project_id = (await client.post("/projects", headers=headers, json={"name": name})).json()["id"]
+    for offset in range(0, tasks, 5000):
+        items = [{"title": f"Task {i}", "description": "Fairness task"} for i in range(offset, min(tasks, offset + 5000))]
+        await client.post(f"/tasks/project/{project_id}/bulk", headers=headers, json={"items": items})
+    return headers, project_id
+
+
+async def run_workers(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: dict,
+    workers: int,
+    think: float,
+    backoff: float,
+    deadline: float,
+) -> dict:
+    latencies = []
+    statuses: dict[int, int] = {}
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.get(url, headers=headers)
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 429:
+                await asyncio.sleep(backoff)
+            elif think:
+                await asyncio.sleep(think)
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    latencies.sort()
+    return {
+        "statuses": statuses,
+        "p50_ms": percentile(latencies, 0.50) if latencies else None,
+        "p99_ms": percentile(latencies, 0.99) if latencies else None,
+    }
+
+
+async def bench(limited: bool, args: argparse.Namespace) -> dict:
+    extra_env = {"PASSWORD_SCRYPT_N": "1024", "RATE_LIMIT_ENABLED": str(limited).lower(), **LIMITS}
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        server = start_server(f"sqlite:///{Path(tmp) / 'fairness.db'}", port, extra_env)
+        try:
+            limits = httpx.Limits(max_connections=args.flood_workers + args.victim_workers)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+                await wait_ready(client)
+                victim_headers, victim_project = await seed_tenant(client, "victim", args.tasks)
+                flood_headers, _ = await seed_tenant(client, "flood", args.flood_tasks)
+                victim_url = f"/tasks/project/{victim_project}?limit={args.page_size}"
+
+                deadline = time.perf_counter() + args.duration
+                quiet = await run_workers(
+                    client, victim_url, victim_headers, args.victim_workers, args.think, 0.0, deadline
+                )
+
+                deadline = time.perf_counter() + args.duration
+                flooded, flood = await asyncio.gather(
+                    run_workers(
+                        client, victim_url, victim_headers, args.victim_workers, args.think, 0.0, deadline
+                    ),
+                    run_workers(
+                        client, "/tenants/me/export", flood_headers, args.flood_workers, 0.0, args.backoff, deadline
+                    ),
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+    return {"victim_quiet": quiet, "victim_during_flood": flooded, "flood": flood}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Check that one tenant's flood does not raise another tenant's p99")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--victim-workers", type=int, default=4)
+    parser.add_argument("--flood-workers", type=int, default=16)
+    parser.add_argument("--flood-tasks", type=int, default=5000, help="tasks in the flooding tenant's export")
+    parser.add_argument("--backoff", type=float, default=0.05, help="flood pause after a 429, ignoring Retry-After")
+    parser.add_argument("--think", type=float, default=0.1, help="victim pause between requests")
+    parser.add_argument("--max-p99-ratio", type=float, default=4.0)
+    args = parser.parse_args()
+
+    results = {"limits": LIMITS}
+    for limited in (False, True):
+        results["limited" if limited else "unlimited"] = await bench(limited, args)
+    limited = results["limited"]
+    ratio = limited["victim_during_flood"]["p99_ms"] / limited["victim_quiet"]["p99_ms"]
+    results["limited_p99_ratio"] = round(ratio, 2)
+    print(json.dumps(results, indent=2))
+    if ratio > args.max_p99_ratio or limited["victim_during_flood"]["statuses"].get(429):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
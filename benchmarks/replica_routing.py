@@ -0,0 +1,170 @@
+import argparse
+import asyncio
+import json
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+import httpx
+
+from sync_vs_async import free_port, start_server, wait_ready
+
+
+def replicate(primary: Path, replicas: list[Path]) -> None:
+    source = sqlite3.connect(primary)
+    try:
+        for replica in replicas:
+            target = sqlite3.connect(replica, timeout=30)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+    finally:
+        source.close()
+
+
+async def replicator(primary: Path, replicas: list[Path], running: asyncio.Event, interval: float) -> None:
+    while True:
+        await running.wait()
+        await asyncio.to_thread(replicate, primary, replicas)
+        await asyncio.sleep(interval)
+
+
+def metric_values(text: str, name: str) -> dict[str, float]:
+    values = {}
+    for line in text.splitlines():
+        if line.startswith((name + "{", name + " ")):
+            key, value = line.rsplit(" ", 1)
+            values[key[len(name):]] = float(value)
+    return values
+
+
+async def wait_for(client: httpx.AsyncClient, name: str, expected: float, timeout: float = 15.0) -> bool:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        values = metric_values((await client.get("/metrics")).text, name).values()
+        if values and all(value == expected for value in values):
+            return True
+        await asyncio.sleep(0.1)
+    return False
+
+
+async def task_titles(client: httpx.AsyncClient, headers: dict, project_id: int) -> set[str] | None:
+    response = await client.get(f"/tasks/project/{project_id}", headers=headers)
+    if response.status_code != 200:
+        return None
+    return {task["title"] for task in response.json()["items"]}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Exercise replica routing with SQLite files as primary and replicas")
+    parser.add_argument("--replicas", type=int, default=2)
+    parser.add_argument("--max-lag", type=float, default=2.0)
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--scheme", default="sqlite", help="sqlite or sqlite+aiosqlite for the async handlers")
+    args = parser.parse_args()
+
+    checks = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        primary = Path(tmp) / "primary.db"
+        replicas = [Path(tmp) / f"replica{i}.db" for i in range(1, args.replicas + 1)]
+        env = {
+            "PASSWORD_SCRYPT_N": "1024",
+            "DATABASE_REPLICA_URLS": ",".join(f"{args.scheme}:///{replica}" for replica in replicas),
+            "REPLICA_MAX_LAG_SECONDS": str(args.max_lag),
+            "REPLICA_CHECK_INTERVAL_SECONDS": "0.2",
+            "READ_YOUR_WRITES_SECONDS": str(args.max_lag),
+        }
+        port, other_port = free_port(), free_port()
+        server = start_server(f"{args.scheme}:///{primary}", port, env)
+        other_server = start_server(f"{args.scheme}:///{primary}", other_port, env)
+        running = asyncio.Event()
+        running.set()
+        replication = asyncio.create_task(replicator(primary, replicas, running, 0.2))
+        try:
+            async with (
+                httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client,
+                httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as reader_client,
+                httpx.AsyncClient(base_url=f"http://127.0.0.1:{other_port}", timeout=60) as other_worker,
+            ):
+                await wait_ready(client)
+                await wait_ready(other_worker)
+                await client.post(
+                    "/users/register",
+                    json={"name": "Writer", "email": "writer@fusion.com", "password": "123"},
+                )
+                response = await client.post("/users/login", data={"username": "writer@fusion.com", "password": "123"})
+                writer = {"Authorization": "Bearer " + response.json()["access_token"]}
+                reader_id = (
+                    await client.post(
+                        "/users/users",
+                        headers=writer,
+                        json={"name": "Reader", "email": "reader@fusion.com", "password": "123", "role": "DEV"},
+                    )
+                ).json()["id"]
+                response = await client.post("/users/login", data={"username": "reader@fusion.com", "password": "123"})
+                reader = {"Authorization": "Bearer " + response.json()["access_token"]}
+                project_id = (await client.post("/projects", headers=writer, json={"name": "Replicated"})).json()["id"]
+                await client.post(
+                    f"/projects/{project_id}/invite",
+                    headers=writer,
+                    json={"user_id": reader_id, "role_in_project": "DEV"},
+                )
+
+                checks["replicas_healthy"] = await wait_for(client, "db_replica_healthy", 1)
+                await asyncio.sleep(args.max_lag + 0.5)
+                for _ in range(args.reads):
+                    await reader_client.get(f"/tasks/project/{project_id}", headers=reader)
+                reads = metric_values((await client.get("/metrics")).text, "db_replica_reads_total")
+                checks["reads_spread_across_replicas"] = len(reads) == args.replicas and min(reads.values()) > 0
+
+                running.clear()
+                await asyncio.sleep(0.5)
+                await client.post(f"/tasks/project/{project_id}", headers=writer, json={"title": "Fresh"})
+                checks["read_your_writes"] = "Fresh" in (await task_titles(client, writer, project_id) or set())
+                other_worker.cookies = client.cookies
+                checks["read_your_writes_across_workers"] = "Fresh" in (
+                    await task_titles(other_worker, writer, project_id) or set()
+                )
+                checks["other_caller_reads_replica"] = (await task_titles(reader_client, reader, project_id)) == set()
+
+                checks["lagging_replicas_dropped"] = await wait_for(client, "db_replica_healthy", 0)
+                checks["lag_falls_back_to_primary"] = "Fresh" in (
+                    await task_titles(reader_client, reader, project_id) or set()
+                )
+
+                running.set()
+                checks["replicas_recover"] = await wait_for(client, "db_replica_healthy", 1)
+                checks["replica_caught_up"] = "Fresh" in (await task_titles(reader_client, reader, project_id) or set())
+
+                running.clear()
+                await asyncio.sleep(0.5)
+                for replica in replicas:
+                    replica.write_bytes(b"not a database" * 1024)
+                statuses = []
+                for _ in range(20):
+                    response = await reader_client.get(f"/tasks/project/{project_id}", headers=reader)
+                    statuses.append(response.status_code)
+                checks["failed_replicas_fall_back"] = all(status == 200 for status in statuses)
+                checks["failed_replicas_dropped"] = await wait_for(client, "db_replica_healthy", 0)
+                metrics = (await client.get("/metrics")).text
+        finally:
+            replication.cancel()
+            for process in (server, other_server):
+                process.terminate()
+                process.wait()
+
+    result = {
+        "checks": checks,
+        "statuses_after_failure": statuses,
+        "replica_reads": metric_values(metrics, "db_replica_reads_total"),
+        "primary_reads": metric_values(metrics, "db_replica_primary_reads_total"),
+    }
+    print(json.dumps(result, indent=2))
+    if not all(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,163 @@
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from sync_vs_async import free_port, start_server, wait_ready
+
+VOCABULARY_SIZE = 5000
+PROJECTS = 100
+
+
+def vocabulary(rng: random.Random) -> list[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(4, 9))))
+    return sorted(words)
+
+
+def zipf_weights(size: int) -> list[float]:
+    return list(itertools.accumulate(1 / rank for rank in range(1, size + 1)))
+
+
+def sentence(rng: random.Random, words: list[str], weights: list[float], length: int) -> str:
+    return " ".join(rng.choices(words, cum_weights=weights, k=length))
+
+
+def seed_rows(db_path: Path, tenant_id: int, owner_id: int, rows: int, words: list[str]) -> list[int]:
+    rng = random.Random(7)
+    weights = zipf_weights(len(words))
+    connection = sqlite3.connect(db_path)
+    project_ids = []
+    for i in range(PROJECTS):
+        cursor = connection.execute(
+            "INSERT INTO projects (name, tenant_id, created_by) VALUES (?, ?, ?)",
+            (f"Search {i}", tenant_id, owner_id),
+        )
+        project_ids.append(cursor.lastrowid)
+    batch = 50_000
+    for offset in range(0, rows, batch):
+        connection.executemany(
+            "INSERT INTO tasks (title, description, status, project_id) VALUES (?, ?, ?, ?)",
+            (
+                (
+                    sentence(rng, words, weights, rng.randint(3, 8)),
+                    sentence(rng, words, weights, rng.randint(10, 30)),
+                    "OPEN",
+                    project_ids[i % PROJECTS],
+                )
+                for i in range(offset, min(rows, offset + batch))
+            ),
+        )
+    connection.commit()
+    connection.close()
+    return project_ids
+
+
+def like_scan_ms(db_path: Path, tenant_id: int, terms: list[str]) -> float:
+    connection = sqlite3.connect(db_path)
+    conditions = " AND ".join("(tasks.title LIKE ? OR tasks.description LIKE ?)" for _ in terms)
+    parameters = [pattern for term in terms for pattern in (f"%{term}%", f"%{term}%")]
+    started = time.perf_counter()
+    connection.execute(
+        "SELECT tasks.* FROM tasks JOIN projects ON projects.id = tasks.project_id "
+        f"WHERE projects.tenant_id = ? AND {conditions} ORDER BY tasks.id LIMIT 51",
+        [tenant_id, *parameters],
+    ).fetchall()
+    elapsed = (time.perf_counter() - started) * 1000
+    connection.close()
+    return elapsed
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Time GET /tasks/search against a LIKE scan")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--like-queries", type=int, default=5)
+    parser.add_argument("--p95-ceiling-ms", type=float, default=250.0)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    words = vocabulary(rng)
+    queries = [rng.sample(words, rng.randint(1, 2)) for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "search.db"
+        port = free_port()
+        server = start_server(f"sqlite:///{db_path}", port, {"PASSWORD_SCRYPT_N": "1024"})
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=600) as client:
+                await wait_ready(client)
+                user = (
+                    await client.post(
+                        "/users/register",
+                        json={"name": "Search Admin", "email": "search@fusion.com", "password": "123"},
+                    )
+                ).json()
+                started = time.perf_counter()
+                seed_rows(db_path, user["tenant_id"], user["id"], args.rows, words)
+                seed_seconds = time.perf_counter() - started
+                response = await client.post(
+                    "/users/login",
+                    data={"username": "search@fusion.com", "password": "123"},
+                )
+                headers = {"Authorization": "Bearer " + response.json()["access_token"]}
+
+                async def search(terms: list[str]) -> tuple[float, int]:
+                    started = time.perf_counter()
+                    response = await client.get(
+                        "/tasks/search", params={"q": " ".join(terms)}, headers=headers
+                    )
+                    elapsed = (time.perf_counter() - started) * 1000
+                    response.raise_for_status()
+                    return elapsed, len(response.json()["items"])
+
+                latencies = []
+                hits = []
+                for terms in queries:
+                    elapsed, count = await search(terms)
+                    latencies.append(elapsed)
+                    hits.append(count)
+                head_term_ms, _ = await search(words[:1])
+        finally:
+            server.terminate()
+            server.wait()
+
+        like_latencies = [
+            like_scan_ms(db_path, user["tenant_id"], terms) for terms in queries[: args.like_queries]
+        ]
+
+    result = {
+        "rows_seeded": args.rows,
+        "seed_seconds": round(seed_seconds, 1),
+        "queries": len(queries),
+        "queries_with_hits": sum(1 for count in hits if count),
+        "search_p50_ms": round(statistics.median(latencies), 2),
+        "search_p95_ms": round(percentile(latencies, 0.95), 2),
+        "search_max_ms": round(max(latencies), 2),
+        "head_term_ms": round(head_term_ms, 2),
+        "like_scan_p50_ms": round(statistics.median(like_latencies), 2),
+        "p95_ceiling_ms": args.p95_ceiling_ms,
+    }
+    print(json.dumps(result, indent=2))
+    if result["search_p95_ms"] > args.p95_ceiling_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
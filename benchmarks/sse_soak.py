@@ -0,0 +1,118 @@
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from export_memory import rss_mb
+from sync_vs_async import free_port, start_server, wait_ready
+
+
+async def open_stream(port: int, token: str) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        (
+            "GET /events/stream HTTP/1.1\r\n"
+            "Host: 127.0.0.1\r\n"
+            f"Authorization: Bearer {token}\r\n"
+            "Accept: text/event-stream\r\n\r\n"
+        ).encode("ascii")
+    )
+    await writer.drain()
+    headers = await reader.readuntil(b"\r\n\r\n")
+    if not headers.startswith(b"HTTP/1.1 200"):
+        raise RuntimeError(headers.decode("latin-1"))
+    while b"retry:" not in await reader.readline():
+        pass
+    return reader, writer
+
+
+async def wait_for_event(reader: asyncio.StreamReader, event_type: str) -> None:
+    marker = f"event: {event_type}".encode("ascii")
+    while marker not in await reader.readline():
+        pass
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Hold many idle SSE subscribers and measure server memory")
+    parser.add_argument("--subscribers", type=int, default=10_000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--idle-seconds", type=float, default=30.0)
+    parser.add_argument("--max-kb-per-connection", type=float, default=64.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        server = start_server(
+            f"sqlite:///{Path(tmp) / 'soak.db'}",
+            port,
+            {"PASSWORD_SCRYPT_N": "1024", "EVENTS_KEEPALIVE_SECONDS": "10"},
+        )
+        streams = []
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120) as client:
+                await wait_ready(client)
+                await client.post(
+                    "/users/register",
+                    json={"name": "Soak Admin", "email": "soak@fusion.com", "password": "123"},
+                )
+                response = await client.post(
+                    "/users/login",
+                    data={"username": "soak@fusion.com", "password": "123"},
+                )
+                token = response.json()["access_token"]
+                headers = {"Authorization": f"Bearer {token}"}
+                project_id = (await client.post("/projects", headers=headers, json={"name": "Soak"})).json()["id"]
+
+                warmup = await open_stream(port, token)
+                warmup[1].close()
+                await asyncio.sleep(0.5)
+                baseline = rss_mb(server.pid)
+
+                started = time.perf_counter()
+                for offset in range(0, args.subscribers, args.batch):
+                    count = min(args.batch, args.subscribers - offset)
+                    streams.extend(await asyncio.gather(*(open_stream(port, token) for _ in range(count))))
+                connect_seconds = time.perf_counter() - started
+
+                await asyncio.sleep(args.idle_seconds)
+                connected = rss_mb(server.pid)
+                metrics = (await client.get("/metrics")).text
+                subscribers = next(
+                    int(line.split()[1]) for line in metrics.splitlines() if line.startswith("events_subscribers ")
+                )
+
+                started = time.perf_counter()
+                await client.post(f"/tasks/project/{project_id}", headers=headers, json={"title": "Fan-out"})
+                await asyncio.gather(*(wait_for_event(reader, "task.created") for reader, _ in streams))
+                fan_out_seconds = time.perf_counter() - started
+        finally:
+            for _, writer in streams:
+                writer.close()
+            await asyncio.gather(*(writer.wait_closed() for _, writer in streams), return_exceptions=True)
+            server.terminate()
+            server.wait()
+
+    per_connection_kb = (connected - baseline) * 1024 / args.subscribers
+    result = {
+        "subscribers": args.subscribers,
+        "server_subscribers": subscribers,
+        "connect_seconds": round(connect_seconds, 2),
+        "idle_seconds": args.idle_seconds,
+        "rss_baseline_mb": round(baseline, 1),
+        "rss_connected_mb": round(connected, 1),
+        "kb_per_connection": round(per_connection_kb, 1),
+        "fan_out_seconds": round(fan_out_seconds, 3),
+        "max_kb_per_connection": args.max_kb_per_connection,
+    }
+    print(json.dumps(result, indent=2))
+    if subscribers != args.subscribers or per_connection_kb > args.max_kb_per_connection:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
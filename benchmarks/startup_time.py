@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+WORKER_BOOT = """
+import asyncio
+import json
+import time
+
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+
+async def lifespan() -> None:
+    async with main.app.router.lifespan_context(main.app):
+        pass
+
+
+asyncio.run(lifespan())
+finished = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1000, "lifespan_ms": (finished - imported) * 1000}))
+"""
+
+
+def summarize(values: list[float]) -> dict:
+    values = sorted(values)
+    return {
+        "mean_ms": round(statistics.mean(values), 1),
+        "p50_ms": round(statistics.median(values), 1),
+        "max_ms": round(values[-1], 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure per-worker import and lifespan startup time")
+    parser.add_argument("--workers", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{Path(tmp) / 'startup.db'}")
+        subprocess.run(
+            [sys.executable, "-m", "database.migrations"],
+            cwd=ROOT,
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        samples = []
+        for _ in range(args.workers):
+            output = subprocess.run(
+                [sys.executable, "-c", WORKER_BOOT],
+                cwd=ROOT,
+                env=env,
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(
+        json.dumps(
+            {
+                "workers": args.workers,
+                "import": summarize([sample["import_ms"] for sample in samples]),
+                "lifespan": summarize([sample["lifespan_ms"] for sample in samples]),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MODES = {
+    "sync": "sqlite:///{path}",
+    "async": "sqlite+aiosqlite:///{path}",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(database_url: str, port: int, extra_env: dict | None = None) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=database_url, RATE_LIMIT_ENABLED="false")
+    env.update(extra_env or {})
+    subprocess.run(
+        [sys.executable, "-m", "database.migrations"],
+        cwd=ROOT,
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient) -> None:
+    for _ in range(100):
+        try:
+            await client.get("/docs")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("Server did not start")
+
+
+async def seed(client: httpx.AsyncClient, tasks: int) -> tuple[str, int]:
+    await client.post(
+        "/users/register",
+        json={"name": "Bench Admin", "email": "bench_admin@fusion.com", "password": "123"},
+    )
+    response = await client.post(
+        "/users/login",
+        data={"username": "bench_admin@fusion.com", "password": "123"},
+    )
+    admin_headers = {"Authorization": "Bearer " + response.json()["access_token"]}
+    await client.post(
+        "/users/users",
+        headers=admin_headers,
+        json={"name": "Bench PM", "email": "bench_pm@fusion.com", "password": "123", "role": "PM"},
+    )
+    response = await client.post(
+        "/users/login",
+        data={"username": "bench_pm@fusion.com", "password": "123"},
+    )
+    token = response.json()["access_token"]
+    headers = {"Authorization": "Bearer " + token}
+    project = (await client.post("/projects", headers=headers, json={"name": "Bench"})).json()
+    for i in range(tasks):
+        await client.post(
+            f"/tasks/project/{project['id']}",
+            headers=headers,
+            json={"title": f"Task {i}", "description": "Benchmark task"},
+        )
+    return token, project["id"]
+
+
+async def drive(client: httpx.AsyncClient, url: str, token: str, concurrency: int, duration: float) -> dict:
+    headers = {"Authorization": "Bearer " + token}
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.get(url, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+async def bench_mode(mode: str, args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        server = start_server(MODES[mode].format(path=Path(tmp) / "bench.db"), port)
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as client:
+                await wait_ready(client)
+                token, project_id = await seed(client, args.tasks)
+                url = f"/tasks/project/{project_id}?limit={args.page_size}"
+                await drive(client, url, token, args.concurrency, 1.0)
+                return await drive(client, url, token, args.concurrency, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare sync and async read paths")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    results = {}
+    for mode in MODES:
+        results[mode] = await bench_mode(mode, args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
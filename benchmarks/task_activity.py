@@ -0,0 +1,117 @@
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from load_test import summarize
+from replica_routing import metric_values
+from sync_vs_async import free_port, start_server, wait_ready
+
+MODES = ("off", "sync", "write_behind")
+STATUSES = ("IN_PROGRESS", "REVIEW", "DONE", "OPEN")
+
+
+async def seed(client: httpx.AsyncClient, tasks: int) -> tuple[dict, list[int]]:
+    await client.post(
+        "/users/register",
+        json={"name": "Activity Admin", "email": "activity_admin@fusion.com", "password": "123"},
+    )
+    response = await client.post("/users/login", data={"username": "activity_admin@fusion.com", "password": "123"})
+    headers = {"Authorization": "Bearer " + response.json()["access_token"]}
+    project_id = (await client.post("/projects", headers=headers, json={"name": "Activity"})).json()["id"]
+    items = [{"title": f"Task {i}"} for i in range(tasks)]
+    response = await client.post(f"/tasks/project/{project_id}/bulk", headers=headers, json={"items": items})
+    return headers, [task["id"] for task in response.json()["items"]]
+
+
+async def history_total(client: httpx.AsyncClient, headers: dict, task_id: int) -> int:
+    total = 0
+    url = f"/tasks/{task_id}/history?limit=200"
+    while url:
+        page = (await client.get(url, headers=headers)).json()
+        total += len(page["items"])
+        url = f"/tasks/{task_id}/history?limit=200&after={page['next_cursor']}" if page["next_cursor"] else None
+    return total
+
+
+async def bench_mode(mode: str, args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        extra_env = {"PASSWORD_SCRYPT_N": "1024", "TASK_ACTIVITY_MODE": mode}
+        server = start_server(f"sqlite:///{Path(tmp) / 'activity.db'}", port, extra_env)
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+                await wait_ready(client)
+                headers, task_ids = await seed(client, args.tasks)
+                latencies = []
+                errors = 0
+                updates: dict[int, int] = {}
+                next_update = itertools.count()
+
+                async def worker(deadline: float, record: bool) -> None:
+                    nonlocal errors
+                    while time.perf_counter() < deadline:
+                        n = next(next_update)
+                        task_id = task_ids[n % len(task_ids)]
+                        status = STATUSES[(n // len(task_ids)) % len(STATUSES)]
+                        started = time.perf_counter()
+                        response = await client.put(f"/tasks/{task_id}/status", headers=headers, json={"status": status})
+                        if response.status_code != 200:
+                            errors += 1
+                            continue
+                        updates[task_id] = updates.get(task_id, 0) + 1
+                        if record:
+                            latencies.append(time.perf_counter() - started)
+
+                deadline = time.perf_counter() + args.warmup
+                await asyncio.gather(*(worker(deadline, False) for _ in range(args.concurrency)))
+                started = time.perf_counter()
+                deadline = started + args.duration
+                await asyncio.gather(*(worker(deadline, True) for _ in range(args.concurrency)))
+                summary = summarize(latencies, errors, time.perf_counter() - started)
+
+                drain_started = time.perf_counter()
+                while metric_values((await client.get("/metrics")).text, "task_activity_queue_depth").get("", 0):
+                    await asyncio.sleep(0.05)
+                await asyncio.sleep(args.flush_wait)
+                summary["drain_seconds"] = round(time.perf_counter() - drain_started, 3)
+
+                sample = task_ids[: args.verify_tasks]
+                expected = sum(updates.get(task_id, 0) for task_id in sample) + len(sample)
+                recorded = sum([await history_total(client, headers, task_id) for task_id in sample])
+                summary["history_complete"] = recorded == (expected if mode != "off" else 0)
+                summary["history_rows_checked"] = recorded
+        finally:
+            server.terminate()
+            server.wait()
+    return summary
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Status-update latency without, with sync and with write-behind activity log")
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--verify-tasks", type=int, default=50)
+    parser.add_argument("--flush-wait", type=float, default=1.0, help="time for the last write-behind batch to commit")
+    parser.add_argument("--modes", default=",".join(MODES))
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes.split(","):
+        results[mode] = await bench_mode(mode, args)
+    print(json.dumps(results, indent=2))
+    if not all(result["history_complete"] and not result["errors"] for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import httpx
+
+from sync_vs_async import ROOT, free_port, start_server, wait_ready
+
+STATUSES = ("OPEN", "IN_PROGRESS", "REVIEW", "DONE")
+
+
+async def login(client: httpx.AsyncClient, email: str) -> dict:
+    response = await client.post("/users/login", data={"username": email, "password": "123"})
+    response.raise_for_status()
+    return {"Authorization": "Bearer " + response.json()["access_token"]}
+
+
+async def seed(client: httpx.AsyncClient, tasks: int) -> tuple[dict, dict, int, list[int], list[int]]:
+    await client.post("/users/register", json={"name": "Race Admin", "email": "race_admin@fusion.com", "password": "123"})
+    admin = await login(client, "race_admin@fusion.com")
+    user_ids = []
+    for role in ("PM", "DEV", "DEV"):
+        email = f"race_{role.lower()}_{len(user_ids)}@fusion.com"
+        response = await client.post(
+            "/users/users", headers=admin, json={"name": email, "email": email, "password": "123", "role": role}
+        )
+        response.raise_for_status()
+        user_ids.append(response.json()["id"])
+    pm = await login(client, "race_pm_0@fusion.com")
+    project_id = (await client.post("/projects", headers=pm, json={"name": "Race"})).json()["id"]
+    for user_id in user_ids[1:]:
+        await client.post(
+            f"/projects/{project_id}/invite", headers=pm, json={"user_id": user_id, "role_in_project": "DEV"}
+        )
+    response = await client.post(
+        f"/tasks/project/{project_id}/bulk", headers=pm, json={"items": [{"title": f"Task {i}"} for i in range(tasks)]}
+    )
+    response.raise_for_status()
+    return admin, pm, project_id, [task["id"] for task in response.json()["items"]], user_ids[1:]
+
+
+async def race(client: httpx.AsyncClient, args: argparse.Namespace) -> dict:
+    admin, pm, project_id, task_ids, assignees = await seed(client, args.tasks)
+    statuses = []
+
+    async def status_writer(offset: int) -> None:
+        for step in range(args.updates):
+            task_id = task_ids[(step + offset) % len(task_ids)]
+            status = STATUSES[(step + offset) % len(STATUSES)]
+            if step % 3:
+                response = await client.put(f"/tasks/{task_id}/status", headers=admin, json={"status": status})
+            else:
+                response = await client.put(
+                    f"/tasks/project/{project_id}/bulk/status",
+                    headers=admin,
+                    json={"items": [{"id": task_id, "status": status} for task_id in task_ids]},
+                )
+            statuses.append(response.status_code)
+
+    async def assignee_writer(offset: int) -> None:
+        for step in range(args.updates):
+            task_id = task_ids[(step + offset) % len(task_ids)]
+            assignee_id = assignees[(step + offset) % len(assignees)] if step % 4 else None
+            response = await client.put(
+                f"/tasks/{task_id}",
+                headers=pm,
+                json={"title": f"Task {task_id}", "description": None, "assignee_id": assignee_id},
+            )
+            statuses.append(response.status_code)
+
+    writers = [status_writer(n) for n in range(args.writers)] + [assignee_writer(n) for n in range(args.writers)]
+    await asyncio.gather(*writers)
+    return {"writes": len(statuses), "statuses": sorted(set(statuses))}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent writes to the same tasks, then a project counter check")
+    parser.add_argument("--tasks", type=int, default=2)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--updates", type=int, default=60)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{Path(tmp) / 'race.db'}"
+        port = free_port()
+        server = start_server(database_url, port, {"PASSWORD_SCRYPT_N": "1024"})
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+                await wait_ready(client)
+                result = await race(client, args)
+        finally:
+            server.terminate()
+            server.wait()
+        check = await asyncio.to_thread(
+            subprocess.run,
+            [sys.executable, "-m", "database.stats"],
+            cwd=ROOT,
+            env=dict(os.environ, DATABASE_URL=database_url),
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        result["counter_check"] = check.stdout.strip().splitlines()
+
+    print(json.dumps(result, indent=2))
+    if check.returncode != 0 or result["statuses"] != [200]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from sync_vs_async import free_port, start_server, wait_ready
+
+
+async def register_all(client: httpx.AsyncClient, count: int, concurrency: int) -> tuple[list[int], int]:
+    semaphore = asyncio.Semaphore(concurrency)
+    tenant_ids = []
+    failures = 0
+
+    async def register(i: int) -> None:
+        nonlocal failures
+        async with semaphore:
+            response = await client.post(
+                "/users/register",
+                json={"name": f"Tenant {i}", "email": f"tenant{i}@fusion.com", "password": "123"},
+            )
+        if response.status_code == 200:
+            tenant_ids.append(response.json()["tenant_id"])
+        else:
+            failures += 1
+
+    await asyncio.gather(*(register(i) for i in range(count)))
+    return tenant_ids, failures
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Register tenants concurrently and check tenant ids are unique")
+    parser.add_argument("--tenants", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        server = start_server(
+            f"sqlite:///{Path(tmp) / 'tenants.db'}",
+            port,
+            {"PASSWORD_SCRYPT_N": "1024", "PASSWORD_HASH_MAX_PENDING": str(args.concurrency)},
+        )
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120) as client:
+                await wait_ready(client)
+                started = time.perf_counter()
+                tenant_ids, failures = await register_all(client, args.tenants, args.concurrency)
+                elapsed = time.perf_counter() - started
+        finally:
+            server.terminate()
+            server.wait()
+
+    duplicates = len(tenant_ids) - len(set(tenant_ids))
+    print(
+        json.dumps(
+            {
+                "registered": len(tenant_ids),
+                "failures": failures,
+                "duplicate_tenant_ids": duplicates,
+                "seconds": round(elapsed, 2),
+                "registrations_per_sec": round(len(tenant_ids) / elapsed, 1),
+            },
+            indent=2,
+        )
+    )
+    if duplicates or failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,208 @@
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from load_test import summarize
+from sync_vs_async import ROOT, free_port, start_server, wait_ready
+
+STATUSES = ("IN_PROGRESS", "REVIEW", "DONE", "OPEN")
+
+
+def shard_env(tmp: Path, shards: int) -> dict:
+    if not shards:
+        return {}
+    return {
+        "DATABASE_DIRECTORY_URL": f"sqlite:///{tmp / 'directory.db'}",
+        "DATABASE_SHARD_URLS": ",".join(f"shard{i}=sqlite:///{tmp / f'shard{i}.db'}" for i in range(1, shards + 1)),
+        "SHARD_MAP_REFRESH_SECONDS": "0.5",
+        "TENANT_MOVE_GRACE_SECONDS": "0.5",
+    }
+
+
+def database_files(tmp: Path, shards: int) -> dict:
+    return {"default": tmp / "default.db", **{f"shard{i}": tmp / f"shard{i}.db" for i in range(1, shards + 1)}}
+
+
+def count(path: Path, sql: str, *params) -> int:
+    with sqlite3.connect(path) as connection:
+        return connection.execute(sql, params).fetchone()[0]
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str = "123") -> dict:
+    response = await client.post("/users/login", data={"username": email, "password": password})
+    response.raise_for_status()
+    return {"Authorization": "Bearer " + response.json()["access_token"]}
+
+
+async def seed(client: httpx.AsyncClient, tenants: int, tasks: int) -> list[dict]:
+    seeded = []
+    for i in range(tenants):
+        email = f"shard_admin_{i}@fusion.com"
+        response = await client.post("/users/register", json={"name": f"Tenant {i}", "email": email, "password": "123"})
+        response.raise_for_status()
+        headers = await login(client, email)
+        project_id = (await client.post("/projects", headers=headers, json={"name": f"Project {i}"})).json()["id"]
+        items = [{"title": f"Task {k}"} for k in range(tasks)]
+        response = await client.post(f"/tasks/project/{project_id}/bulk", headers=headers, json={"items": items})
+        response.raise_for_status()
+        seeded.append({
+            "tenant_id": (await client.get("/users/me", headers=headers)).json()["tenant_id"],
+            "email": email,
+            "headers": headers,
+            "project_id": project_id,
+            "task_ids": [task["id"] for task in response.json()["items"]],
+        })
+    return seeded
+
+
+async def task_ids(client: httpx.AsyncClient, tenant: dict) -> list[int]:
+    ids, url = [], f"/tasks/project/{tenant['project_id']}?limit=200"
+    while url:
+        response = await client.get(url, headers=tenant["headers"])
+        response.raise_for_status()
+        page = response.json()
+        ids += [task["id"] for task in page["items"]]
+        url = f"/tasks/project/{tenant['project_id']}?limit=200&after={page['next_cursor']}" if page["next_cursor"] else None
+    return ids
+
+
+async def update_load(client: httpx.AsyncClient, tenants: list[dict], args: argparse.Namespace) -> dict:
+    latencies = []
+    errors = 0
+
+    async def worker(n: int, deadline: float) -> None:
+        nonlocal errors
+        tenant = tenants[n % len(tenants)]
+        step = 0
+        while time.perf_counter() < deadline:
+            task_id = tenant["task_ids"][step % len(tenant["task_ids"])]
+            status = STATUSES[step % len(STATUSES)]
+            step += 1
+            started = time.perf_counter()
+            response = await client.put(f"/tasks/{task_id}/status", headers=tenant["headers"], json={"status": status})
+            if response.status_code != 200:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n, started + args.duration) for n in range(args.concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def move_check(client: httpx.AsyncClient, env: dict, files: dict, tenants: list[dict]) -> dict:
+    tenant = next(t for t in tenants if count(files["shard1"], "SELECT count(*) FROM tenants WHERE id = ?", t["tenant_id"]))
+    before = await task_ids(client, tenant)
+    statuses = []
+
+    async def write_during_move(done: asyncio.Event) -> None:
+        while not done.is_set():
+            response = await client.put(
+                f"/tasks/{tenant['task_ids'][0]}/status", headers=tenant["headers"], json={"status": "REVIEW"}
+            )
+            statuses.append(response.status_code)
+            await asyncio.sleep(0.05)
+
+    done = asyncio.Event()
+    writer = asyncio.create_task(write_during_move(done))
+    started = time.perf_counter()
+    move = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "database.shards", "move", str(tenant["tenant_id"]), "shard2",
+        cwd=ROOT, env=dict(os.environ, **env), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+    )
+    output = (await move.communicate())[0].decode().strip().splitlines()
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(1.0)
+    done.set()
+    await writer
+
+    after = await task_ids(client, tenant)
+    response = await client.put(f"/tasks/{after[0]}/status", headers=tenant["headers"], json={"status": "DONE"})
+    login_after_move = await client.post("/users/login", data={"username": tenant["email"], "password": "123"})
+    return {
+        "tenant_id": tenant["tenant_id"],
+        "exit_code": move.returncode,
+        "output": output[-1] if output else "",
+        "seconds": round(elapsed, 2),
+        "writes_rejected_during_move": statuses.count(503),
+        "writes_ok_during_move": statuses.count(200),
+        "other_write_statuses": sorted({code for code in statuses if code not in {200, 503}}),
+        "ids_preserved": before == after,
+        "write_after_move": response.status_code,
+        "login_after_move": login_after_move.status_code,
+        "left_on_source": count(files["shard1"], "SELECT count(*) FROM tasks WHERE project_id = ?", tenant["project_id"]),
+        "on_target": count(files["shard2"], "SELECT count(*) FROM tasks WHERE project_id = ?", tenant["project_id"]),
+    }
+
+
+async def run_mode(shards: int, args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        port = free_port()
+        env = {"DATABASE_URL": f"sqlite:///{tmp / 'default.db'}", "RATE_LIMIT_ENABLED": "false", **shard_env(tmp, shards)}
+        extra_env = {"PASSWORD_SCRYPT_N": "1024", "TASK_ACTIVITY_MODE": "sync", **env}
+        server = start_server(env["DATABASE_URL"], port, extra_env)
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency + 2)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+                await wait_ready(client)
+                tenants = await seed(client, args.tenants, args.tasks)
+                result = {"updates": await update_load(client, tenants, args)}
+                files = database_files(tmp, shards)
+                result["tenants_per_database"] = {
+                    name: count(path, "SELECT count(*) FROM tenants") for name, path in files.items()
+                }
+                admin = await login(client, "system@fusion.com", "123456")
+                listed, url = 0, "/users?limit=50"
+                while url:
+                    page = (await client.get(url, headers=admin)).json()
+                    listed += len(page["items"])
+                    url = f"/users?limit=50&after={page['next_cursor']}" if page["next_cursor"] else None
+                result["system_admin_users_listed"] = listed
+                result["users_stored"] = sum(count(path, "SELECT count(*) FROM users") for path in files.values())
+                if shards >= 2:
+                    result["move"] = await move_check(client, {**extra_env}, files, tenants)
+        finally:
+            server.terminate()
+            server.wait()
+    return result
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Single database vs tenant shards on local SQLite files")
+    parser.add_argument("--shards", type=int, default=2, help="extra shards next to the default database")
+    parser.add_argument("--tenants", type=int, default=6)
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=12)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    results = {"single": await run_mode(0, args), "sharded": await run_mode(args.shards, args)}
+    print(json.dumps(results, indent=2))
+    sharded = results["sharded"]
+    move = sharded["move"]
+    ok = (
+        all(result["system_admin_users_listed"] == result["users_stored"] for result in results.values())
+        and all(sharded["tenants_per_database"].values())
+        and move["exit_code"] == 0
+        and move["ids_preserved"]
+        and move["write_after_move"] == 200
+        and move["login_after_move"] == 200
+        and not move["other_write_statuses"]
+        and move["left_on_source"] == 0
+        and move["on_target"] == args.tasks
+    )
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,137 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import UTC, datetime
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from database.db import on_commit
+from database.models.task import Task
+from database.models.task_activity import TaskActivity
+
+logger = logging.getLogger(__name__)
+
+TASK_ACTIVITY_MODE = os.getenv("TASK_ACTIVITY_MODE", "write_behind")
+TASK_ACTIVITY_QUEUE_SIZE = int(os.getenv("TASK_ACTIVITY_QUEUE_SIZE", "10000"))
+TASK_ACTIVITY_BATCH_SIZE = int(os.getenv("TASK_ACTIVITY_BATCH_SIZE", "500"))
+TASK_ACTIVITY_FLUSH_SECONDS = float(os.getenv("TASK_ACTIVITY_FLUSH_SECONDS", "0.5"))
+TASK_ACTIVITY_WRITE_ATTEMPTS = int(os.getenv("TASK_ACTIVITY_WRITE_ATTEMPTS", "3"))
+
+TRACKED_FIELDS = ("title", "description", "status", "assignee_id")
+
+_STOP = object()
+
+
+def task_snapshot(task: Task) -> dict:
+    return {field: getattr(task, field) for field in TRACKED_FIELDS}
+
+
+def activity_row(task: Task, actor_id: int, before: dict | None, after: dict | None) -> dict | None:
+    if before is None:
+        action, changes = "created", after
+    elif after is None:
+        action, changes = "deleted", None
+    else:
+        changes = {field: [before[field], after[field]] for field in TRACKED_FIELDS if before[field] != after[field]}
+        if not changes:
+            return None
+        action = "status_changed" if "status" in changes else "updated"
+    return {
+        "task_id": task.id,
+        "project_id": task.project_id,
+        "actor_id": actor_id,
+        "action": action,
+        "from_status": before["status"] if before else None,
+        "to_status": after["status"] if after else None,
+        "changes": changes,
+        "created_at": datetime.now(UTC),
+    }
+
+
+class ActivityWriter:
+    def __init__(self, queue_size: int, batch_size: int, flush_seconds: float) -> None:
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.written = 0
+        self.failed = 0
+        self._queue: queue.Queue = queue.Queue(queue_size)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="task-activity-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def enqueue(self, target: Engine, rows: list[dict]) -> None:
+        self.start()
+        for row in rows:
+            self._queue.put((target, row))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_seconds
+            stopping = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            targets = defaultdict(list)
+            for target, row in batch:
+                targets[target].append(row)
+            for target, rows in targets.items():
+                self._write(target, rows)
+            if stopping:
+                return
+
+    def _write(self, target: Engine, batch: list[dict]) -> None:
+        for attempt in range(1, TASK_ACTIVITY_WRITE_ATTEMPTS + 1):
+            try:
+                with target.begin() as connection:
+                    connection.execute(insert(TaskActivity), batch)
+                self.written += len(batch)
+                return
+            except DBAPIError:
+                logger.exception("Writing %s task activity rows failed (attempt %s)", len(batch), attempt)
+                time.sleep(self.flush_seconds * attempt)
+        self.failed += len(batch)
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "written": self.written, "failed": self.failed}
+
+
+activity_writer = ActivityWriter(TASK_ACTIVITY_QUEUE_SIZE, TASK_ACTIVITY_BATCH_SIZE, TASK_ACTIVITY_FLUSH_SECONDS)
+
+
+def record_activity(db: Session, rows: list[dict | None]) -> None:
+    rows = [row for row in rows if row is not None]
+    if not rows or TASK_ACTIVITY_MODE == "off":
+        return
+    if TASK_ACTIVITY_MODE == "sync":
+        db.execute(insert(TaskActivity), rows)
+        return
+    target = db.get_bind()
+    on_commit(db, lambda: activity_writer.enqueue(target, rows))
@@ -1,7 +1,11 @@
 import os
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+
+from database.pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from monitoring.metrics import install_query_hooks
 
 DATABASE_URL = os.getenv(
     "DATABASE_URL",
@@ -10,20 +14,115 @@ DATABASE_URL = os.getenv(
     "&trusted_connection=yes",
 )
 
-engine = create_engine(DATABASE_URL, echo=False)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in {"1", "true", "yes"}
+
+ASYNC_TO_SYNC_DRIVERS = {
+    "aiosqlite": "pysqlite",
+    "aioodbc": "pyodbc",
+    "asyncpg": "psycopg2",
+    "aiomysql": "pymysql",
+}
+
+
+def sync_url(url):
+    url = make_url(url)
+    if url.get_driver_name() in ASYNC_TO_SYNC_DRIVERS:
+        return url.set(drivername=f"{url.get_backend_name()}+{ASYNC_TO_SYNC_DRIVERS[url.get_driver_name()]}")
+    return url
+
+
+_url = make_url(DATABASE_URL)
+ASYNC_MODE = _url.get_driver_name() in ASYNC_TO_SYNC_DRIVERS
+SYNC_DATABASE_URL = sync_url(_url)
+
+
+def enable_sqlite_foreign_keys(engine) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys = ON")
+        cursor.close()
+
+
+def pool_options(url, poolclass) -> dict:
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+engine = create_engine(
+    SYNC_DATABASE_URL,
+    echo=False,
+    **pool_options(SYNC_DATABASE_URL, InstrumentedQueuePool),
+)
+install_query_hooks(engine)
+enable_sqlite_foreign_keys(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_MODE:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        DATABASE_URL,
+        echo=False,
+        **pool_options(_url, InstrumentedAsyncQueuePool),
+    )
+    install_query_hooks(async_engine.sync_engine)
+    enable_sqlite_foreign_keys(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+
+def engine_pools() -> dict:
+    pools = {"primary": engine.pool}
+    if async_engine is not None:
+        pools["async"] = async_engine.pool
+    return pools
+
+
+def on_commit(db: Session, callback) -> None:
+    db.info.setdefault("on_commit", []).append(callback)
+
+
+def on_rollback(db: Session, callback) -> None:
+    db.info.setdefault("on_rollback", []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_on_commit(session) -> None:
+    session.info.pop("on_rollback", None)
+    for callback in session.info.pop("on_commit", []):
+        callback()
+
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@event.listens_for(Session, "after_transaction_end")
+def _run_on_rollback(session, transaction) -> None:
+    if transaction.parent is None:
+        for callback in session.info.pop("on_rollback", []):
+            callback()
 
 
-def init_db() -> None:
-    from database.models import user, project, task  # noqa: F401
+@event.listens_for(Session, "after_rollback")
+def _discard_on_commit(session) -> None:
+    session.info.pop("on_commit", None)
 
-    Base.metadata.create_all(bind=engine)
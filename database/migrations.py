@@ -0,0 +1,325 @@
+import logging
+import os
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Integer,
+    MetaData,
+    Table,
+    delete,
+    exists,
+    false,
+    insert,
+    inspect,
+    literal,
+    select,
+    text,
+    union,
+    update,
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import AddConstraint, CreateTable
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from database.db import Base
+from database.models import (
+    tenant,
+    user,
+    project,
+    project_stats,
+    replication,
+    task,
+    task_activity,
+    job,
+    shard,
+)
+from database.models.project import Project, ProjectMember
+from database.models.project_stats import ProjectMemberCount, ProjectTaskCount
+from database.models.task import Task
+from database.models.tenant import Tenant
+from database.models.user import User
+from database.search import SEARCH_BACKENDS
+from database.shards import shard_set
+
+logger = logging.getLogger(__name__)
+
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "false").lower() in {"1", "true", "yes"}
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, nullable=False),
+)
+
+
+def create_base_tables(connection: Connection) -> None:
+    Base.metadata.create_all(connection)
+
+
+def backfill_tenants(connection: Connection) -> None:
+    tenant_ids = union(select(User.tenant_id), select(Project.tenant_id)).subquery()
+    missing = select(tenant_ids.c.tenant_id, literal("Tenant")).where(
+        ~exists().where(Tenant.id == tenant_ids.c.tenant_id)
+    )
+    if connection.dialect.name == "mssql":
+        connection.execute(text("SET IDENTITY_INSERT tenants ON"))
+    connection.execute(insert(Tenant).from_select(["id", "name"], missing))
+    if connection.dialect.name == "mssql":
+        connection.execute(text("SET IDENTITY_INSERT tenants OFF"))
+
+
+def widen_password_hash(connection: Connection) -> None:
+    if connection.dialect.name == "mssql":
+        connection.execute(text("ALTER TABLE users ALTER COLUMN password_hash VARCHAR(255) NOT NULL"))
+
+
+def create_indexes(connection: Connection) -> None:
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def seed_system_admin(connection: Connection) -> None:
+    from database.seed import seed_system_admin as seed
+
+    if connection.engine is not shard_set.default.engine:
+        return
+    with Session(bind=connection) as db:
+        seed(db)
+
+
+def add_project_version(connection: Connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns("projects")}
+    if "version" not in columns:
+        connection.execute(text("ALTER TABLE projects ADD version INTEGER NOT NULL DEFAULT 0"))
+
+
+def add_project_deleting(connection: Connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns("projects")}
+    if "deleting" not in columns:
+        column_type = Boolean().compile(dialect=connection.dialect)
+        default = false().compile(dialect=connection.dialect)
+        connection.execute(text(f"ALTER TABLE projects ADD deleting {column_type} NOT NULL DEFAULT {default}"))
+
+
+def create_task_search_index(connection: Connection) -> None:
+    backend = SEARCH_BACKENDS.get(connection.dialect.name)
+    if backend is not None:
+        backend.install(connection)
+
+
+def create_project_counters(connection: Connection) -> None:
+    from database.stats import rebuild_counts
+
+    Base.metadata.create_all(
+        connection,
+        tables=[project_stats.ProjectTaskCount.__table__, project_stats.ProjectMemberCount.__table__],
+    )
+    with Session(bind=connection) as db:
+        rebuild_counts(db)
+
+
+def delete_orphans(connection: Connection) -> int:
+    statements = [
+        delete(ProjectMember).where(
+            ~exists().where(Project.id == ProjectMember.project_id)
+            | ~exists().where(User.id == ProjectMember.user_id)
+        ),
+        delete(Task).where(~exists().where(Project.id == Task.project_id)),
+        update(Task)
+        .where(Task.assignee_id.is_not(None), ~exists().where(User.id == Task.assignee_id))
+        .values(assignee_id=None),
+    ]
+    for model in (ProjectTaskCount, ProjectMemberCount):
+        connection.execute(delete(model).where(~exists().where(Project.id == model.project_id)))
+    return sum(connection.execute(statement).rowcount for statement in statements)
+
+
+def stale_foreign_keys(connection: Connection, table: Table) -> list[tuple]:
+    existing = {
+        tuple(foreign_key["constrained_columns"]): foreign_key
+        for foreign_key in inspect(connection).get_foreign_keys(table.name)
+    }
+    stale = []
+    for constraint in table.foreign_key_constraints:
+        current = existing.get(tuple(constraint.column_keys))
+        wanted = (constraint.ondelete or "NO ACTION").upper()
+        if current is None or (current["options"].get("ondelete") or "NO ACTION").upper() != wanted:
+            stale.append((constraint, current))
+    return stale
+
+
+def rebuild_sqlite_table(connection: Connection, table: Table) -> None:
+    new_name = f"_new_{table.name}"
+    columns = {column["name"] for column in inspect(connection).get_columns(table.name)}
+    column_list = ", ".join(column.name for column in table.columns if column.name in columns)
+    dependents = connection.execute(
+        text(
+            "SELECT sql FROM sqlite_master "
+            "WHERE type IN ('index', 'trigger') AND tbl_name = :table AND sql IS NOT NULL"
+        ),
+        {"table": table.name},
+    ).scalars().all()
+    ddl = str(CreateTable(table).compile(dialect=connection.dialect)).strip()
+    connection.execute(text(f"DROP TABLE IF EXISTS {new_name}"))
+    connection.execute(text(ddl.replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {new_name} ", 1)))
+    connection.execute(text(f"INSERT INTO {new_name} ({column_list}) SELECT {column_list} FROM {table.name}"))
+    connection.execute(text(f"DROP TABLE {table.name}"))
+    connection.execute(text(f"ALTER TABLE {new_name} RENAME TO {table.name}"))
+    for sql in dependents:
+        connection.execute(text(sql))
+
+
+def allow_null_project_creator(connection: Connection) -> None:
+    columns = {column["name"]: column for column in inspect(connection).get_columns("projects")}
+    if columns["created_by"]["nullable"]:
+        return
+    if connection.dialect.name == "mssql":
+        connection.execute(text("ALTER TABLE projects ALTER COLUMN created_by INTEGER NULL"))
+    elif connection.dialect.name == "postgresql":
+        connection.execute(text("ALTER TABLE projects ALTER COLUMN created_by DROP NOT NULL"))
+
+
+def add_delete_cascades(connection: Connection) -> None:
+    from database.stats import rebuild_counts
+
+    orphans = delete_orphans(connection)
+    allow_null_project_creator(connection)
+    for model in (Project, ProjectMember, Task, ProjectTaskCount, ProjectMemberCount):
+        table = model.__table__
+        stale = stale_foreign_keys(connection, table)
+        if not stale:
+            continue
+        if connection.dialect.name == "sqlite":
+            rebuild_sqlite_table(connection, table)
+            continue
+        for constraint, current in stale:
+            if current is not None:
+                connection.execute(text(f"ALTER TABLE {table.name} DROP CONSTRAINT {current['name']}"))
+            connection.execute(AddConstraint(constraint))
+    if orphans:
+        with Session(bind=connection) as db:
+            rebuild_counts(db)
+
+
+def create_replica_heartbeat(connection: Connection) -> None:
+    table = replication.ReplicaHeartbeat.__table__
+    table.create(connection, checkfirst=True)
+    if connection.execute(select(table.c.id)).first() is None:
+        connection.execute(insert(table).values(id=1, beat_at=0.0))
+
+
+def create_task_activity(connection: Connection) -> None:
+    task_activity.TaskActivity.__table__.create(connection, checkfirst=True)
+
+
+def create_jobs(connection: Connection) -> None:
+    job.Job.__table__.create(connection, checkfirst=True)
+
+
+def create_shard_directory(connection: Connection) -> None:
+    shard.TenantShard.__table__.create(connection, checkfirst=True)
+    shard.IdBlock.__table__.create(connection, checkfirst=True)
+
+
+def create_email_directory(connection: Connection) -> None:
+    shard.UserEmail.__table__.create(connection, checkfirst=True)
+    shard.ShardLoad.__table__.create(connection, checkfirst=True)
+    if not shard_set.sharded or connection.engine is not shard_set.directory:
+        return
+    seen = set()
+    for name, target in shard_set.shards.items():
+        with target.engine.connect() as source:
+            if not inspect(source).has_table(User.__tablename__):
+                continue
+            emails = source.scalars(select(User.email)).all()
+        for email in emails:
+            if email in seen:
+                logger.warning("Email %s exists on more than one shard, keeping the first", email)
+        rows = [{"email": email, "shard": name} for email in emails if email not in seen]
+        seen.update(emails)
+        if rows:
+            connection.execute(insert(shard.UserEmail), rows)
+        connection.execute(insert(shard.ShardLoad).values(shard=name, users=len(emails)))
+
+
+MIGRATIONS = (
+    (1, "create base tables", create_base_tables),
+    (2, "backfill tenants from existing tenant ids", backfill_tenants),
+    (3, "widen users.password_hash", widen_password_hash),
+    (4, "create composite indexes", create_indexes),
+    (5, "seed system admin", seed_system_admin),
+    (6, "add projects.version", add_project_version),
+    (7, "create task search index", create_task_search_index),
+    (8, "create and backfill project counters", create_project_counters),
+    (9, "add ON DELETE actions to project, task and member foreign keys", add_delete_cascades),
+    (10, "create replica heartbeat", create_replica_heartbeat),
+    (11, "create task activity log", create_task_activity),
+    (12, "create jobs table", create_jobs),
+    (13, "create tenant shard directory and id blocks", create_shard_directory),
+    (14, "create user email directory and shard loads", create_email_directory),
+    (15, "add projects.deleting", add_project_deleting),
+)
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(connection: Connection) -> int:
+    try:
+        return connection.execute(select(schema_version.c.version)).scalar() or 0
+    except DBAPIError:
+        connection.rollback()
+        return 0
+
+
+def migrate_engine(target: Engine) -> int:
+    schema_version.create(target, checkfirst=True)
+    with target.connect() as connection:
+        version = current_version(connection)
+
+    for number, description, step in MIGRATIONS:
+        if number <= version:
+            continue
+        logger.info("Applying migration %s to %s: %s", number, target.url.render_as_string(), description)
+        with target.connect() as connection:
+            sqlite = connection.dialect.name == "sqlite"
+            if sqlite:
+                connection.exec_driver_sql("PRAGMA foreign_keys = OFF")
+                connection.commit()
+            with connection.begin():
+                step(connection)
+                if sqlite and connection.exec_driver_sql("PRAGMA foreign_key_check").first() is not None:
+                    raise RuntimeError(f"Migration {number} left rows with broken foreign keys")
+                connection.execute(schema_version.delete())
+                connection.execute(schema_version.insert().values(version=number))
+            if sqlite:
+                connection.exec_driver_sql("PRAGMA foreign_keys = ON")
+                connection.commit()
+        version = number
+    return version
+
+
+def migrate() -> int:
+    return min(migrate_engine(target) for target in shard_set.engines())
+
+
+def check_schema_version() -> None:
+    if AUTO_MIGRATE:
+        migrate()
+        return
+
+    for target in shard_set.engines():
+        with target.connect() as connection:
+            version = current_version(connection)
+        if version != LATEST_VERSION:
+            raise RuntimeError(
+                f"Database {target.url.render_as_string()} schema is at version {version}, "
+                f"expected {LATEST_VERSION}. Run `python -m database.migrations` before starting the app."
+            )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    print(f"Database schema is at version {migrate()}")
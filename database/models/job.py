@@ -0,0 +1,29 @@
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, Text
+
+from database.db import Base
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+        Index("ix_jobs_subject_status", "subject", "status"),
+    )
+
+    id = Column(String(32), primary_key=True)
+    kind = Column(String(50), nullable=False)
+    subject = Column(String(100), nullable=True)
+    tenant_id = Column(Integer, nullable=True)
+    created_by = Column(Integer, nullable=True)
+    payload = Column(JSON, nullable=False)
+    status = Column(String(20), nullable=False, default="queued")
+    total = Column(Integer, nullable=True)
+    progress = Column(Integer, nullable=False, default=0)
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    run_after = Column(DateTime(timezone=True), nullable=False)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,27 +1,32 @@
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String, false
 from sqlalchemy.orm import relationship
 
 from database.db import Base
+from database.shards import global_id
 
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (Index("ix_projects_tenant_id_id", "tenant_id", "id"),)
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, index=True, default=global_id("projects"))
     name = Column(String(120), nullable=False)
-    tenant_id = Column(Integer, nullable=False, index=True)
-    created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False)
+    created_by = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    deleting = Column(Boolean, nullable=False, default=False, server_default=false())
 
     creator = relationship("User", back_populates="projects_created")
-    members = relationship("ProjectMember", back_populates="project", cascade="all, delete")
-    tasks = relationship("Task", back_populates="project", cascade="all, delete")
+    members = relationship("ProjectMember", back_populates="project", cascade="all, delete", passive_deletes=True)
+    tasks = relationship("Task", back_populates="project", cascade="all, delete", passive_deletes=True)
 
 
 class ProjectMember(Base):
     __tablename__ = "project_members"
+    __table_args__ = (Index("ix_project_members_project_id", "project_id"),)
 
-    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
     role_in_project = Column(String(30), nullable=False)
 
     user = relationship("User", back_populates="project_memberships")
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, ForeignKey, Integer, String
+
+from database.db import Base
+
+
+class ProjectTaskCount(Base):
+    __tablename__ = "project_task_counts"
+
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(String(30), primary_key=True)
+    assignee_key = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class ProjectMemberCount(Base):
+    __tablename__ = "project_member_counts"
+
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    role_in_project = Column(String(30), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Float, Integer
+
+from database.db import Base
+
+
+class ReplicaHeartbeat(Base):
+    __tablename__ = "replica_heartbeat"
+
+    id = Column(Integer, primary_key=True)
+    beat_at = Column(Float, nullable=False)
@@ -0,0 +1,32 @@
+from sqlalchemy import Boolean, Column, Integer, String
+
+from database.db import Base
+
+
+class TenantShard(Base):
+    __tablename__ = "tenant_shards"
+
+    tenant_id = Column(Integer, primary_key=True, autoincrement=False)
+    shard = Column(String(50), nullable=False)
+    moving = Column(Boolean, nullable=False, default=False, server_default="0")
+
+
+class IdBlock(Base):
+    __tablename__ = "id_blocks"
+
+    name = Column(String(50), primary_key=True)
+    next_id = Column(Integer, nullable=False)
+
+
+class UserEmail(Base):
+    __tablename__ = "user_emails"
+
+    email = Column(String(120), primary_key=True)
+    shard = Column(String(50), nullable=False)
+
+
+class ShardLoad(Base):
+    __tablename__ = "shard_loads"
+
+    shard = Column(String(50), primary_key=True)
+    users = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,22 @@
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String
+
+from database.db import Base
+from database.shards import global_id
+
+
+class TaskActivity(Base):
+    __tablename__ = "task_activity"
+    __table_args__ = (
+        Index("ix_task_activity_project_id_created_at", "project_id", "created_at"),
+        Index("ix_task_activity_task_id_id", "task_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, default=global_id("task_activity"))
+    task_id = Column(Integer, nullable=False)
+    project_id = Column(Integer, nullable=False)
+    actor_id = Column(Integer, nullable=True)
+    action = Column(String(30), nullable=False)
+    from_status = Column(String(30), nullable=True)
+    to_status = Column(String(30), nullable=True)
+    changes = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String
+
+from database.db import Base
+from database.shards import global_id
+
+
+class Tenant(Base):
+    __tablename__ = "tenants"
+
+    id = Column(Integer, primary_key=True, index=True, default=global_id("tenants"))
+    name = Column(String(120), nullable=False)
@@ -1,24 +1,30 @@
-from sqlalchemy import Boolean, Column, Integer, String
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 
 from database.db import Base
+from database.shards import global_id
 
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_tenant_id_id", "tenant_id", "id"),
+        Index("ix_users_role_id", "role", "id"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, index=True, default=global_id("users"))
     name = Column(String(100), nullable=False)
     email = Column(String(120), unique=True, index=True, nullable=False)
-    password_hash = Column(String(64), nullable=False)
+    password_hash = Column(String(255), nullable=False)
     role = Column(String(30), nullable=False)
-    tenant_id = Column(Integer, nullable=False, index=True)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False)
     is_locked = Column(Boolean, default=False)
 
-    projects_created = relationship("Project", back_populates="creator")
+    projects_created = relationship("Project", back_populates="creator", passive_deletes=True)
     project_memberships = relationship(
         "ProjectMember",
         back_populates="user",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
-    tasks_assigned = relationship("Task", back_populates="assignee")
+    tasks_assigned = relationship("Task", back_populates="assignee", passive_deletes=True)
@@ -0,0 +1,63 @@
+import base64
+import binascii
+import os
+
+from fastapi import HTTPException, Query
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+
+class PageParams:
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        after: str | None = Query(None),
+    ) -> None:
+        self.limit = limit
+        self.after_id = decode_cursor(after) if after else None
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(str(last_id).encode("ascii")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        value = int(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("ascii"))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if value < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value
+
+
+def page_statement(stmt: Select, id_column, page: PageParams) -> Select:
+    if page.after_id is not None:
+        stmt = stmt.where(id_column > page.after_id)
+    return stmt.order_by(id_column).limit(page.limit + 1)
+
+
+def build_page(rows: list, page: PageParams) -> dict:
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        next_cursor = encode_cursor(rows[-1].id)
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+def merge_pages(rows: list, page: PageParams) -> dict:
+    return build_page(sorted(rows, key=lambda row: row.id), page)
+
+
+def paginate(db: Session, stmt: Select, id_column, page: PageParams) -> dict:
+    rows = db.execute(page_statement(stmt, id_column, page)).scalars().all()
+    return build_page(rows, page)
+
+
+async def paginate_async(db: AsyncSession, stmt: Select, id_column, page: PageParams) -> dict:
+    result = await db.execute(page_statement(stmt, id_column, page))
+    return build_page(result.scalars().all(), page)
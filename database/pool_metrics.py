@@ -0,0 +1,98 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PoolStats:
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.invalidated = 0
+        self.soft_invalidated = 0
+        self.wait_count = 0
+        self.wait_sum_ms = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._lock = threading.Lock()
+
+    def observe_wait(self, seconds: float) -> None:
+        wait_ms = seconds * 1000
+        index = len(WAIT_BUCKETS_MS)
+        for i, bound in enumerate(WAIT_BUCKETS_MS):
+            if wait_ms <= bound:
+                index = i
+                break
+        with self._lock:
+            self.checkouts += 1
+            self.wait_count += 1
+            self.wait_sum_ms += wait_ms
+            self.wait_buckets[index] += 1
+
+    def record_invalidated(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.invalidated += 1
+
+    def record_soft_invalidated(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.soft_invalidated += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            cumulative = 0
+            histogram = {}
+            for bound, count in zip(WAIT_BUCKETS_MS, self.wait_buckets):
+                cumulative += count
+                histogram[str(bound)] = cumulative
+            histogram["+Inf"] = cumulative + self.wait_buckets[-1]
+            return {
+                "checkouts": self.checkouts,
+                "invalidated": self.invalidated,
+                "soft_invalidated": self.soft_invalidated,
+                "wait_ms": {
+                    "count": self.wait_count,
+                    "sum": round(self.wait_sum_ms, 3),
+                    "buckets": histogram,
+                },
+            }
+
+
+class _InstrumentedPool:
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+        event.listen(self, "invalidate", self.stats.record_invalidated)
+        event.listen(self, "soft_invalidate", self.stats.record_soft_invalidated)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.stats.observe_wait(time.perf_counter() - started)
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_status(pool) -> dict:
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            {
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "max_overflow": pool._max_overflow,
+            }
+        )
+    if isinstance(pool, _InstrumentedPool):
+        status.update(pool.stats.snapshot())
+    return status
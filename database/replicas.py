@@ -0,0 +1,291 @@
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from fastapi import Request
+from sqlalchemy import create_engine, event, select, update
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from database.db import (
+    ASYNC_MODE,
+    AsyncSessionLocal,
+    SessionLocal,
+    enable_sqlite_foreign_keys,
+    engine,
+    pool_options,
+    sync_url,
+)
+from database.models.replication import ReplicaHeartbeat
+from database.pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from database.shards import get_async_db, get_db, request_caller, request_tenant, shard_set
+from monitoring.metrics import install_query_hooks
+
+logger = logging.getLogger(__name__)
+
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_CHECK_INTERVAL_SECONDS = float(os.getenv("REPLICA_CHECK_INTERVAL_SECONDS", "1"))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+WRITE_COOKIE = "last_write"
+
+request_writes: ContextVar[list | None] = ContextVar("request_writes", default=None)
+
+
+@dataclass(eq=False)
+class Replica:
+    name: str
+    engine: Engine
+    probe: Engine
+    async_engine: object | None = None
+    healthy: bool = False
+    lag: float | None = None
+    in_flight: int = 0
+    reads: int = 0
+
+
+def create_replica(index: int, url: str) -> Replica:
+    sync = sync_url(url)
+    replica_engine = create_engine(sync, **pool_options(sync, InstrumentedQueuePool))
+    install_query_hooks(replica_engine)
+    enable_sqlite_foreign_keys(replica_engine)
+    replica = Replica(f"replica{index}", replica_engine, create_engine(sync, poolclass=NullPool))
+    if ASYNC_MODE:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        replica.async_engine = create_async_engine(url, **pool_options(make_url(url), InstrumentedAsyncQueuePool))
+        install_query_hooks(replica.async_engine.sync_engine)
+    return replica
+
+
+class ReplicaSet:
+    def __init__(self, replicas: list[Replica]) -> None:
+        self.replicas = replicas
+        self.primary_reads = 0
+        self._rotation = itertools.count()
+        self._writes: dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def note_write(self, caller: int | None) -> None:
+        if not caller or not self.replicas:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._writes[caller] = now + READ_YOUR_WRITES_SECONDS
+            if len(self._writes) > 10_000:
+                self._writes = {key: until for key, until in self._writes.items() if until > now}
+
+    def wrote_recently(self, caller: int | None) -> bool:
+        with self._lock:
+            until = self._writes.get(caller)
+        return until is not None and until > time.monotonic()
+
+    def candidates(self, caller: int | None) -> list[Replica]:
+        if self.wrote_recently(caller):
+            return []
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return []
+        start = next(self._rotation) % len(healthy)
+        rotated = healthy[start:] + healthy[:start]
+        return sorted(rotated, key=lambda replica: replica.in_flight)
+
+    def begin_read(self, replica: Replica | None) -> None:
+        with self._lock:
+            if replica is None:
+                self.primary_reads += 1
+                return
+            replica.in_flight += 1
+            replica.reads += 1
+
+    def end_read(self, replica: Replica) -> None:
+        with self._lock:
+            replica.in_flight -= 1
+
+    def mark_down(self, replica: Replica) -> None:
+        logger.warning("Replica %s is unavailable, reading from the primary", replica.name)
+        replica.healthy = False
+
+    def check(self) -> None:
+        now = time.time()
+        try:
+            with engine.begin() as connection:
+                connection.execute(update(ReplicaHeartbeat).where(ReplicaHeartbeat.id == 1).values(beat_at=now))
+        except DBAPIError:
+            logger.exception("Could not write the replica heartbeat")
+        for replica in self.replicas:
+            try:
+                with replica.probe.connect() as connection:
+                    beat_at = connection.scalar(select(ReplicaHeartbeat.beat_at).where(ReplicaHeartbeat.id == 1))
+            except DBAPIError:
+                if replica.healthy:
+                    self.mark_down(replica)
+                replica.lag = None
+                continue
+            replica.lag = max(now - beat_at, 0.0) if beat_at else None
+            replica.healthy = replica.lag is not None and replica.lag <= REPLICA_MAX_LAG_SECONDS
+
+    def start(self) -> None:
+        if not self.replicas or self._thread is not None:
+            return
+        self.check()
+        self._thread = threading.Thread(target=self._run, name="replica-monitor", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(REPLICA_CHECK_INTERVAL_SECONDS)
+            self.check()
+
+    def stats(self) -> dict:
+        return {
+            "primary_reads": self.primary_reads,
+            "replicas": {
+                replica.name: {
+                    "healthy": replica.healthy,
+                    "lag": replica.lag,
+                    "in_flight": replica.in_flight,
+                    "reads": replica.reads,
+                }
+                for replica in self.replicas
+            },
+        }
+
+    def pools(self) -> dict:
+        pools = {replica.name: replica.engine.pool for replica in self.replicas}
+        for replica in self.replicas:
+            if replica.async_engine is not None:
+                pools[f"{replica.name}_async"] = replica.async_engine.pool
+        return pools
+
+
+replica_set = ReplicaSet([create_replica(i, url) for i, url in enumerate(DATABASE_REPLICA_URLS, start=1)])
+
+
+@event.listens_for(Session, "after_commit")
+def _note_write(session) -> None:
+    caller = session.info.get("caller")
+    replica_set.note_write(caller)
+    writes = request_writes.get()
+    if caller and writes is not None:
+        writes.append(time.time())
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _read_from_primary_on_error(state):
+    info = state.session.info
+    if "primary" not in info:
+        return None
+    if info["replica"] is not None:
+        try:
+            return state.invoke_statement()
+        except DBAPIError:
+            replica_set.mark_down(info["replica"])
+            replica_set.begin_read(None)
+            info["replica"] = None
+    return state.invoke_statement(bind_arguments={"bind": info["primary"]})
+
+
+class ReadYourWritesMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not replica_set.replicas:
+            await self.app(scope, receive, send)
+            return
+
+        writes = []
+        token = request_writes.set(writes)
+
+        async def send_with_cookie(message) -> None:
+            if message["type"] == "http.response.start" and writes:
+                cookie = (
+                    f"{WRITE_COOKIE}={max(writes):.3f}; Max-Age={math.ceil(READ_YOUR_WRITES_SECONDS)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            request_writes.reset(token)
+
+
+def wrote_recently(request: Request) -> bool:
+    try:
+        written_at = float(request.cookies.get(WRITE_COOKIE, "nan"))
+    except ValueError:
+        return False
+    return 0 <= time.time() - written_at < READ_YOUR_WRITES_SECONDS
+
+
+def read_candidates(request: Request) -> list[Replica]:
+    if wrote_recently(request):
+        return []
+    return replica_set.candidates(request_caller(request))
+
+
+def get_read_db(request: Request):
+    if shard_set.shard_for(request_tenant(request)) is not shard_set.default:
+        yield from get_db(request)
+        return
+    for replica in read_candidates(request):
+        try:
+            connection = replica.engine.connect()
+        except DBAPIError:
+            replica_set.mark_down(replica)
+            continue
+        replica_set.begin_read(replica)
+        try:
+            with SessionLocal(bind=connection, info={"replica": replica, "primary": shard_set.default.engine}) as db:
+                yield db
+        except DBAPIError:
+            replica_set.mark_down(replica)
+            raise
+        finally:
+            replica_set.end_read(replica)
+            connection.close()
+        return
+    if replica_set.replicas:
+        replica_set.begin_read(None)
+    yield from get_db(request)
+
+
+async def get_async_read_db(request: Request):
+    if shard_set.shard_for(request_tenant(request)) is not shard_set.default:
+        async for db in get_async_db(request):
+            yield db
+        return
+    for replica in read_candidates(request):
+        try:
+            connection = await replica.async_engine.connect()
+        except DBAPIError:
+            replica_set.mark_down(replica)
+            continue
+        replica_set.begin_read(replica)
+        primary = shard_set.default.async_engine.sync_engine
+        try:
+            async with AsyncSessionLocal(bind=connection, info={"replica": replica, "primary": primary}) as db:
+                yield db
+        except DBAPIError:
+            replica_set.mark_down(replica)
+            raise
+        finally:
+            replica_set.end_read(replica)
+            await connection.close()
+        return
+    if replica_set.replicas:
+        replica_set.begin_read(None)
+    async for db in get_async_db(request):
+        yield db
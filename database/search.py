@@ -0,0 +1,151 @@
+import re
+
+from fastapi import HTTPException, Query
+from sqlalchemy import Select, column, func, literal_column, select, table, text
+from sqlalchemy.engine import Connection
+
+from database.models.task import Task
+from database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor
+
+MAX_SEARCH_TERMS = 16
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+
+class SearchParams:
+    def __init__(
+        self,
+        q: str = Query(..., min_length=1, max_length=200),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        after: str | None = Query(None),
+    ) -> None:
+        self.terms = re.findall(r"\w+", q)[:MAX_SEARCH_TERMS]
+        if not self.terms:
+            raise HTTPException(status_code=400, detail="Search query has no terms")
+        self.limit = limit
+        self.offset = decode_cursor(after) if after else 0
+
+
+def build_search_page(rows: list, params: SearchParams) -> dict:
+    next_cursor = None
+    if len(rows) > params.limit:
+        rows = rows[: params.limit]
+        next_cursor = encode_cursor(params.offset + params.limit)
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+class Fts5Search:
+    fts = table("tasks_fts", column("rowid"))
+
+    def install(self, connection: Connection) -> None:
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'")
+        ).first()
+        if exists:
+            return
+
+        connection.execute(
+            text(
+                "CREATE VIRTUAL TABLE tasks_fts USING fts5("
+                "title, description, content = 'tasks', content_rowid = 'id', "
+                "tokenize = 'porter unicode61')"
+            )
+        )
+        connection.execute(
+            text(
+                "CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN "
+                "INSERT INTO tasks_fts (rowid, title, description) "
+                "VALUES (new.id, new.title, new.description); "
+                "END"
+            )
+        )
+        connection.execute(
+            text(
+                "CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN "
+                "INSERT INTO tasks_fts (tasks_fts, rowid, title, description) "
+                "VALUES ('delete', old.id, old.title, old.description); "
+                "INSERT INTO tasks_fts (rowid, title, description) "
+                "VALUES (new.id, new.title, new.description); "
+                "END"
+            )
+        )
+        connection.execute(
+            text(
+                "CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN "
+                "INSERT INTO tasks_fts (tasks_fts, rowid, title, description) "
+                "VALUES ('delete', old.id, old.title, old.description); "
+                "END"
+            )
+        )
+        connection.execute(text("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')"))
+
+    def statement(self, terms: list[str]) -> Select:
+        match = " ".join(f'"{term}"' for term in terms)
+        rank = func.bm25(literal_column("tasks_fts"), TITLE_WEIGHT, DESCRIPTION_WEIGHT)
+        return (
+            select(Task)
+            .join(self.fts, self.fts.c.rowid == Task.id)
+            .where(literal_column("tasks_fts").op("MATCH")(match))
+            .order_by(rank, Task.id)
+        )
+
+
+class SqlServerFullTextSearch:
+    catalog = "tasks_catalog"
+
+    def install(self, connection: Connection) -> None:
+        exists = connection.execute(
+            text("SELECT 1 FROM sys.fulltext_indexes WHERE object_id = OBJECT_ID('tasks')")
+        ).first()
+        if exists:
+            return
+
+        key_index = connection.execute(
+            text(
+                "SELECT name FROM sys.indexes "
+                "WHERE object_id = OBJECT_ID('tasks') AND is_primary_key = 1"
+            )
+        ).scalar_one()
+        with connection.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as ddl:
+            ddl.execute(
+                text(
+                    f"IF NOT EXISTS (SELECT 1 FROM sys.fulltext_catalogs WHERE name = '{self.catalog}') "
+                    f"CREATE FULLTEXT CATALOG {self.catalog}"
+                )
+            )
+            ddl.execute(
+                text(
+                    f"CREATE FULLTEXT INDEX ON tasks (title, description) KEY INDEX [{key_index}] "
+                    f"ON {self.catalog} WITH CHANGE_TRACKING AUTO"
+                )
+            )
+
+    def statement(self, terms: list[str]) -> Select:
+        condition = " AND ".join(f'FORMSOF(INFLECTIONAL, "{term}")' for term in terms)
+        matches = (
+            func.containstable(
+                literal_column("tasks"),
+                literal_column("(title, description)"),
+                condition,
+            )
+            .table_valued(column("KEY"), column("RANK"))
+            .alias("matches")
+        )
+        return (
+            select(Task)
+            .join(matches, matches.c.KEY == Task.id)
+            .order_by(matches.c.RANK.desc(), Task.id)
+        )
+
+
+SEARCH_BACKENDS = {
+    "sqlite": Fts5Search(),
+    "mssql": SqlServerFullTextSearch(),
+}
+
+
+def search_backend(dialect_name: str):
+    backend = SEARCH_BACKENDS.get(dialect_name)
+    if backend is None:
+        raise HTTPException(status_code=501, detail="Task search is not available for this database")
+    return backend
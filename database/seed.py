@@ -1,23 +1,26 @@
-from database.db import SessionLocal
+from sqlalchemy.orm import Session
+
+from database.models.tenant import Tenant
 from database.models.user import User
 from security.jwt import hash_password
 
+SYSTEM_TENANT_ID = 0
+
 
-def seed_system_admin() -> None:
-    db = SessionLocal()
-    try:
-        existing = db.query(User).filter(User.email == "system@fusion.com").first()
-        if existing:
-            return
-        admin = User(
-            name="System Admin",
-            email="system@fusion.com",
-            password_hash=hash_password("123456"),
-            role="SYSTEM_ADMIN",
-            tenant_id=0,
-            is_locked=False,
-        )
-        db.add(admin)
-        db.commit()
-    finally:
-        db.close()
+def seed_system_admin(db: Session) -> None:
+    existing = db.query(User).filter(User.email == "system@fusion.com").first()
+    if existing:
+        return
+    if not db.get(Tenant, SYSTEM_TENANT_ID):
+        db.add(Tenant(id=SYSTEM_TENANT_ID, name="System"))
+        db.flush()
+    admin = User(
+        name="System Admin",
+        email="system@fusion.com",
+        password_hash=hash_password("123456"),
+        role="SYSTEM_ADMIN",
+        tenant_id=SYSTEM_TENANT_ID,
+        is_locked=False,
+    )
+    db.add(admin)
+    db.commit()
@@ -0,0 +1,432 @@
+import argparse
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Request
+from sqlalchemy import create_engine, delete, func, insert, inspect, select, update
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from database.db import (
+    ASYNC_MODE,
+    DATABASE_URL,
+    AsyncSessionLocal,
+    Base,
+    SessionLocal,
+    async_engine,
+    enable_sqlite_foreign_keys,
+    engine,
+    pool_options,
+    sync_url,
+)
+from database.models.job import ACTIVE_STATUSES, Job
+from database.models.shard import IdBlock, ShardLoad, TenantShard, UserEmail
+from database.pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from monitoring.metrics import install_query_hooks
+from security.tokens import token_claims
+
+logger = logging.getLogger(__name__)
+
+DATABASE_SHARD_URLS = dict(
+    item.strip().split("=", 1) for item in os.getenv("DATABASE_SHARD_URLS", "").split(",") if item.strip()
+)
+DATABASE_DIRECTORY_URL = os.getenv("DATABASE_DIRECTORY_URL", DATABASE_URL)
+SHARD_MAP_REFRESH_SECONDS = float(os.getenv("SHARD_MAP_REFRESH_SECONDS", "5"))
+ID_BLOCK_SIZE = int(os.getenv("ID_BLOCK_SIZE", "1000"))
+TENANT_MOVE_BATCH_SIZE = int(os.getenv("TENANT_MOVE_BATCH_SIZE", "1000"))
+TENANT_MOVE_GRACE_SECONDS = float(os.getenv("TENANT_MOVE_GRACE_SECONDS", "1"))
+
+DEFAULT_SHARD = "default"
+SHARDED = bool(DATABASE_SHARD_URLS)
+
+TENANT_TABLES = (
+    "tenants",
+    "users",
+    "projects",
+    "project_members",
+    "project_member_counts",
+    "project_task_counts",
+    "tasks",
+    "task_activity",
+)
+
+
+@dataclass(eq=False)
+class Shard:
+    name: str
+    engine: Engine
+    sessions: sessionmaker
+    async_engine: object | None = None
+    async_sessions: object | None = None
+    sessions_opened: int = 0
+
+
+def create_engine_for(url) -> Engine:
+    sync = sync_url(url)
+    shard_engine = create_engine(sync, **pool_options(sync, InstrumentedQueuePool))
+    install_query_hooks(shard_engine)
+    enable_sqlite_foreign_keys(shard_engine)
+    return shard_engine
+
+
+def create_shard(name: str, url: str) -> Shard:
+    shard_engine = create_engine_for(url)
+    shard = Shard(name, shard_engine, sessionmaker(autocommit=False, autoflush=False, bind=shard_engine))
+    if ASYNC_MODE:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        shard.async_engine = create_async_engine(url, **pool_options(make_url(url), InstrumentedAsyncQueuePool))
+        install_query_hooks(shard.async_engine.sync_engine)
+        enable_sqlite_foreign_keys(shard.async_engine.sync_engine)
+        shard.async_sessions = async_sessionmaker(bind=shard.async_engine, autoflush=False, expire_on_commit=False)
+    return shard
+
+
+def tenant_tables(tenant_id: int) -> list:
+    tables = Base.metadata.tables
+    projects = select(tables["projects"].c.id).where(tables["projects"].c.tenant_id == tenant_id)
+    conditions = {
+        "tenants": tables["tenants"].c.id == tenant_id,
+        "users": tables["users"].c.tenant_id == tenant_id,
+        "projects": tables["projects"].c.tenant_id == tenant_id,
+    }
+    return [
+        (tables[name], conditions[name] if name in conditions else tables[name].c.project_id.in_(projects))
+        for name in TENANT_TABLES
+    ]
+
+
+def adjust_load(connection, name: str, delta: int) -> None:
+    stmt = update(ShardLoad).where(ShardLoad.shard == name).values(users=ShardLoad.users + delta)
+    if connection.execute(stmt).rowcount:
+        return
+    try:
+        with connection.begin_nested():
+            connection.execute(insert(ShardLoad).values(shard=name, users=max(delta, 0)))
+    except IntegrityError:
+        connection.execute(stmt)
+
+
+class ShardSet:
+    def __init__(self, shards: dict[str, Shard], directory: Engine) -> None:
+        self.shards = shards
+        self.default = shards[DEFAULT_SHARD]
+        self.directory = directory
+        self.sharded = len(shards) > 1
+        self._placements: dict[int, tuple[str, bool]] = {}
+        self._refreshed_at = float("-inf")
+        self._blocks: dict[str, tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._id_lock = threading.Lock()
+
+    def refresh(self) -> None:
+        with self.directory.connect() as connection:
+            rows = connection.execute(select(TenantShard.tenant_id, TenantShard.shard, TenantShard.moving)).all()
+        with self._lock:
+            self._placements = {tenant_id: (shard, moving) for tenant_id, shard, moving in rows}
+            self._refreshed_at = time.monotonic()
+
+    def placement(self, tenant_id: int | None) -> tuple[str, bool]:
+        if not self.sharded or tenant_id is None:
+            return DEFAULT_SHARD, False
+        if time.monotonic() - self._refreshed_at > SHARD_MAP_REFRESH_SECONDS:
+            self.refresh()
+        placement = self._placements.get(tenant_id)
+        if placement is None:
+            with self.directory.connect() as connection:
+                row = connection.execute(
+                    select(TenantShard.shard, TenantShard.moving).where(TenantShard.tenant_id == tenant_id)
+                ).first()
+            if row is None:
+                if not self.hosts_tenant(self.default, tenant_id):
+                    return DEFAULT_SHARD, False
+                self.place(tenant_id, self.default)
+                return DEFAULT_SHARD, False
+            placement = (row.shard, row.moving)
+            with self._lock:
+                self._placements[tenant_id] = placement
+        return placement
+
+    def hosts_tenant(self, shard: Shard, tenant_id: int) -> bool:
+        tenants = Base.metadata.tables["tenants"]
+        with shard.engine.connect() as connection:
+            return connection.scalar(select(tenants.c.id).where(tenants.c.id == tenant_id)) is not None
+
+    def shard_for(self, tenant_id: int | None) -> Shard:
+        return self.shards[self.placement(tenant_id)[0]]
+
+    def route(self, tenant_id: int | None, write: bool = False) -> Shard:
+        name, moving = self.placement(tenant_id)
+        if write and moving:
+            raise HTTPException(
+                status_code=503,
+                detail="Tenant is being moved to another shard",
+                headers={"Retry-After": str(int(SHARD_MAP_REFRESH_SECONDS + TENANT_MOVE_GRACE_SECONDS))},
+            )
+        shard = self.shards[name]
+        shard.sessions_opened += 1
+        return shard
+
+    def place(self, tenant_id: int, shard: Shard, moving: bool = False) -> None:
+        if not self.sharded:
+            return
+        values = {"shard": shard.name, "moving": moving}
+        with self.directory.begin() as connection:
+            if not connection.execute(
+                update(TenantShard).where(TenantShard.tenant_id == tenant_id).values(**values)
+            ).rowcount:
+                connection.execute(insert(TenantShard).values(tenant_id=tenant_id, **values))
+        with self._lock:
+            self._placements[tenant_id] = (shard.name, moving)
+
+    def least_loaded(self) -> Shard:
+        if not self.sharded:
+            return self.default
+        with self.directory.connect() as connection:
+            loads = dict(connection.execute(select(ShardLoad.shard, ShardLoad.users)).all())
+        return min(self.shards.values(), key=lambda shard: loads.get(shard.name, 0))
+
+    def locate_email(self, email: str) -> Shard | None:
+        with self.directory.connect() as connection:
+            name = connection.scalar(select(UserEmail.shard).where(UserEmail.email == email))
+        return self.shards[name] if name is not None else None
+
+    def claim_email(self, email: str, shard: Shard) -> bool:
+        try:
+            with self.directory.begin() as connection:
+                connection.execute(insert(UserEmail).values(email=email, shard=shard.name))
+                adjust_load(connection, shard.name, 1)
+        except IntegrityError:
+            return False
+        return True
+
+    def release_email(self, email: str) -> None:
+        with self.directory.begin() as connection:
+            name = connection.scalar(delete(UserEmail).where(UserEmail.email == email).returning(UserEmail.shard))
+            if name is not None:
+                adjust_load(connection, name, -1)
+
+    def move_emails(self, emails: list[str], source: Shard, target: Shard) -> None:
+        if not emails:
+            return
+        with self.directory.begin() as connection:
+            connection.execute(delete(UserEmail).where(UserEmail.email.in_(emails)))
+            connection.execute(insert(UserEmail), [{"email": email, "shard": target.name} for email in emails])
+            adjust_load(connection, source.name, -len(emails))
+            adjust_load(connection, target.name, len(emails))
+
+    def fan_out(self, stmt) -> list:
+        rows = []
+        for shard in self.shards.values():
+            with shard.sessions() as db:
+                rows += db.execute(stmt).scalars().all()
+        return rows
+
+    async def fan_out_async(self, stmt) -> list:
+        async def run(shard: Shard) -> list:
+            async with shard.async_sessions() as db:
+                return (await db.execute(stmt)).scalars().all()
+
+        results = await asyncio.gather(*(run(shard) for shard in self.shards.values()))
+        return [row for rows in results for row in rows]
+
+    def next_id(self, name: str) -> int:
+        with self._id_lock:
+            next_id, end = self._blocks.get(name, (0, 0))
+            if next_id >= end:
+                next_id, end = self.reserve_ids(name)
+            self._blocks[name] = (next_id + 1, end)
+        return next_id
+
+    def reserve_ids(self, name: str) -> tuple[int, int]:
+        while True:
+            with self.directory.begin() as connection:
+                end = connection.scalar(
+                    update(IdBlock)
+                    .where(IdBlock.name == name)
+                    .values(next_id=IdBlock.next_id + ID_BLOCK_SIZE)
+                    .returning(IdBlock.next_id)
+                )
+            if end is not None:
+                return end - ID_BLOCK_SIZE, end
+            table = Base.metadata.tables[name]
+            floor = 1
+            for shard in self.shards.values():
+                with shard.engine.connect() as connection:
+                    if inspect(connection).has_table(name):
+                        floor = max(floor, (connection.scalar(select(func.max(table.c.id))) or 0) + 1)
+            try:
+                with self.directory.begin() as connection:
+                    connection.execute(insert(IdBlock).values(name=name, next_id=floor))
+            except IntegrityError:
+                pass
+
+    def engines(self) -> list[Engine]:
+        engines = [shard.engine for shard in self.shards.values()]
+        if self.directory not in engines:
+            engines.insert(0, self.directory)
+        return engines
+
+    def stats(self) -> dict:
+        return {name: {"sessions": shard.sessions_opened} for name, shard in self.shards.items()}
+
+    def pools(self) -> dict:
+        pools = {}
+        for shard in self.shards.values():
+            if shard is self.default:
+                continue
+            pools[shard.name] = shard.engine.pool
+            if shard.async_engine is not None:
+                pools[f"{shard.name}_async"] = shard.async_engine.pool
+        if self.directory not in [shard.engine for shard in self.shards.values()]:
+            pools["directory"] = self.directory.pool
+        return pools
+
+
+def create_shard_set() -> ShardSet:
+    shards = {DEFAULT_SHARD: Shard(DEFAULT_SHARD, engine, SessionLocal, async_engine, AsyncSessionLocal)}
+    for name, url in DATABASE_SHARD_URLS.items():
+        shards[name] = create_shard(name, url)
+    directory = engine if DATABASE_DIRECTORY_URL == DATABASE_URL else create_engine_for(DATABASE_DIRECTORY_URL)
+    if SHARDED and directory.dialect.name == "sqlite" and directory in [shard.engine for shard in shards.values()]:
+        raise RuntimeError("SQLite shards need DATABASE_DIRECTORY_URL to name a database file of its own")
+    return ShardSet(shards, directory)
+
+
+shard_set = create_shard_set()
+
+
+def global_id(name: str):
+    if not SHARDED:
+        return None
+    return lambda: shard_set.next_id(name)
+
+
+def claim_id(claims: dict | None, name: str) -> int | None:
+    value = (claims or {}).get(name)
+    return value if type(value) is int else None
+
+
+def token_tenant(token: str) -> int | None:
+    if not shard_set.sharded:
+        return None
+    return claim_id(token_claims(token), "tenant_id")
+
+
+def request_claims(request: Request) -> dict | None:
+    if not hasattr(request.state, "token_claims"):
+        scheme, _, token = (request.headers.get("authorization") or "").partition(" ")
+        request.state.token_claims = token_claims(token) if scheme.lower() == "bearer" else None
+    return request.state.token_claims
+
+
+def request_tenant(request: Request) -> int | None:
+    if not shard_set.sharded:
+        return None
+    return claim_id(request_claims(request), "tenant_id")
+
+
+def request_caller(request: Request) -> int | None:
+    return claim_id(request_claims(request), "user_id")
+
+
+def unit_of_work(shard: Shard, caller: int | None):
+    db = shard.sessions(expire_on_commit=False)
+    db.info["caller"] = caller
+    db.info["shard"] = shard.name
+    try:
+        yield db
+        db.commit()
+    finally:
+        db.close()
+
+
+def get_db(request: Request):
+    db = shard_set.route(request_tenant(request)).sessions()
+    db.info["caller"] = request_caller(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_unit_of_work(request: Request):
+    shard = shard_set.route(request_tenant(request), write=True)
+    yield from unit_of_work(shard, request_caller(request))
+
+
+async def get_async_db(request: Request):
+    async with shard_set.route(request_tenant(request)).async_sessions() as db:
+        db.info["caller"] = request_caller(request)
+        yield db
+
+
+def move_tenant(tenant_id: int, target: Shard) -> Counter:
+    shard_set.refresh()
+    source = shard_set.shard_for(tenant_id)
+    if source is target:
+        raise RuntimeError(f"Tenant {tenant_id} already lives on shard {target.name}")
+    with source.engine.connect() as connection:
+        if connection.scalar(
+            select(func.count()).select_from(Job).where(Job.tenant_id == tenant_id, Job.status.in_(ACTIVE_STATUSES))
+        ):
+            raise RuntimeError(f"Tenant {tenant_id} has queued or running jobs")
+
+    shard_set.place(tenant_id, source, moving=True)
+    time.sleep(SHARD_MAP_REFRESH_SECONDS + TENANT_MOVE_GRACE_SECONDS)
+    copied = Counter()
+    try:
+        with source.engine.connect() as reader, target.engine.begin() as writer:
+            for table, condition in tenant_tables(tenant_id):
+                result = reader.execution_options(yield_per=TENANT_MOVE_BATCH_SIZE).execute(
+                    select(table).where(condition)
+                )
+                for rows in result.mappings().partitions():
+                    writer.execute(insert(table), [dict(row) for row in rows])
+                    copied[table.name] += len(rows)
+    except Exception:
+        shard_set.place(tenant_id, source)
+        raise
+
+    shard_set.place(tenant_id, target)
+    users = Base.metadata.tables["users"]
+    with target.engine.connect() as connection:
+        emails = connection.scalars(select(users.c.email).where(users.c.tenant_id == tenant_id)).all()
+    shard_set.move_emails(emails, source, target)
+    time.sleep(SHARD_MAP_REFRESH_SECONDS + TENANT_MOVE_GRACE_SECONDS)
+    with source.engine.begin() as connection:
+        for table, condition in reversed(tenant_tables(tenant_id)):
+            connection.execute(delete(table).where(condition))
+    return copied
+
+
+if __name__ == "__main__":
+    from database.migrations import check_schema_version
+    from database.shards import move_tenant as move, shard_set as shards
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Inspect tenant placement and move tenants between shards")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="count tenants and users per shard")
+    move_parser = commands.add_parser("move", help="copy a tenant to another shard and switch its routing")
+    move_parser.add_argument("tenant_id", type=int)
+    move_parser.add_argument("shard", choices=sorted(shards.shards))
+    args = parser.parse_args()
+
+    check_schema_version()
+    if args.command == "status":
+        tables = Base.metadata.tables
+        for name, shard in shards.shards.items():
+            with shard.engine.connect() as connection:
+                tenants = connection.scalar(select(func.count()).select_from(tables["tenants"]))
+                users = connection.scalar(select(func.count()).select_from(tables["users"]))
+            print(f"{name}: {tenants} tenants, {users} users")
+    else:
+        copied = move(args.tenant_id, shards.shards[args.shard])
+        print(f"Moved tenant {args.tenant_id} to {args.shard}: " + ", ".join(f"{n}={c}" for n, c in copied.items()))
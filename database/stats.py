@@ -0,0 +1,189 @@
+import argparse
+import sys
+from collections import Counter
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from database.models.project import ProjectMember
+from database.models.project_stats import ProjectMemberCount, ProjectTaskCount
+from database.models.task import Task
+
+UNASSIGNED = 0
+CLOSED_TASK_STATUSES = {"DONE"}
+ON_CONFLICT_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+
+def task_key(task: Task) -> tuple:
+    return (task.project_id, task.status, task.assignee_id or UNASSIGNED)
+
+
+def member_key(member: ProjectMember) -> tuple:
+    return (member.project_id, member.role_in_project)
+
+
+def moved(before: tuple, after: tuple) -> Counter:
+    deltas = Counter()
+    deltas[before] -= 1
+    deltas[after] += 1
+    return deltas
+
+
+def _upsert_statement(dialect_name: str, model, keys: list[str]):
+    table = model.__table__
+    if dialect_name == "mssql":
+        source = ", ".join(f":{key} AS {key}" for key in keys)
+        match = " AND ".join(f"target.{key} = source.{key}" for key in keys)
+        columns = ", ".join(keys)
+        values = ", ".join(f"source.{key}" for key in keys)
+        return text(
+            f"MERGE {table.name} WITH (HOLDLOCK) AS target USING (SELECT {source}) AS source ON {match} "
+            "WHEN MATCHED THEN UPDATE SET [count] = target.[count] + :count "
+            f"WHEN NOT MATCHED THEN INSERT ({columns}, [count]) VALUES ({values}, :count);"
+        )
+    if dialect_name not in ON_CONFLICT_INSERTS:
+        raise RuntimeError(f"Project counters do not support the {dialect_name} dialect")
+    stmt = ON_CONFLICT_INSERTS[dialect_name](table)
+    return stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={"count": table.c.count + stmt.excluded.count},
+    )
+
+
+def _adjust(db: Session, model, deltas: Counter) -> None:
+    keys = [column.name for column in model.__table__.primary_key.columns]
+    rows = [dict(zip(keys, key), count=delta) for key, delta in deltas.items() if delta]
+    if rows:
+        db.execute(_upsert_statement(db.get_bind().dialect.name, model, keys), rows)
+
+
+def adjust_task_counts(db: Session, deltas: Counter) -> None:
+    _adjust(db, ProjectTaskCount, deltas)
+
+
+def adjust_member_counts(db: Session, deltas: Counter) -> None:
+    _adjust(db, ProjectMemberCount, deltas)
+
+
+def project_task_total(db: Session, project_id: int) -> int:
+    return db.scalar(
+        select(func.coalesce(func.sum(ProjectTaskCount.count), 0)).where(ProjectTaskCount.project_id == project_id)
+    )
+
+
+def stats_statements(project_ids: list[int]) -> tuple:
+    return (
+        select(ProjectTaskCount).where(
+            ProjectTaskCount.project_id.in_(project_ids), ProjectTaskCount.count != 0
+        ),
+        select(ProjectMemberCount).where(
+            ProjectMemberCount.project_id.in_(project_ids), ProjectMemberCount.count != 0
+        ),
+    )
+
+
+def build_stats(projects: list, task_counts: list, member_counts: list) -> list[dict]:
+    stats = {
+        project.id: {
+            "project_id": project.id,
+            "name": project.name,
+            "tasks_by_status": Counter(),
+            "open_tasks_by_assignee": Counter(),
+            "unassigned_open_tasks": 0,
+            "members_by_role": {},
+        }
+        for project in projects
+    }
+    for row in task_counts:
+        entry = stats[row.project_id]
+        entry["tasks_by_status"][row.status] += row.count
+        if row.status in CLOSED_TASK_STATUSES:
+            continue
+        if row.assignee_key == UNASSIGNED:
+            entry["unassigned_open_tasks"] += row.count
+        else:
+            entry["open_tasks_by_assignee"][row.assignee_key] += row.count
+    for row in member_counts:
+        stats[row.project_id]["members_by_role"][row.role_in_project] = row.count
+    return list(stats.values())
+
+
+def computed_counts(db: Session) -> tuple[Counter, Counter]:
+    assignee_key = func.coalesce(Task.assignee_id, UNASSIGNED)
+    tasks = db.execute(
+        select(Task.project_id, Task.status, assignee_key, func.count()).group_by(
+            Task.project_id, Task.status, assignee_key
+        )
+    )
+    members = db.execute(
+        select(ProjectMember.project_id, ProjectMember.role_in_project, func.count()).group_by(
+            ProjectMember.project_id, ProjectMember.role_in_project
+        )
+    )
+    return (
+        Counter({tuple(row[:-1]): row[-1] for row in tasks}),
+        Counter({tuple(row[:-1]): row[-1] for row in members}),
+    )
+
+
+def stored_counts(db: Session) -> tuple[Counter, Counter]:
+    tasks = db.execute(
+        select(
+            ProjectTaskCount.project_id,
+            ProjectTaskCount.status,
+            ProjectTaskCount.assignee_key,
+            ProjectTaskCount.count,
+        )
+    )
+    members = db.execute(
+        select(ProjectMemberCount.project_id, ProjectMemberCount.role_in_project, ProjectMemberCount.count)
+    )
+    return (
+        Counter({tuple(row[:-1]): row[-1] for row in tasks}),
+        Counter({tuple(row[:-1]): row[-1] for row in members}),
+    )
+
+
+def diff_counts(db: Session) -> list[str]:
+    mismatches = []
+    for label, computed, stored in zip(("tasks", "members"), computed_counts(db), stored_counts(db)):
+        for key in sorted(set(computed) | set(stored), key=repr):
+            if computed[key] != stored[key]:
+                mismatches.append(f"{label} {key}: stored {stored[key]}, actual {computed[key]}")
+    return mismatches
+
+
+def rebuild_counts(db: Session) -> None:
+    tasks, members = computed_counts(db)
+    db.execute(delete(ProjectTaskCount))
+    db.execute(delete(ProjectMemberCount))
+    adjust_task_counts(db, tasks)
+    adjust_member_counts(db, members)
+    db.commit()
+
+
+if __name__ == "__main__":
+    from database.models import tenant, user
+    from database.shards import shard_set
+
+    parser = argparse.ArgumentParser(description="Compare project counters against tasks and members")
+    parser.add_argument("--repair", action="store_true", help="rebuild the counters from scratch")
+    args = parser.parse_args()
+
+    mismatches = []
+    for shard in shard_set.shards.values():
+        with shard.sessions() as db:
+            shard_mismatches = diff_counts(db)
+            for line in shard_mismatches:
+                print(f"[{shard.name}] {line}")
+            if args.repair:
+                rebuild_counts(db)
+            mismatches += shard_mismatches
+    if args.repair:
+        print(f"Rebuilt project counters ({len(mismatches)} mismatches fixed)")
+    elif mismatches:
+        sys.exit(1)
+    else:
+        print("Project counters are consistent")
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+
+from sqlalchemy.orm import Session
+
+from database.db import on_commit
+from security.permissions import ROLE_TENANT_ADMIN
+
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))
+
+RESYNC_FRAME = "event: resync\ndata: {}\n\n"
+
+
+@dataclass
+class Event:
+    type: str
+    tenant_id: int
+    project_id: int | None
+    data: dict
+
+
+@dataclass(eq=False, slots=True)
+class Subscription:
+    user_id: int
+    tenant_id: int
+    role: str
+    project_ids: set[int]
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(EVENTS_QUEUE_SIZE))
+
+    def can_see(self, event: Event) -> bool:
+        return self.role == ROLE_TENANT_ADMIN or event.project_id in self.project_ids
+
+    def offer(self, frame: str) -> bool:
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            self.replace_backlog(RESYNC_FRAME)
+            return False
+
+    def close(self) -> None:
+        self.replace_backlog(None)
+
+    def replace_backlog(self, frame: str | None) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(frame)
+
+
+class EventHub:
+    def __init__(self) -> None:
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._tenants: dict[int, set[Subscription]] = {}
+        self._sequence = 0
+        self._subscribers = 0
+        self._published = 0
+        self._resyncs = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int, tenant_id: int, role: str, project_ids: set[int]) -> Subscription:
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(user_id, tenant_id, role, project_ids)
+        self._tenants.setdefault(tenant_id, set()).add(subscription)
+        self._subscribers += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._tenants.get(subscription.tenant_id)
+        if subscribers is None:
+            return
+        if subscription in subscribers:
+            subscribers.discard(subscription)
+            self._subscribers -= 1
+        if not subscribers:
+            del self._tenants[subscription.tenant_id]
+
+    def publish(self, events: list[Event]) -> None:
+        loop = self._loop
+        if not events or loop is None or loop.is_closed():
+            return
+        with self._lock:
+            self._published += len(events)
+        loop.call_soon_threadsafe(self._dispatch, events)
+
+    def _dispatch(self, events: list[Event]) -> None:
+        for event in events:
+            subscribers = self._tenants.get(event.tenant_id)
+            if not subscribers:
+                continue
+            self._sequence += 1
+            frame = f"id: {self._sequence}\nevent: {event.type}\ndata: {json.dumps(event.data)}\n\n"
+            for subscription in list(subscribers):
+                self._deliver(subscription, event, frame)
+
+    def _deliver(self, subscription: Subscription, event: Event, frame: str) -> None:
+        affects_subscriber = event.data.get("user_id") == subscription.user_id
+        if event.type == "user.deleted":
+            if affects_subscriber:
+                subscription.close()
+            return
+        if event.type == "member.added" and affects_subscriber:
+            subscription.project_ids.add(event.project_id)
+        if subscription.can_see(event) and not subscription.offer(frame):
+            self._resyncs += 1
+        if event.type == "project.deleted" or (event.type == "member.removed" and affects_subscriber):
+            subscription.project_ids.discard(event.project_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            published = self._published
+        return {
+            "subscribers": self._subscribers,
+            "published": published,
+            "resyncs": self._resyncs,
+        }
+
+
+hub = EventHub()
+
+
+def publish_events(db: Session, events: list[Event]) -> None:
+    on_commit(db, lambda: hub.publish(events))
+
+
+def publish(db: Session, event_type: str, tenant_id: int, project_id: int | None, data: dict) -> None:
+    publish_events(db, [Event(event_type, tenant_id, project_id, data)])
+
+
+def publish_many(db: Session, event_type: str, tenant_id: int, items: list[dict]) -> None:
+    publish_events(db, [Event(event_type, tenant_id, item["project_id"], item) for item in items])
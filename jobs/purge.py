@@ -0,0 +1,146 @@
+import os
+from collections import Counter
+
+from sqlalchemy import delete, func, select, union, update
+from sqlalchemy.orm import Session
+
+from database.db import on_commit
+from database.models.project import Project, ProjectMember
+from database.models.task import Task
+from database.models.user import User
+from database.shards import shard_set
+from database.stats import UNASSIGNED, adjust_member_counts, adjust_task_counts
+from events.hub import Event, publish, publish_events
+from jobs.runner import JobContext, job_handler
+from security.principal_cache import principal_cache
+
+PROJECT_PURGE_THRESHOLD = int(os.getenv("PROJECT_PURGE_THRESHOLD", "5000"))
+PROJECT_PURGE_CHUNK_SIZE = int(os.getenv("PROJECT_PURGE_CHUNK_SIZE", "2000"))
+USER_PURGE_THRESHOLD = int(os.getenv("USER_PURGE_THRESHOLD", "5000"))
+USER_PURGE_CHUNK_SIZE = int(os.getenv("USER_PURGE_CHUNK_SIZE", "2000"))
+
+
+def chunk_scope(db: Session, condition, size: int) -> list:
+    boundary = db.scalar(select(Task.id).where(condition).order_by(Task.id).offset(size - 1).limit(1))
+    scope = [condition]
+    if boundary is not None:
+        scope.append(Task.id <= boundary)
+    return scope
+
+
+def delete_task_chunk(db: Session, project_id: int, size: int) -> int:
+    scope = chunk_scope(db, Task.project_id == project_id, size)
+    assignee_key = func.coalesce(Task.assignee_id, UNASSIGNED)
+    counts = db.execute(
+        select(Task.status, assignee_key, func.count()).where(*scope).group_by(Task.status, assignee_key)
+    ).all()
+    if not counts:
+        return 0
+    adjust_task_counts(db, Counter({(project_id, status, assignee): -count for status, assignee, count in counts}))
+    db.execute(delete(Task).where(*scope))
+    db.execute(update(Project).where(Project.id == project_id).values(version=Project.version + 1))
+    return sum(count for _, _, count in counts)
+
+
+@job_handler("project.purge")
+def purge_project(context: JobContext) -> None:
+    project_id = context.payload["project_id"]
+    deleted = context.progress
+    with context.shard.sessions() as db:
+        while chunk := delete_task_chunk(db, project_id, PROJECT_PURGE_CHUNK_SIZE):
+            deleted += chunk
+            context.report(db, deleted)
+            db.commit()
+        if db.execute(delete(Project).where(Project.id == project_id)).rowcount:
+            publish(db, "project.deleted", context.payload["tenant_id"], project_id, {"project_id": project_id})
+        db.commit()
+
+
+def assigned_task_counts(db: Session, user_id: int) -> list:
+    return db.execute(
+        select(Task.project_id, Task.status, func.count())
+        .where(Task.assignee_id == user_id)
+        .group_by(Task.project_id, Task.status)
+    ).all()
+
+
+def unassigned_events(tenant_id: int, user_id: int, assigned: list) -> list[Event]:
+    return [
+        Event("tasks.unassigned", tenant_id, project_id, {"project_id": project_id, "user_id": user_id})
+        for project_id in sorted({project_id for project_id, _, _ in assigned})
+    ]
+
+
+def move_to_unassigned(user_id: int, assigned: list) -> Counter:
+    deltas = Counter()
+    for project_id, status, count in assigned:
+        deltas[(project_id, status, user_id)] -= count
+        deltas[(project_id, status, UNASSIGNED)] += count
+    return deltas
+
+
+def unassign_task_chunk(db: Session, user: User, size: int) -> int:
+    scope = chunk_scope(db, Task.assignee_id == user.id, size)
+    assigned = db.execute(
+        select(Task.project_id, Task.status, func.count()).where(*scope).group_by(Task.project_id, Task.status)
+    ).all()
+    if not assigned:
+        return 0
+    adjust_task_counts(db, move_to_unassigned(user.id, assigned))
+    db.execute(update(Task).where(*scope).values(assignee_id=None))
+    db.execute(
+        update(Project)
+        .where(Project.id.in_({project_id for project_id, _, _ in assigned}))
+        .values(version=Project.version + 1)
+    )
+    publish_events(db, unassigned_events(user.tenant_id, user.id, assigned))
+    return sum(count for _, _, count in assigned)
+
+
+def remove_user(db: Session, user: User, assigned: list) -> None:
+    affected_projects = union(
+        select(ProjectMember.project_id).where(ProjectMember.user_id == user.id),
+        select(Task.project_id).where(Task.assignee_id == user.id),
+        select(Project.id).where(Project.created_by == user.id),
+    )
+    db.execute(
+        update(Project)
+        .where(Project.id.in_(affected_projects))
+        .values(version=Project.version + 1)
+    )
+    memberships = db.execute(
+        select(ProjectMember.project_id, ProjectMember.role_in_project, func.count())
+        .where(ProjectMember.user_id == user.id)
+        .group_by(ProjectMember.project_id, ProjectMember.role_in_project)
+    ).all()
+    adjust_member_counts(db, Counter({(project_id, role): -count for project_id, role, count in memberships}))
+    adjust_task_counts(db, move_to_unassigned(user.id, assigned))
+    user_id, tenant_id, email = user.id, user.tenant_id, user.email
+    db.delete(user)
+    on_commit(db, lambda: principal_cache.invalidate(user_id))
+    if shard_set.sharded:
+        on_commit(db, lambda: shard_set.release_email(email))
+    publish_events(
+        db,
+        [
+            Event("member.removed", tenant_id, project_id, {"project_id": project_id, "user_id": user_id})
+            for project_id, _, _ in memberships
+        ]
+        + unassigned_events(tenant_id, user_id, assigned)
+        + [Event("user.deleted", tenant_id, None, {"user_id": user_id})],
+    )
+
+
+@job_handler("user.purge")
+def purge_user(context: JobContext) -> None:
+    with context.shard.sessions() as db:
+        user = db.get(User, context.payload["user_id"])
+        if user is None:
+            return
+        unassigned = context.progress
+        while chunk := unassign_task_chunk(db, user, USER_PURGE_CHUNK_SIZE):
+            unassigned += chunk
+            context.report(db, unassigned)
+            db.commit()
+        remove_user(db, user, assigned_task_counts(db, user.id))
+        db.commit()
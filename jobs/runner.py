@@ -0,0 +1,247 @@
+import logging
+import os
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from database.db import on_commit
+from database.models.job import ACTIVE_STATUSES, Job
+from database.shards import Shard, shard_set
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_SECONDS = float(os.getenv("JOB_RETRY_SECONDS", "5"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+
+HANDLERS = {}
+
+
+def job_handler(kind: str):
+    def register(handler):
+        HANDLERS[kind] = handler
+        return handler
+
+    return register
+
+
+def utcnow() -> datetime:
+    return datetime.now(UTC)
+
+
+@dataclass
+class JobContext:
+    id: str
+    kind: str
+    payload: dict
+    attempt: int
+    progress: int
+    shard: Shard
+
+    def report(self, db: Session, progress: int, total: int | None = None) -> None:
+        values = {"progress": progress, "heartbeat_at": utcnow()}
+        if total is not None:
+            values["total"] = total
+        stmt = update(Job).where(Job.id == self.id, Job.attempts == self.attempt).values(**values)
+        if db.get_bind() is self.shard.engine:
+            self.check_lease(db.execute(stmt).rowcount)
+        else:
+            on_commit(db, lambda: self.check_lease(update_job(self.shard, stmt)))
+        self.progress = progress
+
+    def check_lease(self, updated: int) -> None:
+        if not updated:
+            raise RuntimeError(f"Job {self.id} was reclaimed after attempt {self.attempt}")
+
+
+def update_job(shard: Shard, stmt) -> int:
+    with shard.engine.begin() as connection:
+        return connection.execute(stmt).rowcount
+
+
+def active_job(db: Session, subject: str) -> Job | None:
+    return db.scalars(select(Job).where(Job.subject == subject, Job.status.in_(ACTIVE_STATUSES))).first()
+
+
+def enqueue_job(
+    db: Session,
+    kind: str,
+    payload: dict,
+    *,
+    subject: str | None = None,
+    tenant_id: int | None = None,
+    created_by: int | None = None,
+    total: int | None = None,
+) -> Job:
+    now = utcnow()
+    job = Job(
+        id=uuid.uuid4().hex,
+        kind=kind,
+        subject=subject,
+        tenant_id=tenant_id,
+        created_by=created_by,
+        payload=payload,
+        status="queued",
+        total=total,
+        progress=0,
+        attempts=0,
+        run_after=now,
+        created_at=now,
+    )
+    db.add(job)
+    on_commit(db, job_runner.wake)
+    return job
+
+
+class JobRunner:
+    def __init__(self, workers: int, poll_seconds: float) -> None:
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.running = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        if self._threads or self.workers <= 0:
+            return
+        self._stop.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                context = self.claim()
+            except Exception:
+                logger.exception("Claiming a job failed")
+                context = None
+            if context is None:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+                continue
+            self.execute(context)
+
+    def claim(self) -> JobContext | None:
+        for shard in shard_set.shards.values():
+            context = self.claim_from(shard)
+            if context is not None:
+                return context
+        return None
+
+    def claim_from(self, shard: Shard) -> JobContext | None:
+        now = utcnow()
+        claimable = or_(
+            and_(Job.status == "queued", Job.run_after <= now),
+            and_(Job.status == "running", Job.heartbeat_at < now - timedelta(seconds=JOB_LEASE_SECONDS)),
+        )
+        with shard.sessions() as db:
+            candidates = db.execute(
+                select(Job.id, Job.attempts).where(claimable).order_by(Job.created_at).limit(self.workers)
+            ).all()
+            for job_id, attempts in candidates:
+                claimed = db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.attempts == attempts, claimable)
+                    .values(status="running", attempts=attempts + 1, heartbeat_at=now)
+                ).rowcount
+                db.commit()
+                if claimed:
+                    job = db.get(Job, job_id)
+                    return JobContext(job.id, job.kind, job.payload, job.attempts, job.progress, shard)
+        return None
+
+    def execute(self, context: JobContext) -> None:
+        if context.attempt > JOB_MAX_ATTEMPTS:
+            self.finish(context, RuntimeError("Job lease expired on its last attempt"))
+            return
+        with self._lock:
+            self.running += 1
+        try:
+            HANDLERS[context.kind](context)
+        except Exception as exc:
+            logger.exception("Job %s (%s) failed on attempt %s", context.id, context.kind, context.attempt)
+            self.finish(context, exc)
+        else:
+            self.finish(context, None)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def finish(self, context: JobContext, exc: Exception | None) -> None:
+        now = utcnow()
+        if exc is None:
+            values = {"status": "done", "error": None, "finished_at": now}
+            outcome = "completed"
+        elif context.attempt < JOB_MAX_ATTEMPTS and context.kind in HANDLERS:
+            delay = JOB_RETRY_SECONDS * 2 ** (context.attempt - 1)
+            values = {"status": "queued", "error": str(exc), "run_after": now + timedelta(seconds=delay)}
+            outcome = "retried"
+        else:
+            values = {"status": "failed", "error": str(exc), "finished_at": now}
+            outcome = "failed"
+        stmt = update(Job).where(Job.id == context.id, Job.attempts == context.attempt).values(**values)
+        if not update_job(context.shard, stmt):
+            logger.warning(
+                "Job %s was reclaimed after attempt %s, dropping its outcome", context.id, context.attempt
+            )
+            return
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self) -> dict:
+        queued = 0
+        for shard in shard_set.shards.values():
+            with shard.sessions() as db:
+                queued += db.scalar(select(func.count()).select_from(Job).where(Job.status == "queued"))
+        with self._lock:
+            return {
+                "queued": queued,
+                "running": self.running,
+                "completed": self.completed,
+                "retried": self.retried,
+                "failed": self.failed,
+            }
+
+
+job_runner = JobRunner(JOB_WORKERS, JOB_POLL_SECONDS)
+
+
+if __name__ == "__main__":
+    import time
+
+    from database.migrations import check_schema_version
+    from jobs import purge
+    from jobs.runner import job_runner as workers
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(threadName)s %(message)s")
+    check_schema_version()
+    workers.start()
+    logger.info("Running %s job workers", workers.workers)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        workers.stop()
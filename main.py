@@ -1,17 +1,40 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 
-from database.db import init_db
-from database.seed import seed_system_admin
-from routers import users, projects, tasks
+from database.activity import activity_writer
+from database.migrations import check_schema_version
+from database.replicas import ReadYourWritesMiddleware, replica_set
+from jobs.runner import job_runner
+from monitoring.middleware import MetricsMiddleware
+from routers import events, instrumentation, jobs, metrics, users, projects, tasks, tenants
+from security.rate_limit import admit
 
-app = FastAPI(title="FUSION ? Multi-Enterprise IT Project Maintenance & Development Platform")
+app = FastAPI(
+    title="FUSION ? Multi-Enterprise IT Project Maintenance & Development Platform",
+    dependencies=[Depends(admit)],
+)
+
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
 
 app.include_router(users.router)
 app.include_router(projects.router)
 app.include_router(tasks.router)
+app.include_router(tenants.router)
+app.include_router(jobs.router)
+app.include_router(events.router)
+app.include_router(instrumentation.router)
+app.include_router(metrics.router)
 
 
 @app.on_event("startup")
 def on_startup() -> None:
-    init_db()
-    seed_system_admin()
+    check_schema_version()
+    replica_set.start()
+    activity_writer.start()
+    job_runner.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown() -> None:
+    job_runner.stop()
+    activity_writer.stop()
@@ -0,0 +1,163 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: tuple = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple, label_names: tuple = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label_names = label_names
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float) -> None:
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (bucket_counts, count, total) in sorted(self._values.items()):
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    bucket_labels = _format_labels(self.label_names, labels, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{bucket_labels} {bucket_count}")
+                inf_labels = _format_labels(self.label_names, labels, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf_labels} {count}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {total}")
+        return lines
+
+
+class RequestStats:
+    __slots__ = ("db_seconds", "queries")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+current_request_stats: ContextVar[RequestStats | None] = ContextVar("current_request_stats", default=None)
+
+requests_total = Counter(
+    "http_requests_total",
+    "HTTP requests by route and status code.",
+    ("method", "route", "status"),
+)
+request_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route.",
+    LATENCY_BUCKETS,
+    ("method", "route"),
+)
+request_queries = Histogram(
+    "http_request_db_queries",
+    "SQL statements issued per HTTP request.",
+    QUERY_COUNT_BUCKETS,
+    ("method", "route"),
+)
+request_db_duration = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent in SQL statements per HTTP request.",
+    LATENCY_BUCKETS,
+    ("method", "route"),
+)
+
+requests_rejected_total = Counter(
+    "http_requests_rejected_total",
+    "Requests rejected by admission control before reaching a handler.",
+    ("route", "reason"),
+)
+
+REGISTRY = (requests_total, request_duration, request_queries, request_db_duration, requests_rejected_total)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    _record_query(conn)
+
+
+def _handle_error(context) -> None:
+    conn = context.connection
+    if context.execution_context is not None and conn is not None and conn.info.get("query_started_at"):
+        _record_query(conn)
+
+
+def _record_query(conn) -> None:
+    started = conn.info["query_started_at"].pop()
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def install_query_hooks(engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+@contextmanager
+def count_queries(engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(statement)
+
+    event.listen(engine, "after_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "after_cursor_execute", record)
+
+
+def render_prometheus(extra_lines: list[str] | None = None) -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(extra_lines or [])
+    return "\n".join(lines) + "\n"
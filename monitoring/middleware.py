@@ -0,0 +1,49 @@
+import time
+
+from monitoring.metrics import (
+    RequestStats,
+    current_request_stats,
+    request_db_duration,
+    request_duration,
+    request_queries,
+    requests_total,
+)
+
+
+class MetricsMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                total_ms = (time.perf_counter() - started) * 1000
+                db_ms = stats.db_seconds * 1000
+                server_timing = f"db;dur={db_ms:.2f}, app;dur={max(total_ms - db_ms, 0.0):.2f}"
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request_stats.reset(token)
+            route = scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            labels = (scope["method"], route_path)
+            requests_total.inc((scope["method"], route_path, str(status_code)))
+            request_duration.observe(labels, time.perf_counter() - started)
+            request_queries.observe(labels, stats.queries)
+            request_db_duration.observe(labels, stats.db_seconds)
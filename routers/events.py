@@ -0,0 +1,59 @@
+import asyncio
+import os
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import select
+
+from database.models.project import Project, ProjectMember
+from database.models.user import User
+from database.shards import shard_set, token_tenant
+from events.hub import hub
+from security.jwt import decode_user_id, load_principal, security
+from security.permissions import ROLE_SYSTEM_ADMIN
+
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", "15"))
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+
+def stream_principal(credentials: HTTPAuthorizationCredentials = Depends(security)) -> tuple:
+    with shard_set.route(token_tenant(credentials.credentials)).sessions() as db:
+        user = load_principal(db, decode_user_id(credentials))
+        if user.role == ROLE_SYSTEM_ADMIN:
+            raise HTTPException(status_code=403, detail="SYSTEM_ADMIN has no tasks")
+        project_ids = set(
+            db.scalars(
+                select(ProjectMember.project_id)
+                .join(Project, Project.id == ProjectMember.project_id)
+                .where(ProjectMember.user_id == user.id, Project.tenant_id == user.tenant_id)
+            )
+        )
+    return user, project_ids
+
+
+async def event_frames(user: User, project_ids: set[int]):
+    subscription = hub.subscribe(user.id, user.tenant_id, user.role, project_ids)
+    try:
+        yield f"retry: {int(EVENTS_KEEPALIVE_SECONDS * 1000)}\n\n"
+        while True:
+            try:
+                frame = await asyncio.wait_for(subscription.queue.get(), EVENTS_KEEPALIVE_SECONDS)
+            except TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if frame is None:
+                return
+            yield frame
+    finally:
+        hub.unsubscribe(subscription)
+
+
+@router.get("/stream")
+async def stream_events(principal: tuple = Depends(stream_principal)):
+    return StreamingResponse(
+        event_frames(*principal),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from database.db import engine_pools
+from database.models.user import User
+from database.pool_metrics import pool_status
+from database.replicas import replica_set
+from security.jwt import get_current_reader
+from security.permissions import ROLE_SYSTEM_ADMIN
+
+router = APIRouter(prefix="/instrumentation", tags=["Instrumentation"])
+
+
+@router.get("/pool")
+def get_pool_stats(current_user: User = Depends(get_current_reader)):
+    if current_user.role != ROLE_SYSTEM_ADMIN:
+        raise HTTPException(status_code=403, detail="Only SYSTEM_ADMIN can inspect connection pools")
+    return {name: pool_status(pool) for name, pool in {**engine_pools(), **replica_set.pools()}.items()}
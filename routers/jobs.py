@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database.models.job import Job
+from database.models.user import User
+from database.shards import get_db, shard_set
+from schemas.job import JobOut
+from security.jwt import get_current_reader
+from security.permissions import ROLE_SYSTEM_ADMIN, ROLE_TENANT_ADMIN
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.get("/{job_id}", response_model=JobOut)
+def get_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_reader),
+):
+    job = db.get(Job, job_id)
+    if job is None and current_user.role == ROLE_SYSTEM_ADMIN and shard_set.sharded:
+        job = next(iter(shard_set.fan_out(select(Job).where(Job.id == job_id))), None)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if current_user.role != ROLE_SYSTEM_ADMIN and (
+        job.tenant_id != current_user.tenant_id
+        or (current_user.role != ROLE_TENANT_ADMIN and job.created_by != current_user.id)
+    ):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
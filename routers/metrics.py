@@ -0,0 +1,98 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from database.activity import activity_writer
+from database.db import engine_pools
+from database.pool_metrics import pool_status
+from database.replicas import replica_set
+from database.shards import shard_set
+from events.hub import hub
+from jobs.runner import job_runner
+from monitoring.metrics import render_prometheus
+from security.principal_cache import principal_cache
+
+router = APIRouter(tags=["Instrumentation"])
+
+POOL_GAUGES = ("checked_out", "overflow")
+
+
+def runtime_lines() -> list[str]:
+    cache = principal_cache.stats()
+    lines = [
+        "# TYPE principal_cache_hits_total counter",
+        f"principal_cache_hits_total {cache['hits']}",
+        "# TYPE principal_cache_misses_total counter",
+        f"principal_cache_misses_total {cache['misses']}",
+        "# TYPE principal_cache_size gauge",
+        f"principal_cache_size {cache['size']}",
+    ]
+    events = hub.stats()
+    lines += [
+        "# TYPE events_subscribers gauge",
+        f"events_subscribers {events['subscribers']}",
+        "# TYPE events_published_total counter",
+        f"events_published_total {events['published']}",
+        "# TYPE events_resyncs_total counter",
+        f"events_resyncs_total {events['resyncs']}",
+    ]
+    activity = activity_writer.stats()
+    lines += [
+        "# TYPE task_activity_queue_depth gauge",
+        f"task_activity_queue_depth {activity['queued']}",
+        "# TYPE task_activity_written_total counter",
+        f"task_activity_written_total {activity['written']}",
+        "# TYPE task_activity_failed_total counter",
+        f"task_activity_failed_total {activity['failed']}",
+    ]
+    jobs = job_runner.stats()
+    lines += [
+        "# TYPE jobs_queued gauge",
+        f"jobs_queued {jobs['queued']}",
+        "# TYPE jobs_running gauge",
+        f"jobs_running {jobs['running']}",
+        "# TYPE jobs_completed_total counter",
+        f"jobs_completed_total {jobs['completed']}",
+        "# TYPE jobs_retried_total counter",
+        f"jobs_retried_total {jobs['retried']}",
+        "# TYPE jobs_failed_total counter",
+        f"jobs_failed_total {jobs['failed']}",
+    ]
+    replicas = replica_set.stats()
+    lines += [
+        "# TYPE db_replica_primary_reads_total counter",
+        f"db_replica_primary_reads_total {replicas['primary_reads']}",
+        "# TYPE db_replica_healthy gauge",
+    ]
+    for name, replica in replicas["replicas"].items():
+        lines.append(f'db_replica_healthy{{replica="{name}"}} {int(replica["healthy"])}')
+    lines.append("# TYPE db_replica_lag_seconds gauge")
+    for name, replica in replicas["replicas"].items():
+        if replica["lag"] is not None:
+            lines.append(f'db_replica_lag_seconds{{replica="{name}"}} {replica["lag"]:.3f}')
+    lines.append("# TYPE db_replica_reads_total counter")
+    for name, replica in replicas["replicas"].items():
+        lines.append(f'db_replica_reads_total{{replica="{name}"}} {replica["reads"]}')
+    if shard_set.sharded:
+        lines.append("# TYPE db_shard_sessions_total counter")
+        for name, shard in shard_set.stats().items():
+            lines.append(f'db_shard_sessions_total{{shard="{name}"}} {shard["sessions"]}')
+    all_pools = {**engine_pools(), **replica_set.pools(), **shard_set.pools()}
+    pools = {name: pool_status(pool) for name, pool in all_pools.items()}
+    for gauge in POOL_GAUGES:
+        lines.append(f"# TYPE db_pool_{gauge} gauge")
+        for name, status in pools.items():
+            if gauge in status:
+                lines.append(f'db_pool_{gauge}{{engine="{name}"}} {status[gauge]}')
+    lines.append("# TYPE db_pool_invalidated_total counter")
+    for name, status in pools.items():
+        if "invalidated" in status:
+            lines.append(f'db_pool_invalidated_total{{engine="{name}"}} {status["invalidated"]}')
+    return lines
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(
+        render_prometheus(runtime_lines()),
+        media_type="text/plain; version=0.0.4",
+    )
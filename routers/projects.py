@@ -1,11 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException
+from collections import Counter
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import false, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from database.db import get_db
+from database.db import ASYNC_MODE
+from database.models.job import Job
 from database.models.project import Project, ProjectMember
 from database.models.user import User
-from schemas.project import ProjectCreate, ProjectInvite, ProjectOut, ProjectRoleUpdate, ProjectUpdate
-from security.jwt import get_current_user
+from database.pagination import PageParams, paginate, paginate_async
+from database.replicas import get_async_read_db, get_read_db
+from database.shards import get_db, get_unit_of_work
+from database.stats import (
+    adjust_member_counts,
+    build_stats,
+    member_key,
+    moved,
+    project_task_total,
+    stats_statements,
+)
+from database.versioning import bump_version, etag_matches, not_modified, weak_etag
+from events.hub import publish
+from jobs.purge import PROJECT_PURGE_THRESHOLD
+from jobs.runner import active_job, enqueue_job
+from schemas.project import (
+    ProjectCreate,
+    ProjectDeletionOut,
+    ProjectInvite,
+    ProjectOut,
+    ProjectPage,
+    ProjectRoleUpdate,
+    ProjectStatsPage,
+    ProjectUpdate,
+)
+from security.authorization import load_project_access
+from security.jwt import get_current_reader, get_current_reader_async, get_current_user
 from security.permissions import (
     ROLE_SYSTEM_ADMIN,
     ROLE_TENANT_ADMIN,
@@ -20,54 +50,122 @@ from security.permissions import (
 router = APIRouter(prefix="/projects", tags=["Projects"])
 
 
-def get_project_or_404(db: Session, project_id: int, tenant_id: int) -> Project:
-    project = (
-        db.query(Project)
-        .filter(Project.id == project_id, Project.tenant_id == tenant_id)
-        .first()
-    )
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    return project
-
-
-def get_membership(db: Session, project_id: int, user_id: int) -> ProjectMember | None:
-    return (
-        db.query(ProjectMember)
-        .filter(ProjectMember.project_id == project_id, ProjectMember.user_id == user_id)
-        .first()
-    )
-
-
-@router.get("", response_model=list[ProjectOut])
-def list_projects(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
+def visible_projects(current_user: User):
     if current_user.role == ROLE_SYSTEM_ADMIN:
         raise HTTPException(status_code=403, detail="SYSTEM_ADMIN has no projects")
 
     if current_user.role in {ROLE_TENANT_ADMIN, ROLE_PM, ROLE_BA, ROLE_SUPPORT}:
-        return db.query(Project).filter(Project.tenant_id == current_user.tenant_id).all()
+        return select(Project).where(Project.tenant_id == current_user.tenant_id, Project.deleting == false())
 
     if current_user.role in {ROLE_DEV, ROLE_QA, ROLE_CUSTOMER}:
         return (
-            db.query(Project)
+            select(Project)
             .join(ProjectMember)
-            .filter(
+            .where(
                 Project.tenant_id == current_user.tenant_id,
+                Project.deleting == false(),
                 ProjectMember.user_id == current_user.id,
             )
-            .all()
         )
 
     raise HTTPException(status_code=403, detail="Not enough permissions")
 
 
+def project_page_etag(result: dict) -> str:
+    return weak_etag(
+        "projects",
+        [(project.id, project.version) for project in result["items"]],
+        result["next_cursor"],
+    )
+
+
+def conditional_page(request: Request, response: Response, result: dict):
+    etag = project_page_etag(result)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return result
+
+
+def list_projects(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_reader),
+):
+    result = paginate(db, visible_projects(current_user), Project.id, page)
+    return conditional_page(request, response, result)
+
+
+async def list_projects_async(
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_reader_async),
+):
+    result = await paginate_async(db, visible_projects(current_user), Project.id, page)
+    return conditional_page(request, response, result)
+
+
+router.add_api_route(
+    "",
+    list_projects_async if ASYNC_MODE else list_projects,
+    methods=["GET"],
+    response_model=ProjectPage,
+)
+
+
+def stats_projects(current_user: User):
+    if current_user.role not in {ROLE_TENANT_ADMIN, ROLE_PM}:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return visible_projects(current_user)
+
+
+def project_stats(
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_reader),
+):
+    result = paginate(db, stats_projects(current_user), Project.id, page)
+    task_counts, member_counts = (
+        db.scalars(stmt).all() for stmt in stats_statements([project.id for project in result["items"]])
+    )
+    return {
+        "items": build_stats(result["items"], task_counts, member_counts),
+        "next_cursor": result["next_cursor"],
+    }
+
+
+async def project_stats_async(
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_reader_async),
+):
+    result = await paginate_async(db, stats_projects(current_user), Project.id, page)
+    task_counts, member_counts = [
+        (await db.scalars(stmt)).all()
+        for stmt in stats_statements([project.id for project in result["items"]])
+    ]
+    return {
+        "items": build_stats(result["items"], task_counts, member_counts),
+        "next_cursor": result["next_cursor"],
+    }
+
+
+router.add_api_route(
+    "/stats",
+    project_stats_async if ASYNC_MODE else project_stats,
+    methods=["GET"],
+    response_model=ProjectStatsPage,
+)
+
+
 @router.post("", response_model=ProjectOut)
 def create_project(
     payload: ProjectCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_unit_of_work, scope="function"),
     current_user: User = Depends(get_current_user),
 ):
     if current_user.role not in {ROLE_TENANT_ADMIN, ROLE_PM}:
@@ -79,8 +177,7 @@ def create_project(
         created_by=current_user.id,
     )
     db.add(project)
-    db.commit()
-    db.refresh(project)
+    db.flush()
 
     member = ProjectMember(
         user_id=current_user.id,
@@ -88,7 +185,9 @@ def create_project(
         role_in_project=ROLE_PM,
     )
     db.add(member)
-    db.commit()
+    adjust_member_counts(db, Counter([member_key(member)]))
+    added = {"project_id": project.id, "user_id": current_user.id, "role_in_project": ROLE_PM}
+    publish(db, "member.added", current_user.tenant_id, added["project_id"], added)
 
     return project
 
@@ -97,77 +196,115 @@ def create_project(
 def update_project(
     project_id: int,
     payload: ProjectUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_unit_of_work, scope="function"),
     current_user: User = Depends(get_current_user),
 ):
     if current_user.role != ROLE_PM:
         raise HTTPException(status_code=403, detail="Only PM can update projects")
 
-    project = get_project_or_404(db, project_id, current_user.tenant_id)
-    membership = get_membership(db, project_id, current_user.id)
-    if not membership:
-        raise HTTPException(status_code=403, detail="Not a project member")
+    access = load_project_access(db, project_id, current_user)
+    access.require_member()
+    project = access.project
 
     project.name = payload.name
-    db.commit()
-    db.refresh(project)
+    bump_version(project)
     return project
 
 
 @router.delete("/{project_id}")
 def delete_project(
     project_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: Session = Depends(get_unit_of_work, scope="function"),
     current_user: User = Depends(get_current_user),
 ):
     if current_user.role not in {ROLE_PM, ROLE_TENANT_ADMIN}:
         raise HTTPException(status_code=403, detail="Only PM or Tenant Admin can delete projects")
 
-    project = get_project_or_404(db, project_id, current_user.tenant_id)
-    membership = get_membership(db, project_id, current_user.id)
-    if not membership:
-        raise HTTPException(status_code=403, detail="Not a project member")
+    access = load_project_access(db, project_id, current_user, include_deleting=True)
+    access.require_member()
+
+    total = project_task_total(db, access.project.id)
+    if access.project.deleting or total > PROJECT_PURGE_THRESHOLD:
+        subject = f"project:{access.project.id}"
+        job = active_job(db, subject)
+        if job is None:
+            access.project.deleting = True
+            bump_version(access.project)
+            job = enqueue_job(
+                db,
+                "project.purge",
+                {"project_id": access.project.id, "tenant_id": current_user.tenant_id},
+                subject=subject,
+                tenant_id=current_user.tenant_id,
+                created_by=current_user.id,
+                total=total,
+            )
+        response.status_code = 202
+        return {"message": "Project deletion started", "job_id": job.id}
 
-    db.delete(project)
-    db.commit()
+    deleted = {"project_id": access.project.id}
+    db.delete(access.project)
+    publish(db, "project.deleted", current_user.tenant_id, deleted["project_id"], deleted)
     return {"message": "Project deleted"}
 
 
+@router.get("/deletions/{job_id}", response_model=ProjectDeletionOut)
+def get_project_deletion(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_reader),
+):
+    if current_user.role not in {ROLE_PM, ROLE_TENANT_ADMIN}:
+        raise HTTPException(status_code=403, detail="Only PM or Tenant Admin can delete projects")
+
+    job = db.get(Job, job_id)
+    if job is None or job.kind != "project.purge" or job.tenant_id != current_user.tenant_id:
+        raise HTTPException(status_code=404, detail="Deletion job not found")
+    return {
+        "job_id": job.id,
+        "project_id": job.payload["project_id"],
+        "status": job.status,
+        "total": job.total,
+        "deleted": job.progress,
+        "error": job.error,
+    }
+
+
 @router.post("/{project_id}/invite")
 def invite_member(
     project_id: int,
     payload: ProjectInvite,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_unit_of_work, scope="function"),
     current_user: User = Depends(get_current_user),
 ):
     if current_user.role not in {ROLE_PM, ROLE_TENANT_ADMIN}:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
-    project = get_project_or_404(db, project_id, current_user.tenant_id)
+    access = load_project_access(db, project_id, current_user, target_user_id=payload.user_id)
     if current_user.role == ROLE_PM:
-        membership = get_membership(db, project_id, current_user.id)
-        if not membership:
-            raise HTTPException(status_code=403, detail="Not a project member")
-
-    user = (
-        db.query(User)
-        .filter(User.id == payload.user_id, User.tenant_id == current_user.tenant_id)
-        .first()
-    )
-    if not user:
+        access.require_member()
+
+    if not access.target_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    existing = get_membership(db, project.id, user.id)
-    if existing:
+    if access.target_membership:
         raise HTTPException(status_code=400, detail="User already invited")
 
     member = ProjectMember(
-        user_id=user.id,
-        project_id=project.id,
+        user_id=access.target_user.id,
+        project_id=access.project.id,
         role_in_project=payload.role_in_project,
     )
     db.add(member)
-    db.commit()
+    adjust_member_counts(db, Counter([member_key(member)]))
+    bump_version(access.project)
+    added = {
+        "project_id": access.project.id,
+        "user_id": access.target_user.id,
+        "role_in_project": payload.role_in_project,
+    }
+    publish(db, "member.added", current_user.tenant_id, added["project_id"], added)
     return {"message": "User invited"}
 
 
@@ -176,22 +313,28 @@ def update_member_role(
     project_id: int,
     user_id: int,
     payload: ProjectRoleUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_unit_of_work, scope="function"),
     current_user: User = Depends(get_current_user),
 ):
     if current_user.role not in {ROLE_PM, ROLE_TENANT_ADMIN}:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
-    get_project_or_404(db, project_id, current_user.tenant_id)
+    access = load_project_access(db, project_id, current_user, target_user_id=user_id)
     if current_user.role == ROLE_PM:
-        membership = get_membership(db, project_id, current_user.id)
-        if not membership:
-            raise HTTPException(status_code=403, detail="Not a project member")
+        access.require_member()
 
-    member = get_membership(db, project_id, user_id)
+    member = access.target_membership
     if not member:
         raise HTTPException(status_code=404, detail="Member not found")
 
+    before = member_key(member)
     member.role_in_project = payload.role_in_project
-    db.commit()
+    adjust_member_counts(db, moved(before, member_key(member)))
+    bump_version(access.project)
+    changed = {
+        "project_id": access.project.id,
+        "user_id": user_id,
+        "role_in_project": payload.role_in_project,
+    }
+    publish(db, "member.role_changed", current_user.tenant_id, changed["project_id"], changed)
     return {"message": "Role updated"}
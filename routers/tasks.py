@@ -1,12 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException
+from collections import Counter
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import and_, false, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from database.db import get_db
+from database.activity import activity_row, record_activity, task_snapshot
+from database.db import ASYNC_MODE, engine
+from database.pagination import PageParams, paginate, paginate_async
+from database.search import SearchParams, build_search_page, search_backend
+from database.stats import adjust_task_counts, moved, task_key
 from database.models.project import Project, ProjectMember
 from database.models.task import Task
+from database.models.task_activity import TaskActivity
 from database.models.user import User
-from schemas.task import TaskCreate, TaskOut, TaskStatusUpdate, TaskUpdate
-from security.jwt import get_current_user
+from database.replicas import get_async_read_db, get_read_db
+from database.shards import get_unit_of_work
+from database.versioning import bump_version, etag_matches, not_modified, weak_etag
+from events.hub import publish, publish_many
+from schemas.task import (
+    BulkItemError,
+    TaskActivityPage,
+    TaskAssigneeBulkUpdate,
+    TaskBulkCreate,
+    TaskBulkResult,
+    TaskCreate,
+    TaskOut,
+    TaskPage,
+    TaskStatusBulkUpdate,
+    TaskStatusUpdate,
+    TaskUpdate,
+)
+from security.authorization import (
+    load_project_access,
+    load_project_access_async,
+    load_task_access,
+    lock_hint,
+    lock_tasks,
+)
+from security.jwt import get_current_reader, get_current_reader_async, get_current_user
 from security.permissions import (
     ROLE_SYSTEM_ADMIN,
     ROLE_TENANT_ADMIN,
@@ -21,87 +53,179 @@ from security.permissions import (
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
 
-def get_project_or_404(db: Session, project_id: int, tenant_id: int) -> Project:
-    project = (
-        db.query(Project)
-        .filter(Project.id == project_id, Project.tenant_id == tenant_id)
-        .first()
-    )
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-    return project
+def filter_tasks(project_id: int, status: str | None, assignee_id: int | None):
+    stmt = select(Task).where(Task.project_id == project_id)
+    if status is not None:
+        stmt = stmt.where(Task.status == status)
+    if assignee_id is not None:
+        stmt = stmt.where(Task.assignee_id == assignee_id)
+    return stmt
 
 
-def get_membership(db: Session, project_id: int, user_id: int) -> ProjectMember | None:
-    return (
-        db.query(ProjectMember)
-        .filter(ProjectMember.project_id == project_id, ProjectMember.user_id == user_id)
-        .first()
+def tenant_user_ids(db: Session, tenant_id: int, user_ids: set[int]) -> set[int]:
+    if not user_ids:
+        return set()
+    return set(
+        db.scalars(select(User.id).where(User.id.in_(user_ids), User.tenant_id == tenant_id))
     )
 
 
+def task_list_etag(project, status: str | None, assignee_id: int | None, page: PageParams) -> str:
+    return weak_etag("tasks", project.id, project.version, status, assignee_id, page.limit, page.after_id)
+
+
+def project_tasks_by_id(db: Session, project_id: int, task_ids: set[int]) -> dict[int, Task]:
+    condition = and_(Task.project_id == project_id, Task.id.in_(task_ids))
+    lock_tasks(db, condition)
+    tasks = db.scalars(lock_hint(select(Task).where(condition).order_by(Task.id)))
+    return {task.id: task for task in tasks}
+
+
 @router.post("/project/{project_id}", response_model=TaskOut)
 def create_task(
     project_id: int,
     payload: TaskCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_unit_of_work, scope="function"),
     current_user: User = Depends(get_current_user),
 ):
     if current_user.role not in {ROLE_PM, ROLE_BA, ROLE_SUPPORT, ROLE_TENANT_ADMIN}:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
-    project = get_project_or_404(db, project_id, current_user.tenant_id)
-    membership = get_membership(db, project_id, current_user.id)
-    if not membership:
-        raise HTTPException(status_code=403, detail="Not a project member")
+    access = load_project_access(db, project_id, current_user)
+    access.require_member()
 
     task = Task(
         title=payload.title,
         description=payload.description,
         status="OPEN",
-        project_id=project.id,
+        project_id=access.project.id,
         assignee_id=payload.assignee_id,
     )
     db.add(task)
-    db.commit()
-    db.refresh(task)
+    adjust_task_counts(db, Counter([task_key(task)]))
+    bump_version(access.project)
+    db.flush()
+    record_activity(db, [activity_row(task, current_user.id, None, task_snapshot(task))])
+    publish(
+        db,
+        "task.created",
+        current_user.tenant_id,
+        task.project_id,
+        TaskOut.model_validate(task).model_dump(),
+    )
     return task
 
 
-@router.get("/project/{project_id}", response_model=list[TaskOut])
 def list_tasks(
     project_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    status: str | None = Query(None),
+    assignee_id: int | None = Query(None),
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_reader),
+):
+    if current_user.role == ROLE_SYSTEM_ADMIN:
+        raise HTTPException(status_code=403, detail="SYSTEM_ADMIN has no tasks")
+
+    access = load_project_access(db, project_id, current_user)
+    if current_user.role != ROLE_TENANT_ADMIN:
+        access.require_member()
+
+    etag = task_list_etag(access.project, status, assignee_id, page)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return paginate(db, filter_tasks(access.project.id, status, assignee_id), Task.id, page)
+
+
+async def list_tasks_async(
+    project_id: int,
+    request: Request,
+    response: Response,
+    status: str | None = Query(None),
+    assignee_id: int | None = Query(None),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_reader_async),
 ):
     if current_user.role == ROLE_SYSTEM_ADMIN:
         raise HTTPException(status_code=403, detail="SYSTEM_ADMIN has no tasks")
 
-    project = get_project_or_404(db, project_id, current_user.tenant_id)
+    access = await load_project_access_async(db, project_id, current_user)
+    if current_user.role != ROLE_TENANT_ADMIN:
+        access.require_member()
+
+    etag = task_list_etag(access.project, status, assignee_id, page)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return await paginate_async(db, filter_tasks(access.project.id, status, assignee_id), Task.id, page)
+
 
+router.add_api_route(
+    "/project/{project_id}",
+    list_tasks_async if ASYNC_MODE else list_tasks,
+    methods=["GET"],
+    response_model=TaskPage,
+)
+
+
+def search_statement(params: SearchParams, current_user: User):
+    if current_user.role == ROLE_SYSTEM_ADMIN:
+        raise HTTPException(status_code=403, detail="SYSTEM_ADMIN has no tasks")
+
+    stmt = (
+        search_backend(engine.dialect.name)
+        .statement(params.terms)
+        .join(Project, Project.id == Task.project_id)
+        .where(Project.tenant_id == current_user.tenant_id, Project.deleting == false())
+    )
     if current_user.role != ROLE_TENANT_ADMIN:
-        membership = get_membership(db, project_id, current_user.id)
-        if not membership:
-            raise HTTPException(status_code=403, detail="Not a project member")
+        stmt = stmt.join(
+            ProjectMember,
+            and_(ProjectMember.project_id == Task.project_id, ProjectMember.user_id == current_user.id),
+        )
+    return stmt.offset(params.offset).limit(params.limit + 1)
+
+
+def search_tasks(
+    params: SearchParams = Depends(),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_reader),
+):
+    rows = db.scalars(search_statement(params, current_user)).all()
+    return build_search_page(rows, params)
+
 
-    return db.query(Task).filter(Task.project_id == project.id).all()
+async def search_tasks_async(
+    params: SearchParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_reader_async),
+):
+    result = await db.scalars(search_statement(params, current_user))
+    return build_search_page(result.all(), params)
+
+
+router.add_api_route(
+    "/search",
+    search_tasks_async if ASYNC_MODE else search_tasks,
+    methods=["GET"],
+    response_model=TaskPage,
+)
 
 
 @router.put("/{task_id}", response_model=TaskOut)
 def update_task(
     task_id: int,
     payload: TaskUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_unit_of_work, scope="function"),
     current_user: User = Depends(get_current_user),
 ):
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    project = get_project_or_404(db, task.project_id, current_user.tenant_id)
-    membership = get_membership(db, project.id, current_user.id)
-    if not membership:
-        raise HTTPException(status_code=403, detail="Not a project member")
+    access = load_task_access(db, task_id, current_user, for_update=True)
+    access.require_member()
+    task = access.task
 
     if current_user.role == ROLE_PM:
         pass
@@ -110,57 +234,77 @@ def update_task(
     else:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
+    before = task_key(task)
+    snapshot = task_snapshot(task)
     task.title = payload.title
     task.description = payload.description
     task.assignee_id = payload.assignee_id
-    db.commit()
-    db.refresh(task)
+    adjust_task_counts(db, moved(before, task_key(task)))
+    bump_version(access.project)
+    record_activity(db, [activity_row(task, current_user.id, snapshot, task_snapshot(task))])
+    publish(
+        db,
+        "task.updated",
+        current_user.tenant_id,
+        task.project_id,
+        TaskOut.model_validate(task).model_dump(),
+    )
     return task
 
 
 @router.delete("/{task_id}")
 def delete_task(
     task_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_unit_of_work, scope="function"),
     current_user: User = Depends(get_current_user),
 ):
     if current_user.role != ROLE_PM:
         raise HTTPException(status_code=403, detail="Only PM can delete tasks")
 
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+    access = load_task_access(db, task_id, current_user, for_update=True)
+    access.require_member()
 
-    project = get_project_or_404(db, task.project_id, current_user.tenant_id)
-    membership = get_membership(db, project.id, current_user.id)
-    if not membership:
-        raise HTTPException(status_code=403, detail="Not a project member")
-
-    db.delete(task)
-    db.commit()
+    deleted = {"id": access.task.id, "project_id": access.task.project_id}
+    db.delete(access.task)
+    adjust_task_counts(db, Counter({task_key(access.task): -1}))
+    bump_version(access.project)
+    record_activity(db, [activity_row(access.task, current_user.id, task_snapshot(access.task), None)])
+    publish(db, "task.deleted", current_user.tenant_id, deleted["project_id"], deleted)
     return {"message": "Task deleted"}
 
 
+@router.get("/{task_id}/history", response_model=TaskActivityPage)
+def task_history(
+    task_id: int,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_reader),
+):
+    if current_user.role == ROLE_SYSTEM_ADMIN:
+        raise HTTPException(status_code=403, detail="SYSTEM_ADMIN has no tasks")
+
+    access = load_task_access(db, task_id, current_user)
+    if current_user.role != ROLE_TENANT_ADMIN:
+        access.require_member()
+
+    return paginate(db, select(TaskActivity).where(TaskActivity.task_id == access.task.id), TaskActivity.id, page)
+
+
 @router.put("/{task_id}/status", response_model=TaskOut)
 def update_task_status(
     task_id: int,
     payload: TaskStatusUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_unit_of_work, scope="function"),
     current_user: User = Depends(get_current_user),
 ):
     if current_user.role in {ROLE_CUSTOMER, ROLE_SYSTEM_ADMIN}:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    project = get_project_or_404(db, task.project_id, current_user.tenant_id)
+    access = load_task_access(db, task_id, current_user, for_update=True)
+    task = access.task
 
     if current_user.role in {ROLE_PM, ROLE_BA, ROLE_SUPPORT}:
-        membership = get_membership(db, project.id, current_user.id)
-        if not membership:
-            raise HTTPException(status_code=403, detail="Not a project member")
+        access.require_member()
     elif current_user.role in {ROLE_DEV, ROLE_QA}:
         if current_user.id != task.assignee_id:
             raise HTTPException(status_code=403, detail="Not assigned to task")
@@ -169,7 +313,172 @@ def update_task_status(
     else:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
+    before = task_key(task)
+    snapshot = task_snapshot(task)
     task.status = payload.status
-    db.commit()
-    db.refresh(task)
+    adjust_task_counts(db, moved(before, task_key(task)))
+    bump_version(access.project)
+    record_activity(db, [activity_row(task, current_user.id, snapshot, task_snapshot(task))])
+    publish(
+        db,
+        "task.status_changed",
+        current_user.tenant_id,
+        task.project_id,
+        TaskOut.model_validate(task).model_dump(),
+    )
     return task
+
+
+@router.post("/project/{project_id}/bulk", response_model=TaskBulkResult)
+def bulk_create_tasks(
+    project_id: int,
+    payload: TaskBulkCreate,
+    db: Session = Depends(get_unit_of_work, scope="function"),
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role not in {ROLE_PM, ROLE_BA, ROLE_SUPPORT, ROLE_TENANT_ADMIN}:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    access = load_project_access(db, project_id, current_user)
+    access.require_member()
+
+    assignee_ids = {item.assignee_id for item in payload.items if item.assignee_id is not None}
+    valid_assignees = tenant_user_ids(db, current_user.tenant_id, assignee_ids)
+
+    rows = []
+    errors = []
+    for index, item in enumerate(payload.items):
+        if item.assignee_id is not None and item.assignee_id not in valid_assignees:
+            errors.append(BulkItemError(index=index, detail="Assignee not found"))
+            continue
+        rows.append(
+            {
+                "title": item.title,
+                "description": item.description,
+                "status": "OPEN",
+                "project_id": access.project.id,
+                "assignee_id": item.assignee_id,
+            }
+        )
+
+    tasks = []
+    if rows:
+        stmt = insert(Task).returning(Task)
+        tasks = db.scalars(stmt, rows, execution_options={"render_nulls": True}).all()
+        tasks.sort(key=lambda task: task.id)
+
+    result = TaskBulkResult(items=tasks, errors=errors)
+    if tasks:
+        adjust_task_counts(db, Counter(task_key(task) for task in tasks))
+        bump_version(access.project)
+        record_activity(db, [activity_row(task, current_user.id, None, task_snapshot(task)) for task in tasks])
+    publish_many(
+        db,
+        "task.created",
+        current_user.tenant_id,
+        [item.model_dump() for item in result.items],
+    )
+    return result
+
+
+@router.put("/project/{project_id}/bulk/status", response_model=TaskBulkResult)
+def bulk_update_task_status(
+    project_id: int,
+    payload: TaskStatusBulkUpdate,
+    db: Session = Depends(get_unit_of_work, scope="function"),
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role in {ROLE_CUSTOMER, ROLE_SYSTEM_ADMIN}:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    access = load_project_access(db, project_id, current_user)
+    if current_user.role in {ROLE_PM, ROLE_BA, ROLE_SUPPORT}:
+        access.require_member()
+    elif current_user.role not in {ROLE_DEV, ROLE_QA, ROLE_TENANT_ADMIN}:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    tasks = project_tasks_by_id(db, access.project.id, {item.id for item in payload.items})
+
+    updated = []
+    errors = []
+    deltas = Counter()
+    activity = []
+    for index, item in enumerate(payload.items):
+        task = tasks.get(item.id)
+        if not task:
+            errors.append(BulkItemError(index=index, detail="Task not found"))
+            continue
+        if current_user.role in {ROLE_DEV, ROLE_QA} and current_user.id != task.assignee_id:
+            errors.append(BulkItemError(index=index, detail="Not assigned to task"))
+            continue
+        deltas.subtract([task_key(task)])
+        snapshot = task_snapshot(task)
+        task.status = item.status
+        deltas.update([task_key(task)])
+        activity.append(activity_row(task, current_user.id, snapshot, task_snapshot(task)))
+        updated.append(task)
+
+    db.flush()
+    result = TaskBulkResult(items=updated, errors=errors)
+    if updated:
+        adjust_task_counts(db, deltas)
+        bump_version(access.project)
+        record_activity(db, activity)
+    publish_many(
+        db,
+        "task.status_changed",
+        current_user.tenant_id,
+        [item.model_dump() for item in result.items],
+    )
+    return result
+
+
+@router.put("/project/{project_id}/bulk/assignee", response_model=TaskBulkResult)
+def bulk_update_task_assignee(
+    project_id: int,
+    payload: TaskAssigneeBulkUpdate,
+    db: Session = Depends(get_unit_of_work, scope="function"),
+    current_user: User = Depends(get_current_user),
+):
+    access = load_project_access(db, project_id, current_user)
+    access.require_member()
+
+    tasks = project_tasks_by_id(db, access.project.id, {item.id for item in payload.items})
+    assignee_ids = {item.assignee_id for item in payload.items if item.assignee_id is not None}
+    valid_assignees = tenant_user_ids(db, current_user.tenant_id, assignee_ids)
+
+    updated = []
+    errors = []
+    deltas = Counter()
+    activity = []
+    for index, item in enumerate(payload.items):
+        task = tasks.get(item.id)
+        if not task:
+            errors.append(BulkItemError(index=index, detail="Task not found"))
+            continue
+        if current_user.role != ROLE_PM and current_user.id != task.assignee_id:
+            errors.append(BulkItemError(index=index, detail="Not enough permissions"))
+            continue
+        if item.assignee_id is not None and item.assignee_id not in valid_assignees:
+            errors.append(BulkItemError(index=index, detail="Assignee not found"))
+            continue
+        deltas.subtract([task_key(task)])
+        snapshot = task_snapshot(task)
+        task.assignee_id = item.assignee_id
+        deltas.update([task_key(task)])
+        activity.append(activity_row(task, current_user.id, snapshot, task_snapshot(task)))
+        updated.append(task)
+
+    db.flush()
+    result = TaskBulkResult(items=updated, errors=errors)
+    if updated:
+        adjust_task_counts(db, deltas)
+        bump_version(access.project)
+        record_activity(db, activity)
+    publish_many(
+        db,
+        "task.updated",
+        current_user.tenant_id,
+        [item.model_dump() for item in result.items],
+    )
+    return result
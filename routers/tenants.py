@@ -0,0 +1,123 @@
+import csv
+import io
+import json
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import false, select
+
+from database.models.project import Project
+from database.models.task import Task
+from database.models.user import User
+from database.shards import shard_set
+from security.jwt import get_current_reader
+from security.permissions import ROLE_TENANT_ADMIN
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_COLUMNS = (
+    "type",
+    "id",
+    "project_id",
+    "name",
+    "created_by",
+    "title",
+    "description",
+    "status",
+    "assignee_id",
+)
+
+router = APIRouter(prefix="/tenants", tags=["Tenants"])
+
+
+def export_statements(tenant_id: int) -> dict:
+    projects = (
+        select(Project.id, Project.name, Project.created_by)
+        .where(Project.tenant_id == tenant_id, Project.deleting == false())
+        .order_by(Project.id)
+    )
+    tasks = (
+        select(
+            Task.id,
+            Task.project_id,
+            Task.title,
+            Task.description,
+            Task.status,
+            Task.assignee_id,
+        )
+        .join(Project, Project.id == Task.project_id)
+        .where(Project.tenant_id == tenant_id, Project.deleting == false())
+        .order_by(Project.id, Task.id)
+    )
+    return {"projects": projects, "tasks": tasks}
+
+
+def export_rows(tenant_id: int):
+    statements = export_statements(tenant_id)
+    with shard_set.route(tenant_id).sessions() as db:
+        projects = statements["projects"].execution_options(yield_per=EXPORT_BATCH_SIZE)
+        for row in db.execute(projects):
+            yield {
+                "type": "project",
+                "id": row.id,
+                "project_id": row.id,
+                "name": row.name,
+                "created_by": row.created_by,
+            }
+        tasks = statements["tasks"].execution_options(yield_per=EXPORT_BATCH_SIZE)
+        for row in db.execute(tasks):
+            yield {
+                "type": "task",
+                "id": row.id,
+                "project_id": row.project_id,
+                "title": row.title,
+                "description": row.description,
+                "status": row.status,
+                "assignee_id": row.assignee_id,
+            }
+
+
+def ndjson_chunks(rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row))
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines.clear()
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+@router.get("/me/export")
+def export_tenant(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    current_user: User = Depends(get_current_reader),
+):
+    if current_user.role != ROLE_TENANT_ADMIN:
+        raise HTTPException(status_code=403, detail="Only Tenant Admin can export tenant data")
+
+    rows = export_rows(current_user.tenant_id)
+    if format == "csv":
+        return StreamingResponse(
+            csv_chunks(rows),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=tenant-export.csv"},
+        )
+    return StreamingResponse(ndjson_chunks(rows), media_type="application/x-ndjson")
@@ -1,19 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from database.db import get_db
-from database.models.project import ProjectMember
-from database.models.task import Task
+from database.db import ASYNC_MODE, on_commit, on_rollback
+from database.pagination import PageParams, merge_pages, page_statement, paginate, paginate_async
+from database.models.tenant import Tenant
 from database.models.user import User
+from database.replicas import get_async_read_db, get_read_db
+from database.shards import get_unit_of_work, shard_set, unit_of_work
+from jobs.purge import USER_PURGE_THRESHOLD, assigned_task_counts, remove_user
+from jobs.runner import active_job, enqueue_job
 from schemas.user import (
     UserCreateAdmin,
     UserOut,
+    UserPage,
     UserRegister,
     TokenOut,
 )
-from security.jwt import create_access_token, get_current_user, hash_password, verify_password
+from security.jwt import (
+    create_access_token,
+    get_current_reader,
+    get_current_reader_async,
+    get_current_user,
+    hash_password_async,
+    password_needs_rehash,
+    verify_password_async,
+)
+from security.principal_cache import principal_cache
 from security.permissions import (
     ROLE_SYSTEM_ADMIN,
     ROLE_TENANT_ADMIN,
@@ -22,76 +38,175 @@ from security.permissions import (
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
-@router.post("/register", response_model=UserOut)
-def register_user(payload: UserRegister, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == payload.email).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
+def allocate_tenant(db: Session, name: str) -> int:
+    tenant = Tenant(name=name)
+    db.add(tenant)
+    db.flush()
+    shard_set.place(tenant.id, shard_set.shards[db.info["shard"]])
+    return tenant.id
+
+
+def email_taken(db: Session, email: str) -> bool:
+    if not shard_set.sharded:
+        return db.query(User).filter(User.email == email).first() is not None
+    if shard_set.locate_email(email) is not None:
+        return True
+    with shard_set.default.sessions() as default_db:
+        return default_db.query(User).filter(User.email == email).first() is not None
+
+
+def claim_email(db: Session, email: str) -> bool:
+    if not shard_set.sharded:
+        return True
+    if not shard_set.claim_email(email, shard_set.shards[db.info["shard"]]):
+        return False
+    on_rollback(db, lambda: shard_set.release_email(email))
+    return True
 
-    max_tenant_id = db.query(func.max(User.tenant_id)).scalar() or 0
-    new_tenant_id = max_tenant_id + 1
+
+def find_user(db: Session, email: str) -> User | None:
+    return db.query(User).filter(User.email == email).first()
+
+
+def add_user(
+    db: Session,
+    name: str,
+    email: str,
+    password_hash: str,
+    role: str,
+    tenant_id: int | None,
+) -> User | None:
+    if tenant_id is None:
+        tenant_id = allocate_tenant(db, name)
 
     user = User(
-        name=payload.name,
-        email=payload.email,
-        password_hash=hash_password(payload.password),
-        role=ROLE_TENANT_ADMIN,
-        tenant_id=new_tenant_id,
+        name=name,
+        email=email,
+        password_hash=password_hash,
+        role=role,
+        tenant_id=tenant_id,
         is_locked=False,
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    db.flush()
+    if not claim_email(db, email):
+        return None
+    return user
+
+
+def get_registration_db():
+    yield from unit_of_work(shard_set.least_loaded(), None)
+
+
+def get_login_db(form_data: OAuth2PasswordRequestForm = Depends()):
+    shard = shard_set.locate_email(form_data.username) if shard_set.sharded else None
+    yield from unit_of_work(shard or shard_set.default, None)
+
+
+@router.post("/register", response_model=UserOut)
+async def register_user(payload: UserRegister, db: Session = Depends(get_registration_db, scope="function")):
+    if await run_in_threadpool(email_taken, db, payload.email):
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+    password_hash = await hash_password_async(payload.password)
+    user = await run_in_threadpool(add_user, db, payload.name, payload.email, password_hash, ROLE_TENANT_ADMIN, None)
+    if user is None:
+        raise HTTPException(status_code=400, detail="Email already registered")
     return user
 
 
 @router.post("/login", response_model=TokenOut)
-def login_user(
+async def login_user(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_login_db, scope="function"),
 ):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+    user = await run_in_threadpool(find_user, db, form_data.username)
+    if not user or not await verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     if user.is_locked:
         raise HTTPException(status_code=403, detail="User is locked")
 
+    if password_needs_rehash(user.password_hash):
+        user.password_hash = await hash_password_async(form_data.password)
+
     token = create_access_token(user)
     return TokenOut(access_token=token)
 
 
-@router.get("/me", response_model=UserOut)
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(current_user: User = Depends(get_current_reader)):
+    return current_user
+
+
+async def get_me_async(current_user: User = Depends(get_current_reader_async)):
     return current_user
 
 
-@router.get("", response_model=list[UserOut])
+router.add_api_route(
+    "/me",
+    get_me_async if ASYNC_MODE else get_me,
+    methods=["GET"],
+    response_model=UserOut,
+)
+
+
+def visible_users(current_user: User, role: str | None):
+    if current_user.role == ROLE_SYSTEM_ADMIN:
+        stmt = select(User)
+    elif current_user.role == ROLE_TENANT_ADMIN:
+        stmt = select(User).where(User.tenant_id == current_user.tenant_id)
+    else:
+        raise HTTPException(status_code=403, detail="You do not have permission to create users")
+
+    if role is not None:
+        stmt = stmt.where(User.role == role)
+    return stmt
+
+
 def list_users(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    role: str | None = Query(None),
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_reader),
 ):
-    if current_user.role == ROLE_SYSTEM_ADMIN:
-        return db.query(User).all()
-    if current_user.role == ROLE_TENANT_ADMIN:
-        return db.query(User).filter(User.tenant_id == current_user.tenant_id).all()
-    raise HTTPException(status_code=403, detail="You do not have permission to create users")
+    stmt = visible_users(current_user, role)
+    if current_user.role == ROLE_SYSTEM_ADMIN and shard_set.sharded:
+        return merge_pages(shard_set.fan_out(page_statement(stmt, User.id, page)), page)
+    return paginate(db, stmt, User.id, page)
+
+
+async def list_users_async(
+    role: str | None = Query(None),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_reader_async),
+):
+    stmt = visible_users(current_user, role)
+    if current_user.role == ROLE_SYSTEM_ADMIN and shard_set.sharded:
+        return merge_pages(await shard_set.fan_out_async(page_statement(stmt, User.id, page)), page)
+    return await paginate_async(db, stmt, User.id, page)
+
+
+router.add_api_route(
+    "",
+    list_users_async if ASYNC_MODE else list_users,
+    methods=["GET"],
+    response_model=UserPage,
+)
 
 
 @router.post("/users", response_model=UserOut, status_code=201)
-def create_user(
+async def create_user(
     payload: UserCreateAdmin,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_unit_of_work, scope="function"),
     current_user: User = Depends(get_current_user),
 ):
-    existing = db.query(User).filter(User.email == payload.email).first()
-    if existing:
+    if await run_in_threadpool(email_taken, db, payload.email):
         raise HTTPException(status_code=400, detail="User with this email already exists")
 
     if current_user.role == ROLE_SYSTEM_ADMIN:
         if payload.role not in {"TENANT_ADMIN", "PM", "DEV", "BA", "QA", "CUSTOMER"}:
             raise HTTPException(status_code=403, detail="You do not have permission to create users")
-        max_tenant_id = db.query(func.max(User.tenant_id)).scalar() or 0
-        tenant_id = max_tenant_id + 1
+        tenant_id = None
     elif current_user.role == ROLE_TENANT_ADMIN:
         if payload.role in {"SYSTEM_ADMIN", "TENANT_ADMIN"}:
             raise HTTPException(
@@ -104,24 +219,18 @@ def create_user(
     else:
         raise HTTPException(status_code=403, detail="You do not have permission to create users")
 
-    user = User(
-        name=payload.name,
-        email=payload.email,
-        password_hash=hash_password(payload.password),
-        role=payload.role,
-        tenant_id=tenant_id,
-        is_locked=False,
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    password_hash = await hash_password_async(payload.password)
+    user = await run_in_threadpool(add_user, db, payload.name, payload.email, password_hash, payload.role, tenant_id)
+    if user is None:
+        raise HTTPException(status_code=400, detail="User with this email already exists")
     return user
 
 
 @router.delete("/users/{user_id}")
 def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: Session = Depends(get_unit_of_work, scope="function"),
     current_user: User = Depends(get_current_user),
 ):
     target_user = db.query(User).filter(User.id == user_id).first()
@@ -141,13 +250,24 @@ def delete_user(
     else:
         raise HTTPException(status_code=403, detail="You do not have permission to delete users")
 
-    db.query(ProjectMember).filter(ProjectMember.user_id == target_user.id).delete(
-        synchronize_session=False
-    )
-    db.query(Task).filter(Task.assignee_id == target_user.id).update(
-        {Task.assignee_id: None},
-        synchronize_session=False,
-    )
-    db.delete(target_user)
-    db.commit()
+    assigned = assigned_task_counts(db, target_user.id)
+    if sum(count for _, _, count in assigned) > USER_PURGE_THRESHOLD:
+        subject = f"user:{target_user.id}"
+        job = active_job(db, subject)
+        if job is None:
+            target_user.is_locked = True
+            on_commit(db, lambda: principal_cache.invalidate(user_id))
+            job = enqueue_job(
+                db,
+                "user.purge",
+                {"user_id": target_user.id},
+                subject=subject,
+                tenant_id=target_user.tenant_id,
+                created_by=current_user.id,
+                total=sum(count for _, _, count in assigned),
+            )
+        response.status_code = 202
+        return {"message": "User deletion started", "job_id": job.id}
+
+    remove_user(db, target_user, assigned)
     return {"message": "User deleted successfully"}
@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class JobOut(BaseModel):
+    id: str
+    kind: str
+    status: str
+    total: int | None
+    progress: int
+    attempts: int
+    error: str | None
+    created_at: datetime
+    finished_at: datetime | None
+
+    class Config:
+        from_attributes = True
@@ -13,7 +13,7 @@ class ProjectOut(BaseModel):
     id: int
     name: str
     tenant_id: int
-    created_by: int
+    created_by: int | None
 
     class Config:
         from_attributes = True
@@ -26,3 +26,31 @@ class ProjectInvite(BaseModel):
 
 class ProjectRoleUpdate(BaseModel):
     role_in_project: str
+
+
+class ProjectPage(BaseModel):
+    items: list[ProjectOut]
+    next_cursor: str | None = None
+
+
+class ProjectStatsOut(BaseModel):
+    project_id: int
+    name: str
+    tasks_by_status: dict[str, int]
+    open_tasks_by_assignee: dict[int, int]
+    unassigned_open_tasks: int
+    members_by_role: dict[str, int]
+
+
+class ProjectStatsPage(BaseModel):
+    items: list[ProjectStatsOut]
+    next_cursor: str | None = None
+
+
+class ProjectDeletionOut(BaseModel):
+    job_id: str
+    project_id: int
+    status: str
+    total: int
+    deleted: int
+    error: str | None = None
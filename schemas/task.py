@@ -1,4 +1,8 @@
-from pydantic import BaseModel
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+MAX_BULK_ITEMS = 5000
 
 
 class TaskCreate(BaseModel):
@@ -27,3 +31,59 @@ class TaskOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class TaskPage(BaseModel):
+    items: list[TaskOut]
+    next_cursor: str | None = None
+
+
+class TaskActivityOut(BaseModel):
+    id: int
+    task_id: int
+    actor_id: int | None
+    action: str
+    from_status: str | None
+    to_status: str | None
+    changes: dict | None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class TaskActivityPage(BaseModel):
+    items: list[TaskActivityOut]
+    next_cursor: str | None = None
+
+
+class TaskBulkCreate(BaseModel):
+    items: list[TaskCreate] = Field(min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class TaskStatusBulkItem(BaseModel):
+    id: int
+    status: str
+
+
+class TaskStatusBulkUpdate(BaseModel):
+    items: list[TaskStatusBulkItem] = Field(min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class TaskAssigneeBulkItem(BaseModel):
+    id: int
+    assignee_id: int | None = None
+
+
+class TaskAssigneeBulkUpdate(BaseModel):
+    items: list[TaskAssigneeBulkItem] = Field(min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class BulkItemError(BaseModel):
+    index: int
+    detail: str
+
+
+class TaskBulkResult(BaseModel):
+    items: list[TaskOut]
+    errors: list[BulkItemError]
@@ -31,6 +31,11 @@ class UserOut(BaseModel):
         from_attributes = True
 
 
+class UserPage(BaseModel):
+    items: list[UserOut]
+    next_cursor: str | None = None
+
+
 class TokenOut(BaseModel):
     access_token: str
-    token_type: str = "bearer"
+    token_type: str = "bearer"
@@ -0,0 +1,145 @@
+from dataclasses import dataclass
+
+from fastapi import HTTPException
+from sqlalchemy import and_, false, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from database.models.project import Project, ProjectMember
+from database.models.task import Task
+from database.models.user import User
+
+
+@dataclass
+class ProjectAccess:
+    project: Project
+    membership: ProjectMember | None
+    target_user: User | None = None
+    target_membership: ProjectMember | None = None
+
+    def require_member(self) -> None:
+        if not self.membership:
+            raise HTTPException(status_code=403, detail="Not a project member")
+
+
+@dataclass
+class TaskAccess:
+    task: Task
+    project: Project
+    membership: ProjectMember | None
+
+    def require_member(self) -> None:
+        if not self.membership:
+            raise HTTPException(status_code=403, detail="Not a project member")
+
+
+def project_access_statement(
+    project_id: int,
+    current_user: User,
+    target_user_id: int | None = None,
+    include_deleting: bool = False,
+):
+    caller = aliased(ProjectMember)
+    stmt = (
+        select(Project, caller)
+        .outerjoin(
+            caller,
+            and_(caller.project_id == Project.id, caller.user_id == current_user.id),
+        )
+        .where(Project.id == project_id, Project.tenant_id == current_user.tenant_id)
+    )
+    if not include_deleting:
+        stmt = stmt.where(Project.deleting == false())
+    if target_user_id is not None:
+        target = aliased(ProjectMember)
+        stmt = (
+            stmt.add_columns(User, target)
+            .outerjoin(
+                User,
+                and_(User.id == target_user_id, User.tenant_id == current_user.tenant_id),
+            )
+            .outerjoin(
+                target,
+                and_(target.project_id == Project.id, target.user_id == target_user_id),
+            )
+        )
+    return stmt
+
+
+def task_access_statement(task_id: int, current_user: User, for_update: bool = False):
+    stmt = (
+        select(Task, Project, ProjectMember)
+        .outerjoin(
+            Project,
+            and_(
+                Project.id == Task.project_id,
+                Project.tenant_id == current_user.tenant_id,
+                Project.deleting == false(),
+            ),
+        )
+        .outerjoin(
+            ProjectMember,
+            and_(
+                ProjectMember.project_id == Project.id,
+                ProjectMember.user_id == current_user.id,
+            ),
+        )
+        .where(Task.id == task_id)
+    )
+    if for_update:
+        stmt = lock_hint(stmt)
+    return stmt
+
+
+def lock_hint(stmt):
+    return stmt.with_for_update(of=Task).with_hint(Task, "WITH (UPDLOCK, ROWLOCK)", "mssql")
+
+
+def lock_tasks(db: Session, condition) -> None:
+    if db.get_bind().dialect.name == "sqlite":
+        db.execute(
+            update(Task).where(condition).values(status=Task.status),
+            execution_options={"synchronize_session": False},
+        )
+
+
+def _project_access(row) -> ProjectAccess:
+    if row is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return ProjectAccess(*row)
+
+
+def _task_access(row) -> TaskAccess:
+    if row is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    task, project, membership = row
+    if project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return TaskAccess(task, project, membership)
+
+
+def load_project_access(
+    db: Session,
+    project_id: int,
+    current_user: User,
+    target_user_id: int | None = None,
+    include_deleting: bool = False,
+) -> ProjectAccess:
+    stmt = project_access_statement(project_id, current_user, target_user_id, include_deleting)
+    return _project_access(db.execute(stmt).first())
+
+
+async def load_project_access_async(
+    db: AsyncSession,
+    project_id: int,
+    current_user: User,
+    target_user_id: int | None = None,
+) -> ProjectAccess:
+    stmt = project_access_statement(project_id, current_user, target_user_id)
+    return _project_access((await db.execute(stmt)).first())
+
+
+def load_task_access(db: Session, task_id: int, current_user: User, for_update: bool = False) -> TaskAccess:
+    if for_update:
+        lock_tasks(db, Task.id == task_id)
+    return _task_access(db.execute(task_access_statement(task_id, current_user, for_update)).first())
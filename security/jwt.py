@@ -1,28 +1,42 @@
-import os
 from datetime import datetime, timedelta
-import hashlib
 
 import jwt
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from database.db import get_db
 from database.models.user import User
+from database.replicas import get_async_read_db, get_read_db
+from database.shards import get_async_db, get_unit_of_work
+from security.passwords import password_hasher
+from security.principal_cache import principal_cache
+from security.tokens import ALGORITHM, SECRET_KEY
 
-SECRET_KEY = os.getenv("JWT_SECRET", "change-me")
-ALGORITHM = "HS256"
 TOKEN_EXPIRE_MINUTES = 60
 
 security = HTTPBearer()
 
 
 def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode("utf-8")).hexdigest()
+    return password_hasher.hash(password)
 
 
 def verify_password(password: str, password_hash: str) -> bool:
-    return hash_password(password) == password_hash
+    return password_hasher.verify(password, password_hash)
+
+
+async def hash_password_async(password: str) -> str:
+    return await password_hasher.hash_async(password)
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    return await password_hasher.verify_async(password, password_hash)
+
+
+def password_needs_rehash(password_hash: str) -> bool:
+    return password_hasher.needs_rehash(password_hash)
 
 
 def create_access_token(user: User) -> str:
@@ -36,10 +50,7 @@ def create_access_token(user: User) -> str:
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
+def decode_user_id(credentials: HTTPAuthorizationCredentials) -> int:
     token = credentials.credentials
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -49,9 +60,58 @@ def get_current_user(
     user_id = payload.get("user_id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token payload")
+    return user_id
+
+
+def load_principal(db: Session, user_id: int) -> User:
+    user = principal_cache.get(user_id)
+    if user is not None:
+        return user
 
     user = db.query(User).filter(User.id == user_id).first()
     if not user or user.is_locked:
         raise HTTPException(status_code=401, detail="User not available")
 
-    return user
+    principal_cache.put(user)
+    return user
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_unit_of_work, scope="function"),
+) -> User:
+    return load_principal(db, decode_user_id(credentials))
+
+
+def get_current_reader(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_read_db),
+) -> User:
+    return load_principal(db, decode_user_id(credentials))
+
+
+async def load_principal_async(db: AsyncSession, user_id: int) -> User:
+    user = principal_cache.get(user_id)
+    if user is not None:
+        return user
+
+    user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+    if not user or user.is_locked:
+        raise HTTPException(status_code=401, detail="User not available")
+
+    principal_cache.put(user)
+    return user
+
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    return await load_principal_async(db, decode_user_id(credentials))
+
+
+async def get_current_reader_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_read_db),
+) -> User:
+    return await load_principal_async(db, decode_user_id(credentials))
@@ -0,0 +1,111 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+PASSWORD_SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2**14)))
+PASSWORD_SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+PASSWORD_SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "4"))
+
+SCHEME = "scrypt"
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data.encode("ascii"))
+
+
+class PasswordHasher:
+    def __init__(self, n: int, r: int, p: int, workers: int, max_pending: int) -> None:
+        self.n = n
+        self.r = r
+        self.p = p
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hasher")
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+
+    def _derive(self, password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        return hashlib.scrypt(
+            password.encode("utf-8"),
+            salt=salt,
+            n=n,
+            r=r,
+            p=p,
+            maxmem=128 * r * (n + p + 2) + 1024 * 1024,
+            dklen=KEY_BYTES,
+        )
+
+    def _hash(self, password: str) -> str:
+        salt = os.urandom(SALT_BYTES)
+        key = self._derive(password, salt, self.n, self.r, self.p)
+        return f"{SCHEME}${self.n}${self.r}${self.p}${_b64encode(salt)}${_b64encode(key)}"
+
+    def _verify(self, password: str, password_hash: str) -> bool:
+        if not password_hash.startswith(SCHEME + "$"):
+            legacy = hashlib.sha256(password.encode("utf-8")).hexdigest()
+            return hmac.compare_digest(legacy, password_hash)
+
+        try:
+            _, n, r, p, salt, key = password_hash.split("$")
+            expected = _b64decode(key)
+            actual = self._derive(password, _b64decode(salt), int(n), int(r), int(p))
+        except ValueError:
+            return False
+        return hmac.compare_digest(actual, expected)
+
+    def _acquire(self) -> None:
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=503,
+                detail="Password hashing is busy, retry later",
+                headers={"Retry-After": "1"},
+            )
+
+    def _run(self, fn, *args):
+        self._acquire()
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    async def _run_async(self, fn, *args):
+        self._acquire()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._run(self._hash, password)
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        return self._run(self._verify, password, password_hash)
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run_async(self._hash, password)
+
+    async def verify_async(self, password: str, password_hash: str) -> bool:
+        return await self._run_async(self._verify, password, password_hash)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        return not password_hash.startswith(f"{SCHEME}${self.n}${self.r}${self.p}$")
+
+
+password_hasher = PasswordHasher(
+    PASSWORD_SCRYPT_N,
+    PASSWORD_SCRYPT_R,
+    PASSWORD_SCRYPT_P,
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_MAX_PENDING,
+)
@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+
+from database.models.user import User
+
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_SIZE = int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", "10000"))
+
+PRINCIPAL_FIELDS = ("id", "name", "email", "role", "tenant_id", "is_locked")
+
+
+class PrincipalCache:
+    def __init__(self, ttl_seconds: float, max_size: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> User | None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            values = entry[1]
+        return User(**values)
+
+    def put(self, user: User) -> None:
+        if self.max_size <= 0:
+            return
+        values = {field: getattr(user, field) for field in PRINCIPAL_FIELDS}
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[user.id] = (expires_at, values)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_MAX_SIZE)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_updated_user(mapper, connection, target: User) -> None:
+    principal_cache.invalidate(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target: User) -> None:
+    principal_cache.invalidate(target.id)
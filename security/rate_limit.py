@@ -0,0 +1,130 @@
+import math
+import os
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request
+
+from database.shards import claim_id, request_claims
+from monitoring.metrics import requests_rejected_total
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in {"1", "true", "yes"}
+TENANT_RATE_PER_SECOND = float(os.getenv("TENANT_RATE_PER_SECOND", "100"))
+TENANT_BURST = float(os.getenv("TENANT_BURST", "200"))
+TENANT_MAX_CONCURRENCY = int(os.getenv("TENANT_MAX_CONCURRENCY", "16"))
+IP_RATE_PER_SECOND = float(os.getenv("IP_RATE_PER_SECOND", "10"))
+IP_BURST = float(os.getenv("IP_BURST", "100"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+DEFAULT_COST = 1
+
+ROUTE_COSTS = {
+    ("POST", "/users/login"): 5,
+    ("POST", "/users/register"): 10,
+    ("POST", "/users/users"): 5,
+    ("DELETE", "/users/users/{user_id}"): 5,
+    ("DELETE", "/projects/{project_id}"): 10,
+    ("GET", "/tasks/search"): 3,
+    ("POST", "/tasks/project/{project_id}/bulk"): 20,
+    ("PUT", "/tasks/project/{project_id}/bulk/status"): 10,
+    ("PUT", "/tasks/project/{project_id}/bulk/assignee"): 10,
+    ("GET", "/tenants/me/export"): 50,
+    ("GET", "/metrics"): 0,
+    ("GET", "/instrumentation/pool"): 0,
+}
+
+STREAMING_ROUTES = {("GET", "/events/stream")}
+
+
+class TokenBuckets:
+    def __init__(self, rate: float, burst: float, max_keys: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[object, list[float]] = OrderedDict()
+
+    def take(self, key, cost: float, now: float) -> float:
+        cost = min(cost, self.burst)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens >= cost:
+            bucket[0] = tokens - cost
+            return 0.0
+        bucket[0] = tokens
+        return (cost - tokens) / self.rate
+
+
+class ConcurrencyLimits:
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self._active: dict[object, int] = {}
+
+    def acquire(self, key) -> bool:
+        active = self._active.get(key, 0)
+        if active >= self.limit:
+            return False
+        self._active[key] = active + 1
+        return True
+
+    def release(self, key) -> None:
+        active = self._active[key] - 1
+        if active:
+            self._active[key] = active
+        else:
+            del self._active[key]
+
+
+def token_tenant_id(request: Request) -> int | None:
+    return claim_id(request_claims(request), "tenant_id")
+
+
+def reject(route_path: str, reason: str, wait: float) -> HTTPException:
+    requests_rejected_total.inc((route_path, reason))
+    return HTTPException(
+        status_code=429,
+        detail="Too many requests, retry later",
+        headers={"Retry-After": str(max(1, math.ceil(wait)))},
+    )
+
+
+tenant_buckets = TokenBuckets(TENANT_RATE_PER_SECOND, TENANT_BURST, RATE_LIMIT_MAX_KEYS)
+ip_buckets = TokenBuckets(IP_RATE_PER_SECOND, IP_BURST, RATE_LIMIT_MAX_KEYS)
+tenant_concurrency = ConcurrencyLimits(TENANT_MAX_CONCURRENCY)
+
+
+async def admit(request: Request):
+    route_key = (request.method, request.scope["route"].path)
+    cost = ROUTE_COSTS.get(route_key, DEFAULT_COST)
+    if not RATE_LIMIT_ENABLED or cost == 0:
+        yield
+        return
+
+    tenant_id = token_tenant_id(request)
+    now = time.monotonic()
+    if tenant_id is None:
+        client = request.client.host if request.client else "unknown"
+        wait = ip_buckets.take(client, cost, now)
+        if wait:
+            raise reject(route_key[1], "ip_rate", wait)
+        yield
+        return
+
+    wait = tenant_buckets.take(tenant_id, cost, now)
+    if wait:
+        raise reject(route_key[1], "tenant_rate", wait)
+    if route_key in STREAMING_ROUTES:
+        yield
+        return
+    if not tenant_concurrency.acquire(tenant_id):
+        raise reject(route_key[1], "tenant_concurrency", 1.0)
+    try:
+        yield
+    finally:
+        tenant_concurrency.release(tenant_id)
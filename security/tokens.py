@@ -0,0 +1,13 @@
+import os
+
+import jwt
+
+SECRET_KEY = os.getenv("JWT_SECRET", "change-me")
+ALGORITHM = "HS256"
+
+
+def token_claims(token: str) -> dict | None:
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
+        return None